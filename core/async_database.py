@@ -2,14 +2,19 @@ import aiosqlite
 import asyncio
 import sqlite3
 import uuid
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, AsyncIterator
 from contextlib import asynccontextmanager
 import time
 import json
+import base64
+import hashlib
+import unicodedata
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import os
 import sys
+from core.tools.metrics import registry as metrics_registry
+from core.tools.tracing import emit_span
 
 
 def _detect_install_root() -> Path:
@@ -33,6 +38,24 @@ def _detect_install_root() -> Path:
 base_directory = _detect_install_root()  / "work_dir"
 base_directory.mkdir(parents=True, exist_ok=True)
 
+DB_WRITE_SECONDS = metrics_registry.histogram(
+    "wiseflow_db_write_duration_seconds", "data.db 写操作耗时（含排队与批量提交）")
+DUPLICATE_INFOS = metrics_registry.counter("wiseflow_duplicate_infos_skipped_total", "因内容重复未写入的 info 数")
+
+
+def content_fingerprint(content: Optional[str]) -> Optional[str]:
+    """
+    infos 去重用的内容指纹：NFKC 归一化、忽略大小写、去掉所有空白与标点后取 blake2b-128，
+    转载到不同站点、仅排版或标点不同的同一条信息得到相同指纹；归一化后为空时返回 None（不参与去重）
+    """
+    if not content:
+        return None
+    text = unicodedata.normalize('NFKC', content).casefold()
+    text = ''.join(ch for ch in text if not ch.isspace() and not unicodedata.category(ch).startswith(('P', 'Z', 'C')))
+    if not text:
+        return None
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
 
 class NonRetryableDatabaseError(Exception):
     """Raised to explicitly indicate an operation should not be retried."""
@@ -52,7 +75,9 @@ class AsyncDatabaseManager:
             'focus_id': 'INTEGER',
             'source_url': 'TEXT',
             'source_title': 'TEXT',
-            'created': 'TEXT'
+            'created': 'TEXT',
+            # content_fingerprint(content)，写入时计算；同一 focus 下唯一（idx_infos_focus_content_hash），重复内容直接跳过
+            'content_hash': 'TEXT'
         },
         'tasks': {
             'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
@@ -117,12 +142,131 @@ class AsyncDatabaseManager:
         },
     }
     
+    # 按版本顺序执行的结构迁移，已执行到的版本号记录在 PRAGMA user_version 中
+    # 只追加，不要修改已发布的条目；每个版本在一个事务内执行
+    # 条目为 SQL 列表，或者（需要判断运行环境时）一个迁移方法名
+    MIGRATIONS = [
+        (1, [
+            # filter_infos / page_infos 按 focus_id 过滤并按 (created, id) 倒序分页（id 作为同一时间戳下的决胜列），
+            # count_infos_by_focus 按 focus_id 分组（仅扫索引）
+            'CREATE INDEX IF NOT EXISTS idx_infos_focus_created_id ON infos (focus_id, created DESC, id DESC)',
+            'CREATE INDEX IF NOT EXISTS idx_infos_source_url ON infos (source_url)',
+        ]),
+        (2, '_migrate_infos_fts'),
+        (3, '_migrate_focus_stats'),
+        (4, '_migrate_content_hash'),
+        (5, '_migrate_infos_seq'),
+    ]
+
+    # infos 的写入序号，供 read_infos_since 增量读取：rowid 在删除最新记录后可能被复用、完整 VACUUM 时可能被重排，
+    # 因此另设 seq 列，由 infos_seq 计数器（只增不减，相当于 AUTOINCREMENT）在插入时赋值
+    INFOS_SEQ_SQL = [
+        "CREATE TABLE IF NOT EXISTS infos_seq (value INTEGER NOT NULL)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_infos_seq ON infos (seq)",
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_seq AFTER INSERT ON infos WHEN new.seq IS NULL BEGIN
+            UPDATE infos_seq SET value = value + 1;
+            UPDATE infos SET seq = (SELECT value FROM infos_seq) WHERE rowid = new.rowid;
+        END""",
+    ]
+
+    # infos 全文检索：FTS5 外部内容表（不重复存储正文），trigram 分词对中日韩文本同样有效
+    # 注意：外部内容表以 infos 的 rowid 关联，对 data.db 执行完整 VACUUM 可能重排 rowid，之后需调用 rebuild_info_search_index()
+    INFOS_FTS_SQL = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS infos_fts USING fts5(
+            content, source_title, refers, content='infos', content_rowid='rowid', tokenize='trigram')""",
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_fts_insert AFTER INSERT ON infos BEGIN
+            INSERT INTO infos_fts(rowid, content, source_title, refers)
+            VALUES (new.rowid, new.content, new.source_title, new.refers);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_fts_delete AFTER DELETE ON infos BEGIN
+            INSERT INTO infos_fts(infos_fts, rowid, content, source_title, refers)
+            VALUES ('delete', old.rowid, old.content, old.source_title, old.refers);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_fts_update AFTER UPDATE OF content, source_title, refers ON infos BEGIN
+            INSERT INTO infos_fts(infos_fts, rowid, content, source_title, refers)
+            VALUES ('delete', old.rowid, old.content, old.source_title, old.refers);
+            INSERT INTO infos_fts(rowid, content, source_title, refers)
+            VALUES (new.rowid, new.content, new.source_title, new.refers);
+        END""",
+    ]
+    # trigram 分词要求检索词至少 3 个字符
+    FTS_MIN_TERM_CHARS = 3
+
+    # 每个 focus 的 infos 计数、最新 created 及按天（UTC，取 created 前 10 位）的计数，由触发器随 infos 增删改维护，
+    # /info_stat 因此只需读 O(focus 数) 行；如有偏差用 rebuild_focus_stats()（或 python -m core.tools.db_admin rebuild-stats）修复
+    FOCUS_STATS_SQL = [
+        """CREATE TABLE IF NOT EXISTS focus_stats (
+            focus_id INTEGER PRIMARY KEY,
+            info_count INTEGER NOT NULL DEFAULT 0,
+            last_created TEXT)""",
+        """CREATE TABLE IF NOT EXISTS focus_daily_stats (
+            focus_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            info_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (focus_id, day)) WITHOUT ROWID""",
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_stats_insert AFTER INSERT ON infos
+        WHEN new.focus_id IS NOT NULL BEGIN
+            INSERT INTO focus_stats (focus_id, info_count, last_created) VALUES (new.focus_id, 1, new.created)
+            ON CONFLICT(focus_id) DO UPDATE SET info_count = info_count + 1,
+                last_created = CASE WHEN last_created IS NULL OR excluded.last_created > last_created
+                                    THEN excluded.last_created ELSE last_created END;
+            INSERT INTO focus_daily_stats (focus_id, day, info_count)
+            VALUES (new.focus_id, substr(coalesce(new.created, ''), 1, 10), 1)
+            ON CONFLICT(focus_id, day) DO UPDATE SET info_count = info_count + 1;
+        END""",
+        # AFTER DELETE 时该行已不在表中，last_created 直接取剩余记录的最大值（走 idx_infos_focus_created_id）
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_stats_delete AFTER DELETE ON infos
+        WHEN old.focus_id IS NOT NULL BEGIN
+            UPDATE focus_stats SET info_count = info_count - 1,
+                last_created = (SELECT max(created) FROM infos WHERE focus_id = old.focus_id)
+            WHERE focus_id = old.focus_id;
+            DELETE FROM focus_stats WHERE focus_id = old.focus_id AND info_count <= 0;
+            UPDATE focus_daily_stats SET info_count = info_count - 1
+            WHERE focus_id = old.focus_id AND day = substr(coalesce(old.created, ''), 1, 10);
+            DELETE FROM focus_daily_stats
+            WHERE focus_id = old.focus_id AND day = substr(coalesce(old.created, ''), 1, 10) AND info_count <= 0;
+        END""",
+        # 修改 focus_id / created 视为旧行删除 + 新行插入，拆成两个触发器以便分别判断 NULL
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_stats_update_old AFTER UPDATE OF focus_id, created ON infos
+        WHEN old.focus_id IS NOT NULL BEGIN
+            UPDATE focus_stats SET info_count = info_count - 1,
+                last_created = (SELECT max(created) FROM infos WHERE focus_id = old.focus_id)
+            WHERE focus_id = old.focus_id;
+            DELETE FROM focus_stats WHERE focus_id = old.focus_id AND info_count <= 0;
+            UPDATE focus_daily_stats SET info_count = info_count - 1
+            WHERE focus_id = old.focus_id AND day = substr(coalesce(old.created, ''), 1, 10);
+            DELETE FROM focus_daily_stats
+            WHERE focus_id = old.focus_id AND day = substr(coalesce(old.created, ''), 1, 10) AND info_count <= 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_infos_stats_update_new AFTER UPDATE OF focus_id, created ON infos
+        WHEN new.focus_id IS NOT NULL BEGIN
+            INSERT INTO focus_stats (focus_id, info_count, last_created) VALUES (new.focus_id, 1, new.created)
+            ON CONFLICT(focus_id) DO UPDATE SET info_count = info_count + 1,
+                last_created = CASE WHEN last_created IS NULL OR excluded.last_created > last_created
+                                    THEN excluded.last_created ELSE last_created END;
+            INSERT INTO focus_daily_stats (focus_id, day, info_count)
+            VALUES (new.focus_id, substr(coalesce(new.created, ''), 1, 10), 1)
+            ON CONFLICT(focus_id, day) DO UPDATE SET info_count = info_count + 1;
+        END""",
+    ]
+    # 从 infos 全量重算 focus_stats / focus_daily_stats
+    FOCUS_STATS_REBUILD_SQL = [
+        "DELETE FROM focus_stats",
+        "DELETE FROM focus_daily_stats",
+        """INSERT INTO focus_stats (focus_id, info_count, last_created)
+            SELECT focus_id, COUNT(*), MAX(created) FROM infos WHERE focus_id IS NOT NULL GROUP BY focus_id""",
+        """INSERT INTO focus_daily_stats (focus_id, day, info_count)
+            SELECT focus_id, substr(coalesce(created, ''), 1, 10), COUNT(*) FROM infos
+            WHERE focus_id IS NOT NULL GROUP BY 1, 2""",
+    ]
+
     # 任务相关字段的允许值
     ALLOWED_SEARCH = {"bing", "github", "arxiv"}
     ALLOWED_SOURCE_TYPES = {"web", "rss"}
     ALLOWED_TIME_SLOTS = {'first', 'second', 'third', 'fourth'}
     
-    def __init__(self, pool_size: int = 6, max_retries: int = 3, logger = None):
+    def __init__(self, pool_size: int = 6, max_retries: int = 3, logger = None,
+                 write_batch_ms: int = 10, write_batch_max: int = 200):
         self.db_path = base_directory / "data.db"
         self.max_retries = max_retries
         
@@ -132,6 +276,22 @@ class AsyncDatabaseManager:
         self._available_connections = asyncio.Queue(maxsize=pool_size)
         self._pool_initialized = False
         self._init_lock = asyncio.Lock()
+
+        # 单写者队列：高频写入（add_info / add_ws_history / update_task）交给专用连接上的 writer task，
+        # 每 write_batch_ms 毫秒或攒满 write_batch_max 条合并为一个事务提交（group commit）
+        self._write_batch_ms = write_batch_ms
+        self._write_batch_max = max(1, write_batch_max)
+        self._write_queue: asyncio.Queue = asyncio.Queue()
+        self._writer_conn: Optional[aiosqlite.Connection] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._writer_closing = False
+        self._fts_available = False
+        self._focus_stats_available = False
+        self._content_hash_unique = False
+        # 因 content_hash 重复而跳过写入的 infos 条数（进程内累计）
+        self.duplicate_infos_skipped = 0
+        # infos 写入成功后的回调 listener(focus_id, ids)
+        self._info_listeners: List = []
         
         self.ready = False
         self.logger = logger
@@ -147,6 +307,8 @@ class AsyncDatabaseManager:
             await self._init_db_schema()
             # 初始化真正的连接池
             await self._init_connection_pool()
+            # 初始化单写者连接与 writer task
+            await self._init_writer()
             
             self._pool_initialized = True
             # self.logger.debug("Database manager initialized successfully")
@@ -184,6 +346,10 @@ CREATE TABLE IF NOT EXISTS {table_name} (
     async def _init_db_schema(self):
         """初始化数据库模式，包含表结构校验和缺失列自动补充"""
         async with aiosqlite.connect(self.db_path, timeout=30.0) as db:
+            # 新库开启增量 vacuum（只能在建表前设置），由后台维护任务回收空闲页
+            async with db.execute("SELECT COUNT(*) FROM sqlite_master") as cursor:
+                if (await cursor.fetchone())[0] == 0:
+                    await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
             # 检查所有必需的表是否存在
             for table_name, expected_columns in self.TABLE_SCHEMAS.items():
                 # 检查表是否存在
@@ -245,10 +411,27 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             
             # 创建索引
             await self._create_indexes(db)
-            
             await db.commit()
+
+            # 执行结构迁移
+            await self._apply_migrations(db)
+            await self._ensure_infos_fts(db)
+            async with db.execute("SELECT 1 FROM sqlite_master WHERE name = 'infos_fts'") as cursor:
+                self._fts_available = await cursor.fetchone() is not None
+            async with db.execute("SELECT 1 FROM sqlite_master WHERE name = 'trg_infos_stats_insert'") as cursor:
+                self._focus_stats_available = await cursor.fetchone() is not None
+            async with db.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_infos_focus_content_hash'") as cursor:
+                self._content_hash_unique = await cursor.fetchone() is not None
             # self.logger.debug("Database schema validation completed")
 
+    @property
+    def _infos_on_conflict(self) -> str:
+        """infos 写入时只跳过 id 冲突和同一 focus 下的内容重复；NOT NULL 等其他约束错误照常抛出（不用 INSERT OR IGNORE）"""
+        clause = " ON CONFLICT(id) DO NOTHING"
+        if self._content_hash_unique:
+            clause += " ON CONFLICT(focus_id, content_hash) WHERE content_hash IS NOT NULL DO NOTHING"
+        return clause
+
     async def _create_indexes(self, db):
         """创建数据库索引"""
         # 定义需要创建的索引
@@ -268,6 +451,116 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             except Exception as e:
                 self.logger.warning(f"Failed to create index {index_name}: {str(e)}")
 
+    async def _apply_migrations(self, db):
+        """执行尚未应用的 MIGRATIONS，并推进 user_version"""
+        async with db.execute("PRAGMA user_version") as cursor:
+            current = (await cursor.fetchone())[0]
+
+        for version, statements in self.MIGRATIONS:
+            if version <= current:
+                continue
+            self.logger.info(f"Applying database migration {version}")
+            try:
+                await db.execute("BEGIN")
+                if isinstance(statements, str):
+                    await getattr(self, statements)(db)
+                else:
+                    for sql in statements:
+                        await db.execute(sql)
+                # PRAGMA 不支持参数绑定
+                await db.execute(f"PRAGMA user_version = {int(version)}")
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                self.logger.warning(f"Database migration {version} failed, will retry on next start: {str(e)}")
+                return
+            current = version
+
+    async def _migrate_infos_fts(self, db):
+        """创建 infos_fts 及同步触发器，并为已有数据建立索引；
+        SQLite 不支持 FTS5 trigram 时跳过（检索退回 LIKE），升级 SQLite 后由 _ensure_infos_fts 在启动时补建"""
+        if not await self._fts_trigram_supported(db):
+            self.logger.warning("SQLite FTS5 trigram tokenizer unavailable, /search_info will fall back to LIKE")
+            return
+        for sql in self.INFOS_FTS_SQL:
+            await db.execute(sql)
+        await db.execute("INSERT INTO infos_fts(infos_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    async def _fts_trigram_supported(db) -> bool:
+        try:
+            await db.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')")
+            await db.execute("DROP TABLE temp.fts_probe")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    async def _ensure_infos_fts(self, db):
+        """迁移 2 已记入 user_version 但当时跳过了 infos_fts（SQLite 不支持 trigram）：SQLite 升级后在启动时补建"""
+        async with db.execute("PRAGMA user_version") as cursor:
+            if (await cursor.fetchone())[0] < 2:
+                return
+        async with db.execute("SELECT 1 FROM sqlite_master WHERE name = 'infos_fts'") as cursor:
+            if await cursor.fetchone() is not None:
+                return
+        if not await self._fts_trigram_supported(db):
+            return
+        self.logger.info("Creating infos_fts skipped by an earlier migration")
+        try:
+            await db.execute("BEGIN")
+            for sql in self.INFOS_FTS_SQL:
+                await db.execute(sql)
+            await db.execute("INSERT INTO infos_fts(infos_fts) VALUES ('rebuild')")
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            self.logger.warning(f"Failed to create infos_fts, will retry on next start: {str(e)}")
+
+    async def _migrate_focus_stats(self, db):
+        """创建 focus_stats / focus_daily_stats 及维护触发器，并按已有 infos 初始化"""
+        for sql in self.FOCUS_STATS_SQL + self.FOCUS_STATS_REBUILD_SQL:
+            await db.execute(sql)
+
+    async def _migrate_content_hash(self, db):
+        """为已有 infos 回填 content_hash 并建唯一索引；已存在的重复只保留最早一条的指纹，不删除数据"""
+        last_rowid = 0
+        while True:
+            async with db.execute(
+                "SELECT rowid, content FROM infos WHERE rowid > ? ORDER BY rowid LIMIT 2000", (last_rowid,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            await db.executemany(
+                "UPDATE infos SET content_hash = ? WHERE rowid = ?",
+                [(content_fingerprint(content), rowid) for rowid, content in rows],
+            )
+        await db.execute(
+            """UPDATE infos SET content_hash = NULL WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (PARTITION BY focus_id, content_hash ORDER BY created, rowid) AS rn
+                    FROM infos WHERE content_hash IS NOT NULL
+                ) WHERE rn > 1)"""
+        )
+        await db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_infos_focus_content_hash ON infos (focus_id, content_hash)"
+            " WHERE content_hash IS NOT NULL"
+        )
+
+    async def _migrate_infos_seq(self, db):
+        """为 infos 增加 seq 列：已有记录沿用 rowid（旧的 since 游标仍然有效），计数器从当前最大 rowid 开始"""
+        async with db.execute("PRAGMA table_info(infos)") as cursor:
+            if 'seq' not in {row[1] for row in await cursor.fetchall()}:
+                await db.execute("ALTER TABLE infos ADD COLUMN seq INTEGER")
+        await db.execute("UPDATE infos SET seq = rowid WHERE seq IS NULL")
+        await db.execute(self.INFOS_SEQ_SQL[0])
+        async with db.execute("SELECT COUNT(*) FROM infos_seq") as cursor:
+            if (await cursor.fetchone())[0] == 0:
+                await db.execute("INSERT INTO infos_seq (value) SELECT COALESCE(MAX(seq), 0) FROM infos")
+        for sql in self.INFOS_SEQ_SQL[1:]:
+            await db.execute(sql)
+
     async def _init_connection_pool(self):
         """初始化真正的连接池"""
         for _ in range(self._pool_size):
@@ -276,6 +569,8 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             await conn.execute("PRAGMA busy_timeout = 5000")
             await conn.execute("PRAGMA cache_size = -64000")  # 64MB cache
             await conn.execute("PRAGMA synchronous = NORMAL")
+            # checkpoint 后把 wal 文件截回 64MB 以内，避免一次写入高峰后长期占用磁盘
+            await conn.execute("PRAGMA journal_size_limit = 67108864")
             
             self._connection_pool.append(conn)
             await self._available_connections.put(conn)
@@ -294,6 +589,121 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             # 归还连接到池中
             await self._available_connections.put(conn)
 
+    async def _init_writer(self):
+        """专用写连接，isolation_level=None 以便手动控制 BEGIN / SAVEPOINT / COMMIT"""
+        self._writer_conn = await aiosqlite.connect(self.db_path, timeout=30.0, isolation_level=None)
+        await self._writer_conn.execute("PRAGMA journal_mode = WAL")
+        await self._writer_conn.execute("PRAGMA busy_timeout = 5000")
+        await self._writer_conn.execute("PRAGMA synchronous = NORMAL")
+        # 自动 checkpoint 主要由提交最多的 writer 触发
+        await self._writer_conn.execute("PRAGMA journal_size_limit = 67108864")
+        self._writer_closing = False
+        self._writer_task = asyncio.create_task(self._writer_loop(), name="AsyncDatabaseWriter")
+
+    async def execute_write(self, operation, *args):
+        """
+        把写操作交给 writer task 排队执行，返回该操作自己的结果（或抛出它自己的异常）。
+
+        operation(db, *args) 与 execute_with_retry 的约定相同，但不能自行 commit：
+        同一批次的操作共享一个事务，每个操作包在独立的 SAVEPOINT 中，失败只回滚它自己。
+        """
+        if not self._pool_initialized:
+            await self.initialize()
+        if self._writer_task is None or self._writer_closing or self._writer_task.done():
+            # writer 已关闭（或未能启动），退回逐条提交
+            return await self.execute_with_retry(operation, *args)
+
+        future = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        self._write_queue.put_nowait((operation, args, future))
+        try:
+            return await future
+        finally:
+            # 含排队等待与所在批次的提交
+            cost = time.perf_counter() - started
+            DB_WRITE_SECONDS.observe(cost)
+            emit_span("db.write", cost)
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self._write_queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self._write_batch_ms / 1000
+            while len(batch) < self._write_batch_max:
+                try:
+                    # 先取已排队的，再在剩余时间窗口内等待新的写入
+                    item = self._write_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._write_queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                await self._run_write_batch(batch)
+            except Exception as e:
+                self.logger.error(f"Writer batch failed unexpectedly: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _run_write_batch(self, batch: list):
+        """在一个事务中执行一批写操作；事务级失败（如锁冲突）整体回滚后重试"""
+        db = self._writer_conn
+        for attempt in range(self.max_retries):
+            outcomes = []
+            try:
+                await db.execute("BEGIN IMMEDIATE")
+                for operation, args, future in batch:
+                    if future.cancelled():
+                        outcomes.append(None)
+                        continue
+                    await db.execute("SAVEPOINT write_op")
+                    try:
+                        result = await operation(db, *args)
+                    except Exception as e:
+                        await db.execute("ROLLBACK TO write_op")
+                        await db.execute("RELEASE write_op")
+                        outcomes.append((False, e))
+                    else:
+                        await db.execute("RELEASE write_op")
+                        outcomes.append((True, result))
+                await db.execute("COMMIT")
+            except Exception as e:
+                try:
+                    await db.execute("ROLLBACK")
+                except Exception:
+                    pass
+                if self._is_retryable_error(e) and attempt < self.max_retries - 1:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+                    continue
+                self.logger.warning(f"Write batch of {len(batch)} operations failed: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for outcome, (_, _, future) in zip(outcomes, batch):
+                if outcome is None or future.done():
+                    continue
+                ok, value = outcome
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+            return
+
     def _is_retryable_error(self, error: Exception) -> bool:
         """判断异常是否值得重试。
 
@@ -458,6 +868,19 @@ CREATE TABLE IF NOT EXISTS {table_name} (
 
     async def cleanup(self):
         """清理资源"""
+        # 先让 writer 写完已排队的操作再关闭
+        if self._writer_task is not None:
+            self._writer_closing = True
+            self._write_queue.put_nowait(None)
+            try:
+                await self._writer_task
+            except Exception as e:
+                self.logger.warning(f"Writer task termination error: {e}")
+            self._writer_task = None
+        if self._writer_conn is not None:
+            await self._writer_conn.close()
+            self._writer_conn = None
+
         # 关闭所有连接
         for conn in self._connection_pool:
             await conn.close()
@@ -489,11 +912,13 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             focus_id: 关联的 focus 表的 id
             id: 记录的唯一标识符，可选。如果不提供，将由数据库自动生成
         """
+        content_hash = content_fingerprint(content)
+
         async def _add(db):
             if id:
-                sql = """
-                INSERT OR IGNORE INTO infos (id, type, content, focus_statement, focus_id, source_url, source_title, refers, created)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                sql = f"""
+                INSERT INTO infos (id, type, content, focus_statement, focus_id, source_url, source_title, refers, created, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?){self._infos_on_conflict}
                 RETURNING id
                 """
                 params = (
@@ -506,11 +931,12 @@ CREATE TABLE IF NOT EXISTS {table_name} (
                     source_title,
                     refers or "",
                     created,
+                    content_hash,
                 )
             else:
-                sql = """
-                INSERT OR IGNORE INTO infos (type, content, focus_statement, focus_id, source_url, source_title, refers, created)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                sql = f"""
+                INSERT INTO infos (type, content, focus_statement, focus_id, source_url, source_title, refers, created, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?){self._infos_on_conflict}
                 RETURNING id
                 """
                 params = (
@@ -522,17 +948,31 @@ CREATE TABLE IF NOT EXISTS {table_name} (
                     source_title,
                     refers or "",
                     created,
+                    content_hash,
                 )
             
             async with db.execute(sql, params) as cursor:
                 row = await cursor.fetchone()
-                return row[0] if row else None
+                if row:
+                    return row[0], False
+            if id:
+                async with db.execute("SELECT 1 FROM infos WHERE id = ?", (id,)) as cursor:
+                    if await cursor.fetchone():
+                        return None, False
+            # 不是 id 冲突，就是同一 focus 下已有相同内容
+            return None, True
 
         try:
-            inserted_id = await self.execute_with_retry(_add)
+            inserted_id, duplicated = await self.execute_write(_add)
             if inserted_id:
                 self.logger.debug(f"Successfully added info with id: {inserted_id}")
+                self._emit_info_added(focus_id, [inserted_id])
                 return inserted_id
+            elif duplicated:
+                self.duplicate_infos_skipped += 1
+                DUPLICATE_INFOS.inc()
+                self.logger.debug(f"Duplicate info content for focus {focus_id}, skipping insertion")
+                return None
             else:
                 if id:
                     self.logger.info(f"Info with id {id} already exists, skipping insertion")
@@ -544,6 +984,94 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             self.logger.warning(f"Error adding info: {str(e)}\ncontext: {id}\n{type}\n{content}\n{refers}\n{source_url}\n{source_title}\n{created}\n{focus_statement}\n{focus_id}")
             return None
 
+    def add_info_listener(self, listener) -> None:
+        """
+        注册 infos 写入回调 listener(focus_id, ids)，在 add_info / add_infos 成功后同步调用；
+        回调必须立即返回（网络发送等耗时工作自行排队），异常只记录不影响写入
+        """
+        if listener not in self._info_listeners:
+            self._info_listeners.append(listener)
+
+    def remove_info_listener(self, listener) -> None:
+        if listener in self._info_listeners:
+            self._info_listeners.remove(listener)
+
+    def _emit_info_added(self, focus_id: int, ids: List[str]) -> None:
+        for listener in list(self._info_listeners):
+            try:
+                listener(focus_id, ids)
+            except Exception as e:
+                self.logger.warning(f"info listener {listener} failed: {e}")
+
+    async def add_infos(self, infos: List[dict], focus_statement: str, focus_id: int) -> List[str]:
+        """
+        批量向 infos 表添加记录：一次 executemany、一个事务（经单写者队列），用于一篇文章提取出的全部 infos
+
+        Args:
+            infos: 每项字段同 add_info（type, content, refers, source_url, source_title, created，可选 id）
+            focus_statement: 记录信息时的 focuspoint 描述字符串
+            focus_id: 关联的 focus 表的 id
+
+        Returns:
+            List[str]: 实际插入的记录 id（与表默认值格式相同，由本地预先生成，省去逐条 RETURNING）；
+                同一 focus 下内容指纹重复的记录被跳过，不在其中
+        """
+        rows = []
+        for info in infos:
+            rows.append((
+                info.get('id') or os.urandom(8).hex(),
+                info.get('type', ''),
+                info.get('content', ''),
+                focus_statement,
+                focus_id,
+                info.get('source_url', ''),
+                info.get('source_title', ''),
+                info.get('refers') or "",
+                info.get('created', ''),
+                content_fingerprint(info.get('content', '')),
+            ))
+        if not rows:
+            return []
+
+        given_ids = [info['id'] for info in infos if info.get('id')]
+
+        async def _add_batch(db):
+            # 调用方指定的 id 可能已存在（冲突时跳过），先查出来；本地生成的随机 id 不会冲突
+            existing = set()
+            if given_ids:
+                placeholders = ','.join(['?'] * len(given_ids))
+                async with db.execute(f"SELECT id FROM infos WHERE id IN ({placeholders})", given_ids) as cursor:
+                    existing = {row[0] for row in await cursor.fetchall()}
+            await db.executemany(
+                f"""
+                INSERT INTO infos (id, type, content, focus_statement, focus_id, source_url, source_title, refers, created, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?){self._infos_on_conflict}
+                """,
+                rows,
+            )
+            # 没写进去的记录：id 已存在，或内容与库中（含本批之前的）记录重复
+            candidates = [i for i in dict.fromkeys(row[0] for row in rows) if i not in existing]
+            if not candidates:
+                return [], 0
+            placeholders = ','.join(['?'] * len(candidates))
+            async with db.execute(f"SELECT id FROM infos WHERE id IN ({placeholders})", candidates) as cursor:
+                present = {row[0] for row in await cursor.fetchall()}
+            return [i for i in candidates if i in present], len(candidates) - len(present)
+
+        try:
+            inserted_ids, duplicates = await self.execute_write(_add_batch)
+            self.duplicate_infos_skipped += duplicates
+            if duplicates:
+                DUPLICATE_INFOS.inc(duplicates)
+            self.logger.debug(f"Successfully added {len(inserted_ids)}/{len(rows)} infos for focus {focus_id}"
+                              + (f", {duplicates} duplicate contents skipped" if duplicates else ""))
+            if inserted_ids:
+                self._emit_info_added(focus_id, inserted_ids)
+            return inserted_ids
+        except Exception as e:
+            self.logger.warning(f"Error adding {len(rows)} infos for focus {focus_id}: {str(e)}")
+            return []
+
     async def filter_infos(self, id: Optional[str] = None,
                           source_url: Optional[str] = None,
                           # 新增的过滤与分页条件
@@ -573,11 +1101,12 @@ CREATE TABLE IF NOT EXISTS {table_name} (
                 where_conditions = []
                 params = []
                 
-                # 批量 focus 过滤
+                # 批量 focus 过滤（必须是第一个条件，下方按 focus 分页时会拆出来）
                 if focus_ids:
-                    placeholders = ','.join(['?'] * len(focus_ids))
+                    focus_id_list = list(dict.fromkeys(int(x) for x in focus_ids))
+                    placeholders = ','.join(['?'] * len(focus_id_list))
                     where_conditions.append(f"focus_id IN ({placeholders})")
-                    params.extend([int(x) for x in focus_ids])
+                    params.extend(focus_id_list)
                 
                 if source_url is not None:
                     where_conditions.append("source_url = ?")
@@ -623,13 +1152,19 @@ CREATE TABLE IF NOT EXISTS {table_name} (
                     offset_val = int(offset) if offset is not None else 0
                     try:
                         if limit is not None:
-                            window_query = (
-                                f"SELECT {columns} FROM ("
-                                f"  SELECT {columns}, ROW_NUMBER() OVER (PARTITION BY focus_id ORDER BY created DESC) AS rn"
-                                f"  FROM infos{where_sql}"
-                                f") t WHERE rn > ? AND rn <= ? ORDER BY created DESC"
+                            # 每个 focus 一个子查询，各自走 idx_infos_focus_created_id 定位并在 limit+offset 行后停止，
+                            # 而不是像窗口函数那样为该 focus 的全部记录编号
+                            other_conditions = where_conditions[1:]
+                            other_params = params[len(focus_id_list):]
+                            per_focus_where = ' AND '.join(['focus_id = ?'] + other_conditions)
+                            per_focus_query = (
+                                f"SELECT * FROM (SELECT {columns} FROM infos WHERE {per_focus_where}"
+                                f" ORDER BY created DESC LIMIT ? OFFSET ?)"
                             )
-                            query_params = params + [offset_val, offset_val + int(limit)]
+                            window_query = " UNION ALL ".join([per_focus_query] * len(focus_id_list)) + " ORDER BY created DESC"
+                            query_params = []
+                            for fid in focus_id_list:
+                                query_params.extend([fid, *other_params, int(limit), offset_val])
                         else:
                             window_query = (
                                 f"SELECT {columns} FROM ("
@@ -689,6 +1224,213 @@ CREATE TABLE IF NOT EXISTS {table_name} (
         
         return result
 
+    async def page_infos(self, focus_ids: Optional[List[int]] = None,
+                         source_url: Optional[str] = None,
+                         start_time: Optional[str] = None,
+                         end_time: Optional[str] = None,
+                         limit: int = 20,
+                         cursor: Optional[str] = None) -> Optional[tuple]:
+        """
+        按 (created, id) 倒序做 keyset 分页读取 infos，每一页的代价与翻到第几页无关
+
+        指定 focus_ids 时 limit 为每个 focus 的数量，游标分别记录每个 focus 读到的位置，
+        已读完的 focus 在后续页中不再查询；带游标时只继续游标中未读完的 focus。
+
+        Returns:
+            (infos, next_cursor)，next_cursor 为 None 表示没有更多数据；出错返回 None
+        """
+        limit = max(1, int(limit or 20))
+        positions: Dict[str, Optional[list]] = {}
+        decoded = self._decode_cursor(cursor)
+        if decoded and len(decoded) == 2 and decoded[0] == 'info' and isinstance(decoded[1], dict):
+            positions = decoded[1]
+        elif cursor:
+            self.logger.warning(f"Invalid info cursor ignored: {cursor}")
+
+        if focus_ids:
+            keys = [str(fid) for fid in dict.fromkeys(int(x) for x in focus_ids)]
+        else:
+            keys = ['*']
+        if positions:
+            keys = [k for k in keys if k in positions and positions[k] is not None]
+
+        conditions, params = [], []
+        if source_url is not None:
+            conditions.append("source_url = ?")
+            params.append(source_url)
+        for value, op in ((start_time, '>='), (end_time, '<=')):
+            if not value:
+                continue
+            try:
+                datetime.fromisoformat(value.replace('Z', ''))
+            except Exception:
+                self.logger.warning(f"Invalid time filter: {value}")
+                continue
+            conditions.append(f"created {op} ?")
+            params.append(value)
+        columns = "id, type, content, focus_statement, focus_id, source_url, source_title, refers, created"
+
+        async def _fetch(db, where: list, where_params: list, order: str, count: int) -> List[dict]:
+            where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+            query = f"SELECT {columns} FROM infos{where_sql} ORDER BY {order} LIMIT ?"
+            async with db.execute(query, [*where_params, count]) as cur:
+                colnames = [desc[0] for desc in cur.description]
+                return [dict(zip(colnames, row)) for row in await cur.fetchall()]
+
+        async def _page(db):
+            pages = {}
+            for key in keys:
+                where, where_params = list(conditions), list(params)
+                if key != '*':
+                    where.insert(0, "focus_id = ?")
+                    where_params.insert(0, int(key))
+                after = positions.get(key)
+                rows = []
+                if not after or after[0] is not None:
+                    ranged, ranged_params = list(where), list(where_params)
+                    if after:
+                        # 行值比较才能让 SQLite 把游标位置用作索引范围的起点，OR 展开的写法只能从该 focus 的开头扫描
+                        ranged.append("(created, id) < (?, ?)")
+                        ranged_params.extend([after[0], after[1]])
+                    else:
+                        ranged.append("created IS NOT NULL")
+                    rows = await _fetch(db, ranged, ranged_params, "created DESC, id DESC", limit + 1)
+                if len(rows) <= limit:
+                    # created 为 NULL 的行排在最后，与 NULL 的行值比较永远不成立，单独按 id 续读
+                    tail, tail_params = where + ["created IS NULL"], list(where_params)
+                    if after and after[0] is None:
+                        tail.append("id < ?")
+                        tail_params.append(after[1])
+                    rows += await _fetch(db, tail, tail_params, "id DESC", limit + 1 - len(rows))
+                pages[key] = rows
+            return pages
+
+        try:
+            pages = await self.execute_with_retry(_page)
+        except Exception as e:
+            self.logger.error(f"Error paging infos: {str(e)}")
+            return None
+
+        result, next_positions = [], {}
+        for key, rows in pages.items():
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_positions[key] = [rows[-1]['created'], rows[-1]['id']]
+            else:
+                next_positions[key] = None
+            result.extend(rows)
+        if len(pages) > 1:
+            result.sort(key=lambda r: (r['created'] or '', r['id']), reverse=True)
+        next_cursor = self._encode_cursor(['info', next_positions]) if any(next_positions.values()) else None
+        return result, next_cursor
+
+    async def read_infos_since(self, since: Optional[str],
+                               focus_ids: Optional[List[int]] = None,
+                               limit: int = 200) -> Optional[tuple]:
+        """
+        增量读取 since 游标之后新写入的 infos（按写入顺序，即 seq 升序；seq 不会复用，也不受 VACUUM 影响）
+
+        since 为空时不返回数据，只返回当前位置的游标，供客户端初始化；之后每次用返回的游标继续读取。
+
+        Returns:
+            (infos, next_since)，出错返回 None
+        """
+        limit = max(1, min(int(limit or 200), 1000))
+        decoded = self._decode_cursor(since)
+        after = decoded[1] if decoded and len(decoded) == 2 and decoded[0] == 'since' else None
+        if since and after is None:
+            self.logger.warning(f"Invalid since cursor ignored: {since}")
+
+        async def _read(db):
+            if after is None:
+                async with db.execute("SELECT COALESCE(MAX(seq), 0) FROM infos") as cursor:
+                    return [], (await cursor.fetchone())[0]
+            conditions, params = ["seq > ?"], [int(after)]
+            if focus_ids:
+                focus_id_list = list(dict.fromkeys(int(x) for x in focus_ids))
+                conditions.append(f"focus_id IN ({','.join(['?'] * len(focus_id_list))})")
+                params.extend(focus_id_list)
+            query = (
+                "SELECT seq AS _seq, id, type, content, focus_statement, focus_id, source_url, source_title, refers, created"
+                f" FROM infos WHERE {' AND '.join(conditions)} ORDER BY seq LIMIT ?"
+            )
+            async with db.execute(query, [*params, limit]) as cursor:
+                colnames = [desc[0] for desc in cursor.description]
+                rows = [dict(zip(colnames, row)) for row in await cursor.fetchall()]
+            return rows, (rows[-1]['_seq'] if rows else int(after))
+
+        try:
+            rows, position = await self.execute_with_retry(_read)
+        except Exception as e:
+            self.logger.error(f"Error reading infos since {since}: {e}")
+            return None
+        for row in rows:
+            row.pop('_seq')
+        return rows, self._encode_cursor(['since', position])
+
+    async def since_cursor_before(self, ids: List[str]) -> Optional[str]:
+        """返回恰好位于这些 infos 之前的 since 游标，用 read_infos_since 可读到它们（及之后的写入）"""
+        if not ids:
+            return None
+
+        async def _min_seq(db):
+            placeholders = ','.join(['?'] * len(ids))
+            async with db.execute(f"SELECT MIN(seq) FROM infos WHERE id IN ({placeholders})", ids) as cursor:
+                return (await cursor.fetchone())[0]
+
+        try:
+            seq = await self.execute_with_retry(_min_seq)
+        except Exception as e:
+            self.logger.warning(f"Error locating infos {ids[:3]}...: {e}")
+            return None
+        return self._encode_cursor(['since', seq - 1]) if seq is not None else None
+
+    async def iter_infos(self, focus_ids: Optional[List[int]] = None,
+                         start_time: Optional[str] = None,
+                         end_time: Optional[str] = None,
+                         types: Optional[List[str]] = None,
+                         batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        """
+        按 created 升序分批迭代 infos（用于导出），每批最多 batch_size 条，内存占用与总条数无关
+
+        使用独立的只读连接，导出期间不占用连接池；读事务持续到迭代结束，期间 WAL 无法被 TRUNCATE，
+        调用方应尽快消费，提前停止时用 aclose() 关闭。
+        """
+        conditions, params = [], []
+        if focus_ids:
+            focus_id_list = list(dict.fromkeys(int(x) for x in focus_ids))
+            conditions.append(f"focus_id IN ({','.join(['?'] * len(focus_id_list))})")
+            params.extend(focus_id_list)
+        if types:
+            conditions.append(f"type IN ({','.join(['?'] * len(types))})")
+            params.extend(types)
+        for value, op in ((start_time, '>='), (end_time, '<=')):
+            if not value:
+                continue
+            try:
+                datetime.fromisoformat(value.replace('Z', ''))
+            except Exception:
+                self.logger.warning(f"Invalid time filter: {value}")
+                continue
+            conditions.append(f"created {op} ?")
+            params.append(value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = (
+            "SELECT id, type, content, focus_statement, focus_id, source_url, source_title, refers, created"
+            f" FROM infos{where} ORDER BY created"
+        )
+
+        async with aiosqlite.connect(self.db_path, timeout=30.0) as db:
+            await db.execute("PRAGMA query_only = 1")
+            await db.execute("PRAGMA busy_timeout = 5000")
+            async with db.execute(query, params) as cursor:
+                colnames = [desc[0] for desc in cursor.description]
+                while True:
+                    rows = await cursor.fetchmany(max(1, batch_size))
+                    if not rows:
+                        break
+                    yield [dict(zip(colnames, row)) for row in rows]
+
     async def delete_info(self, info_id: str) -> Optional[str]:
         """
         根据 id 删除指定的 info 记录
@@ -714,7 +1456,7 @@ CREATE TABLE IF NOT EXISTS {table_name} (
 
     async def count_infos_by_focus(self, focus_id: Optional[int] = None) -> Dict[int, int]:
         """
-        统计 infos 数量，按 focus_id 分组
+        统计 infos 数量，按 focus_id 分组（读取触发器维护的 focus_stats，不扫描 infos）
         
         Args:
             focus_id: 可选的 focus_id，如果提供则只统计该 focus_id 的数量
@@ -725,27 +1467,23 @@ CREATE TABLE IF NOT EXISTS {table_name} (
         result = {}
         
         async def _count(db):
-            if focus_id is not None:
-                # 只统计指定的 focus_id
-                async with db.execute(
-                    "SELECT focus_id, COUNT(*) as count FROM infos WHERE focus_id = ? GROUP BY focus_id",
-                    (focus_id,)
-                ) as cursor:
-                    async for row in cursor:
-                        fid = row[0]
-                        count = row[1]
-                        if fid is not None:
-                            result[int(fid)] = int(count)
+            if self._focus_stats_available:
+                query = "SELECT focus_id, info_count FROM focus_stats"
             else:
-                # 统计所有 focus_id
-                async with db.execute(
-                    "SELECT focus_id, COUNT(*) as count FROM infos GROUP BY focus_id"
-                ) as cursor:
-                    async for row in cursor:
-                        fid = row[0]
-                        count = row[1]
-                        if fid is not None:
-                            result[int(fid)] = int(count)
+                # 统计表迁移未成功时退回实时聚合
+                query = "SELECT focus_id, COUNT(*) FROM infos WHERE focus_id IS NOT NULL"
+            params = []
+            if focus_id is not None:
+                query += " WHERE focus_id = ?" if self._focus_stats_available else " AND focus_id = ?"
+                params.append(focus_id)
+            if not self._focus_stats_available:
+                query += " GROUP BY focus_id"
+            async with db.execute(query, params) as cursor:
+                async for row in cursor:
+                    fid = row[0]
+                    count = row[1]
+                    if fid is not None:
+                        result[int(fid)] = int(count)
         
         try:
             await self.execute_with_retry(_count)
@@ -753,7 +1491,189 @@ CREATE TABLE IF NOT EXISTS {table_name} (
         except Exception as e:
             self.logger.error(f"Error counting infos by focus: {str(e)}")
             return {}
+
+    async def get_focus_stats(self, focus_id: Optional[int] = None, days: int = 30) -> Optional[Dict[int, dict]]:
+        """
+        读取 focus 统计：总数、最新 created，以及最近 days 天（UTC，含今天）的按天计数
+
+        Returns:
+            {focus_id: {"count": int, "last_created": str, "daily": {"YYYY-MM-DD": int}}}，出错返回 None
+        """
+        if not self._focus_stats_available:
+            self.logger.warning("focus_stats table unavailable, run `python -m core.tools.db_admin rebuild-stats` after fixing the migration")
+            return None
+        days = max(1, int(days or 30))
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+        async def _stats(db):
+            result: Dict[int, dict] = {}
+            where, params = "", []
+            if focus_id is not None:
+                where, params = " WHERE focus_id = ?", [focus_id]
+            async with db.execute(f"SELECT focus_id, info_count, last_created FROM focus_stats{where}", params) as cursor:
+                async for fid, count, last_created in cursor:
+                    result[int(fid)] = {"count": int(count), "last_created": last_created, "daily": {}}
+            daily_where = "day >= ?" + (" AND focus_id = ?" if focus_id is not None else "")
+            async with db.execute(
+                f"SELECT focus_id, day, info_count FROM focus_daily_stats WHERE {daily_where} ORDER BY focus_id, day",
+                [since, *params],
+            ) as cursor:
+                async for fid, day, count in cursor:
+                    if int(fid) in result:
+                        result[int(fid)]["daily"][day] = int(count)
+            return result
+
+        try:
+            return await self.execute_with_retry(_stats)
+        except Exception as e:
+            self.logger.error(f"Error reading focus stats: {e}")
+            return None
+
+    async def rebuild_focus_stats(self) -> Optional[int]:
+        """从 infos 全量重算 focus_stats / focus_daily_stats（修复偏差用），返回统计到的 focus 数"""
+        if not self._focus_stats_available:
+            self.logger.warning("focus_stats table unavailable, nothing to rebuild")
+            return None
+
+        async def _rebuild(db):
+            for sql in self.FOCUS_STATS_REBUILD_SQL:
+                await db.execute(sql)
+            async with db.execute("SELECT COUNT(*) FROM focus_stats") as cursor:
+                return (await cursor.fetchone())[0]
+
+        try:
+            return await self.execute_write(_rebuild)
+        except Exception as e:
+            self.logger.error(f"Error rebuilding focus stats: {e}")
+            return None
     
+    @staticmethod
+    def _encode_cursor(payload: list) -> str:
+        """分页游标：对调用方不透明的 url-safe base64(JSON)"""
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(token: Optional[str]) -> Optional[list]:
+        """解析分页游标，非法游标返回 None（视为从第一页开始）"""
+        if not token:
+            return None
+        try:
+            value = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        except Exception:
+            return None
+        return value if isinstance(value, list) else None
+
+    async def search_infos(self, query: str,
+                           focus_ids: Optional[List[int]] = None,
+                           limit: int = 20,
+                           cursor: Optional[str] = None,
+                           highlight_tags: tuple = ('<mark>', '</mark>')) -> Optional[tuple]:
+        """
+        全文检索 infos 的 content / source_title / refers，空格分隔的多个词为 AND 关系
+
+        走 infos_fts（bm25 相关度排序，content 权重最高）；不足 3 个字符的词 trigram 无法索引，
+        用 instr 在命中结果上过滤。全部检索词都短于 3 个字符、或 FTS 不可用时，退回按时间倒序的扫描。
+
+        Args:
+            cursor: 上一页返回的游标。按相关度排序时为偏移量（bm25 分数随新数据写入而变化，不能做 keyset），
+                按时间倒序扫描时按 (created, id) 做 keyset 分页
+
+        Returns:
+            (infos, next_cursor)，infos 额外带 content_highlight / source_title_highlight；
+            next_cursor 为 None 表示没有更多结果；出错返回 None
+        """
+        terms = [t for t in (query or '').split() if t]
+        if not terms:
+            return [], None
+        limit = max(1, min(int(limit or 20), 100))
+        fts_terms = [t for t in terms if len(t) >= self.FTS_MIN_TERM_CHARS]
+        use_fts = self._fts_available and bool(fts_terms)
+        filter_terms = [t for t in terms if len(t) < self.FTS_MIN_TERM_CHARS] if use_fts else terms
+        after = self._decode_cursor(cursor)
+        mode = 'fts' if use_fts else 'scan'
+        if after and (len(after) != (2 if use_fts else 3) or after[0] != mode):
+            after = None
+        offset = max(0, int(after[1])) if use_fts and after and isinstance(after[1], int) else 0
+        open_tag, close_tag = highlight_tags
+        columns = "i.id, i.type, i.content, i.focus_statement, i.focus_id, i.source_url, i.source_title, i.refers, i.created"
+
+        async def _search(db):
+            conditions, params = [], []
+            if focus_ids:
+                conditions.append(f"i.focus_id IN ({','.join(['?'] * len(focus_ids))})")
+                params.extend(int(x) for x in focus_ids)
+            for term in filter_terms:
+                conditions.append("(instr(i.content, ?) > 0 OR instr(i.source_title, ?) > 0 OR instr(i.refers, ?) > 0)")
+                params.extend([term, term, term])
+
+            if use_fts:
+                # 每个词作为短语，避免用户输入被解析成 FTS5 语法
+                match = " ".join('"' + t.replace('"', '""') + '"' for t in fts_terms)
+                extra = ''.join(f" AND {c}" for c in conditions)
+                sql = (
+                    f"SELECT {columns},"
+                    f" highlight(infos_fts, 0, ?, ?) AS content_highlight,"
+                    f" highlight(infos_fts, 1, ?, ?) AS source_title_highlight"
+                    f" FROM infos_fts JOIN infos i ON i.rowid = infos_fts.rowid"
+                    f" WHERE infos_fts MATCH ? AND infos_fts.rank MATCH 'bm25(10.0, 5.0, 1.0)'{extra}"
+                    f" ORDER BY infos_fts.rank, i.id LIMIT ? OFFSET ?"
+                )
+                sql_params = [open_tag, close_tag, open_tag, close_tag, match, *params, limit + 1, offset]
+            else:
+                if after:
+                    conditions.append("(i.created < ? OR (i.created = ? AND i.id < ?))")
+                    params.extend([after[1], after[1], after[2]])
+                where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+                sql = (
+                    f"SELECT {columns} FROM infos i{where}"
+                    f" ORDER BY i.created DESC, i.id DESC LIMIT ?"
+                )
+                sql_params = [*params, limit + 1]
+
+            async with db.execute(sql, sql_params) as cur:
+                colnames = [desc[0] for desc in cur.description]
+                return [dict(zip(colnames, row)) for row in await cur.fetchall()]
+
+        try:
+            rows = await self.execute_with_retry(_search)
+        except Exception as e:
+            self.logger.error(f"Error searching infos: {str(e)}")
+            return None
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            if use_fts:
+                next_cursor = self._encode_cursor([mode, offset + limit])
+            else:
+                next_cursor = self._encode_cursor([mode, rows[-1]['created'], rows[-1]['id']])
+        for row in rows:
+            if not use_fts:
+                row['content_highlight'] = self._highlight(row.get('content') or '', terms, open_tag, close_tag)
+                row['source_title_highlight'] = self._highlight(row.get('source_title') or '', terms, open_tag, close_tag)
+        return rows, next_cursor
+
+    @staticmethod
+    def _highlight(text: str, terms: List[str], open_tag: str, close_tag: str) -> str:
+        for term in sorted(set(terms), key=len, reverse=True):
+            text = text.replace(term, f"{open_tag}{term}{close_tag}")
+        return text
+
+    async def rebuild_info_search_index(self) -> bool:
+        """从 infos 全量重建 infos_fts（例如完整 VACUUM 之后）"""
+        if not self._fts_available:
+            return False
+
+        async def _rebuild(db):
+            await db.execute("INSERT INTO infos_fts(infos_fts) VALUES ('rebuild')")
+
+        try:
+            await self.execute_write(_rebuild)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error rebuilding info search index: {e}")
+            return False
+
     # ---------------------- tasks CRUD ----------------------
     def _validate_task_inputs(self, search: list | None, sources: list | None, time_slots: list | None) -> str | None:
         """校验任务字段值是否合法，非法返回错误信息字符串，合法返回 None"""
@@ -968,63 +1888,66 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             return None
 
     async def list_tasks(self, only_activated: bool = False) -> List[dict]:
-        result: List[dict] = []
-
         async def _list(db):
             base = "SELECT id, focuses, search, sources, activated, time_slots, title, status, errors, updated FROM tasks"
             query = base + (" WHERE activated = 1" if only_activated else "") + " ORDER BY id DESC"
             async with db.execute(query) as cursor:
                 rows = await cursor.fetchall()
                 cols = [d[0] for d in cursor.description]
-                for r in rows:
-                    item = dict(zip(cols, r))
-                    # 反序列化 JSON 字段
-                    focus_ids = self._deserialize_json(item.get('focuses', '[]'), default_as_list=True)
-                    item['search'] = self._deserialize_json(item.get('search', '[]'), default_as_list=True)
-                    sources = self._deserialize_json(item.get('sources', '[]'), default_as_list=True)
-                    item['time_slots'] = self._deserialize_json(item.get('time_slots', '[]'), default_as_list=True)
-                    
-                    # 规范化 sources：确保每个 source 的 detail 是列表格式（兼容旧数据）
-                    normalized_sources = []
-                    for src in sources:
-                        if not isinstance(src, dict):
-                            continue
-                        normalized_src = src.copy()
-                        detail = src.get('detail', [])
-                        # 如果是字符串，转换为列表；如果已经是列表，保持不变
-                        if isinstance(detail, str):
-                            normalized_src['detail'] = [detail] if detail else []
-                        elif not isinstance(detail, list):
-                            normalized_src['detail'] = []
-                        else:
-                            normalized_src['detail'] = detail
-                        normalized_sources.append(normalized_src)
-                    item['sources'] = normalized_sources
-                    
-                    # 转换布尔值字段
-                    item['activated'] = bool(item.get('activated', 1))
-                    
-                    # 处理 errors：用 '|' split 并转为 set
-                    errors = item.get('errors', '') or ''
-                    if errors:
-                        item['errors'] = errors.split('|')
-                    else:
-                        item['errors'] = []
-                    
-                    # 关联读取 focus 信息
-                    if focus_ids:      
-                        item['focuses'] = await self.get_focuses_by_ids(focus_ids)
+            tasks = [dict(zip(cols, r)) for r in rows]
+            task_focus_ids = [
+                sorted({int(fid) for fid in self._deserialize_json(t.get('focuses', '[]'), default_as_list=True)
+                        if str(fid).isdigit()})
+                for t in tasks
+            ]
+            # 所有 task 引用的 focus 在同一连接上一次查出，再按 task 拼装，避免每个 task 再占用一个连接
+            focus_map = await self._fetch_focuses_by_ids(
+                db, [fid for ids in task_focus_ids for fid in ids]
+            )
+            result: List[dict] = []
+            for item, focus_ids in zip(tasks, task_focus_ids):
+                item['search'] = self._deserialize_json(item.get('search', '[]'), default_as_list=True)
+                sources = self._deserialize_json(item.get('sources', '[]'), default_as_list=True)
+                item['time_slots'] = self._deserialize_json(item.get('time_slots', '[]'), default_as_list=True)
+                
+                # 规范化 sources：确保每个 source 的 detail 是列表格式（兼容旧数据）
+                normalized_sources = []
+                for src in sources:
+                    if not isinstance(src, dict):
+                        continue
+                    normalized_src = src.copy()
+                    detail = src.get('detail', [])
+                    # 如果是字符串，转换为列表；如果已经是列表，保持不变
+                    if isinstance(detail, str):
+                        normalized_src['detail'] = [detail] if detail else []
+                    elif not isinstance(detail, list):
+                        normalized_src['detail'] = []
                     else:
-                        item['focuses'] = []
-                    
-                    result.append(item)
+                        normalized_src['detail'] = detail
+                    normalized_sources.append(normalized_src)
+                item['sources'] = normalized_sources
+                
+                # 转换布尔值字段
+                item['activated'] = bool(item.get('activated', 1))
+                
+                # 处理 errors：用 '|' split 并转为 set
+                errors = item.get('errors', '') or ''
+                if errors:
+                    item['errors'] = errors.split('|')
+                else:
+                    item['errors'] = []
+                
+                # 关联 focus 信息（按 focus id 升序，已删除的 focus 跳过）
+                item['focuses'] = [focus_map[fid] for fid in focus_ids if fid in focus_map]
+                
+                result.append(item)
+            return result
 
         try:
-            await self.execute_with_retry(_list)
+            return await self.execute_with_retry(_list)
         except Exception as e:
             self.logger.error(f"Error listing tasks: {e}")
             return None
-        return result
 
     async def update_task(self, task_id: int, **fields) -> Optional[int]:
         """
@@ -1116,7 +2039,7 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             await db.execute(f"UPDATE tasks SET {set_clause} WHERE id = ?", params)
 
         try:
-            await self.execute_with_retry(_upd)
+            await self.execute_write(_upd)
             return task_id
         except Exception as e:
             self.logger.error(f"Error updating task {task_id}: {e}")
@@ -1455,31 +2378,36 @@ CREATE TABLE IF NOT EXISTS {table_name} (
         if not focus_ids:
             return []
             
-        result = []
-        
         async def _get_batch(db):
-            # 构建 IN 查询的占位符
-            placeholders = ','.join(['?' for _ in focus_ids])
+            focus_map = await self._fetch_focuses_by_ids(db, focus_ids)
+            return [focus_map[fid] for fid in sorted(focus_map)]
+
+        try:
+            return await self.execute_with_retry(_get_batch)
+        except Exception as e:
+            self.logger.error(f"Error getting focuses by ids {focus_ids}: {e}")
+            return None
+
+    @staticmethod
+    async def _fetch_focuses_by_ids(db, focus_ids: List[int]) -> Dict[int, dict]:
+        """在调用方已持有的连接上批量读取 focus，返回 {id: focus}；不要在这里再调用 execute_with_retry"""
+        unique_ids = list(dict.fromkeys(int(fid) for fid in focus_ids if fid is not None))
+        if not unique_ids:
+            return {}
+        result: Dict[int, dict] = {}
+        for i in range(0, len(unique_ids), 500):
+            chunk = unique_ids[i:i + 500]
+            placeholders = ','.join(['?'] * len(chunk))
             query = f"""
                 SELECT id, focuspoint, custom_schema, restrictions, explanation, role, purpose 
                 FROM focuses 
                 WHERE id IN ({placeholders})
             """
-            
-            async with db.execute(query, focus_ids) as cursor:
-                rows = await cursor.fetchall()
+            async with db.execute(query, chunk) as cursor:
                 columns = [desc[0] for desc in cursor.description]
-                
-                for row in rows:
+                for row in await cursor.fetchall():
                     focus_dict = dict(zip(columns, row))
-                    result.append(focus_dict)
-
-        try:
-            await self.execute_with_retry(_get_batch)
-        except Exception as e:
-            self.logger.error(f"Error getting focuses by ids {focus_ids}: {e}")
-            return None
-            
+                    result[focus_dict['id']] = focus_dict
         return result
 
     async def list_all_focuses(self) -> List[dict]:
@@ -1627,35 +2555,30 @@ CREATE TABLE IF NOT EXISTS {table_name} (
             return cursor.lastrowid
 
         try:
-            return await self.execute_with_retry(_add)
+            return await self.execute_write(_add)
         except Exception as e:
             self.logger.error(f"Error adding ws_history: {e}")
             return None
 
-    async def list_ws_history(self, limit: int = 10, offset: int = 0) -> List[dict]:
+    async def list_ws_history(self, limit: int = 10, offset: int = 0, max_age_hours: float = 24) -> List[dict]:
         """
-        按时间降序分页获取 ws_history 记录。读取前自动清理超过24小时的记录。
+        按时间降序分页获取 ws_history 中最近 max_age_hours 小时（与 WS_HISTORY_RETENTION_HOURS 一致）的记录。
+        过期记录由后台维护任务（prune_ws_history）删除，读取路径不做写操作。
         """
         result: List[dict] = []
 
-        async def _cleanup_and_list(db):
-            # 清理超过24小时的数据
-            cutoff_time = time.time() - 24 * 3600
-            try:
-                await db.execute("DELETE FROM ws_history WHERE ts < ?", (cutoff_time,))
-            except Exception as e:
-                # best-effort cleanup
-                self.logger.warning(f"Failed to cleanup ws_history: {e}")
-
+        async def _list(db):
+            cutoff_time = time.time() - max_age_hours * 3600
             query = (
                 """
                 SELECT type, prompt_id, code, params, actions, action_id, timeout, ts
                 FROM ws_history
+                WHERE ts >= ?
                 ORDER BY ts DESC
                 LIMIT ? OFFSET ?
                 """
             )
-            params = [limit, offset]
+            params = [cutoff_time, limit, offset]
             async with db.execute(query, params) as cursor:
                 rows = await cursor.fetchall()
                 cols = [d[0] for d in cursor.description]
@@ -1666,8 +2589,151 @@ CREATE TABLE IF NOT EXISTS {table_name} (
                     result.append(item)
 
         try:
-            await self.execute_with_retry(_cleanup_and_list)
+            await self.execute_with_retry(_list)
         except Exception as e:
             self.logger.error(f"Error listing ws_history: {e}")
             return None
         return result
+
+    # ---------------------- maintenance ----------------------
+    # 以下方法由 backend 的后台维护任务（core/backend/maintenance.py）定期调用，不要在请求处理路径中调用。
+    # 注意：不要对 data.db 执行完整 VACUUM（会重排 rowid，使 infos_fts 失效），确需执行时用 core.tools.db_admin。
+
+    async def checkpoint_wal(self, mode: str = 'PASSIVE') -> Optional[tuple]:
+        """
+        执行 WAL checkpoint，返回 (busy, wal 总页数, 已回写页数)，出错返回 None
+
+        PASSIVE 不等待读写，只回写能回写的部分；TRUNCATE 会等待读者让出并把 wal 文件截断为 0
+        """
+        mode = mode.upper()
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"Invalid checkpoint mode: {mode}")
+
+        try:
+            # 用独立的短连接执行：池中连接上残留的语句会让 TRUNCATE 一直等到 busy_timeout，且等待期间不占用连接池
+            async with aiosqlite.connect(self.db_path, timeout=30.0, isolation_level=None) as db:
+                await db.execute("PRAGMA busy_timeout = 5000")
+                async with db.execute(f"PRAGMA wal_checkpoint({mode})") as cursor:
+                    return tuple(await cursor.fetchone())
+        except Exception as e:
+            self.logger.warning(f"WAL checkpoint ({mode}) failed: {e}")
+            return None
+
+    def wal_size(self) -> int:
+        """当前 wal 文件字节数"""
+        try:
+            return os.path.getsize(f"{self.db_path}-wal")
+        except OSError:
+            return 0
+
+    async def optimize(self) -> bool:
+        """PRAGMA optimize：按查询历史对需要的表/索引做有限制的 ANALYZE，维持查询计划稳定"""
+        async def _optimize(db):
+            await db.execute("PRAGMA analysis_limit = 400")
+            await db.execute("PRAGMA optimize")
+
+        try:
+            # optimize 依据的是单个连接的查询历史，每个读连接与写连接各执行一次；
+            # 读连接逐个从池中取出，全部执行完再归还，保证不重复也不遗漏
+            taken = []
+            try:
+                for _ in range(len(self._connection_pool)):
+                    conn = await self._available_connections.get()
+                    taken.append(conn)
+                    await _optimize(conn)
+            finally:
+                for conn in taken:
+                    self._available_connections.put_nowait(conn)
+            await self.execute_write(_optimize)
+            return True
+        except Exception as e:
+            self.logger.warning(f"PRAGMA optimize failed: {e}")
+            return False
+
+    async def incremental_vacuum(self, max_pages: int = 2000) -> Optional[int]:
+        """
+        回收最多 max_pages 个空闲页，返回回收后的空闲页数；数据库未开启 auto_vacuum=INCREMENTAL 时返回 None
+
+        新建的 data.db 默认开启；旧库需停止 wiseflow 后执行 python -m core.tools.db_admin enable-incremental-vacuum
+        """
+        async def _vacuum(db):
+            async with db.execute("PRAGMA auto_vacuum") as cursor:
+                if (await cursor.fetchone())[0] != 2:
+                    return None
+            # 每 step 回收一页，必须取完结果
+            async with db.execute(f"PRAGMA incremental_vacuum({int(max_pages)})") as cursor:
+                await cursor.fetchall()
+            async with db.execute("PRAGMA freelist_count") as cursor:
+                return (await cursor.fetchone())[0]
+
+        try:
+            return await self.execute_write(_vacuum)
+        except Exception as e:
+            self.logger.warning(f"Incremental vacuum failed: {e}")
+            return None
+
+    async def prune_ws_history(self, max_age_hours: float = 24) -> Optional[int]:
+        """删除超过 max_age_hours 的 ws_history 记录，返回删除条数"""
+        async def _prune(db):
+            cursor = await db.execute("DELETE FROM ws_history WHERE ts < ?", (time.time() - max_age_hours * 3600,))
+            return cursor.rowcount
+
+        try:
+            return await self.execute_write(_prune)
+        except Exception as e:
+            self.logger.warning(f"Failed to prune ws_history: {e}")
+            return None
+
+    async def archive_infos(self, before: str, archive_dir: Path, batch_size: int = 2000) -> int:
+        """
+        把 created 早于 before 的 infos 按月份移入 archive_dir/infos_YYYY-MM.db，返回移动的条数
+
+        使用独立连接 ATTACH 月度库（单写者连接总在事务中，不能 ATTACH），每批一个短事务，
+        删除会触发 infos_fts / focus_stats 的同步触发器。
+        """
+        archive_dir = Path(archive_dir)
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        columns = ", ".join(self.TABLE_SCHEMAS['infos'].keys())
+        moved = 0
+        async with aiosqlite.connect(self.db_path, timeout=30.0, isolation_level=None) as db:
+            await db.execute("PRAGMA busy_timeout = 5000")
+            async with db.execute(
+                "SELECT DISTINCT substr(created, 1, 7) FROM infos WHERE created < ? ORDER BY 1", (before,)
+            ) as cursor:
+                months = [row[0] for row in await cursor.fetchall() if row[0] and len(row[0]) == 7]
+
+            for month in months:
+                await db.execute("ATTACH DATABASE ? AS arc", (str(archive_dir / f"infos_{month}.db"),))
+                try:
+                    await db.execute(self._generate_create_table_sql('arc.infos', self.TABLE_SCHEMAS['infos']))
+                    while True:
+                        await db.execute("BEGIN IMMEDIATE")
+                        try:
+                            await db.execute(
+                                "CREATE TEMP TABLE IF NOT EXISTS archive_batch (rid INTEGER PRIMARY KEY)")
+                            await db.execute("DELETE FROM temp.archive_batch")
+                            await db.execute(
+                                "INSERT INTO temp.archive_batch SELECT rowid FROM main.infos"
+                                " WHERE created < ? AND substr(created, 1, 7) = ? LIMIT ?",
+                                (before, month, batch_size),
+                            )
+                            await db.execute(
+                                f"INSERT OR IGNORE INTO arc.infos ({columns}) SELECT {columns} FROM main.infos"
+                                " WHERE rowid IN (SELECT rid FROM temp.archive_batch)"
+                            )
+                            cursor = await db.execute(
+                                "DELETE FROM main.infos WHERE rowid IN (SELECT rid FROM temp.archive_batch)")
+                            count = cursor.rowcount
+                            await db.execute("COMMIT")
+                        except Exception:
+                            await db.execute("ROLLBACK")
+                            raise
+                        moved += count
+                        if count < batch_size:
+                            break
+                        # 让出写锁给单写者
+                        await asyncio.sleep(0)
+                finally:
+                    await db.execute("DETACH DATABASE arc")
+                self.logger.info(f"Archived infos of {month} to {archive_dir / f'infos_{month}.db'}")
+        return moved
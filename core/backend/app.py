@@ -1,14 +1,23 @@
+import io
+import csv
 import json
+import zlib
 import asyncio
+import time
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from .ws import hub, PromptBus, PingManager
+from .maintenance import DatabaseMaintenance
+from .responses import FastJSONResponse, SelectiveGZipMiddleware, etag_response
 import os
 # 导入数据库管理器
 from core.async_database import AsyncDatabaseManager
+from core.tools.metrics import registry as metrics_registry, read_snapshots, render as render_metrics
 from .config import *
 
 
@@ -17,17 +26,19 @@ async def lifespan(app: FastAPI):
     # Initialize resources
     try:
         await db_manager.initialize()
+        db_maintenance.start()
         yield
     except asyncio.CancelledError:
         # Suppress noisy cancellation during Ctrl+C shutdown
         pass
     finally:
+        await db_maintenance.stop()
         try:
             await db_manager.cleanup()
         except Exception as e:
             logger.warning(f"Error during database cleanup: {e}")
 
-app = FastAPI(title="wiseflow backend", lifespan=lifespan)
+app = FastAPI(title="wiseflow backend", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # CORS 中间件
 app.add_middleware(
@@ -38,6 +49,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩：小于 1KB 的响应不压缩；后端多在本机访问，用最低压缩级别节省 CPU；
+# export_info 是文件下载，自带 gzip 选项，不经过压缩中间件
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, compresslevel=1, exclude_paths=["/export_info"])
+
 # 添加私有网络访问支持（解决从 HTTPS 访问本地地址的问题）
 # Chrome 114+ 全面实施了私有网络访问（PNA）策略，要求从 HTTPS 站点访问本地地址（如 127.0.0.1）
 # 时，服务器必须明确返回 Access-Control-Allow-Private-Network: true 响应头
@@ -53,6 +68,8 @@ async def add_pna_header(request: Request, call_next):
 
 # 创建数据库管理器实例
 db_manager = AsyncDatabaseManager(logger=logger)
+# data.db 后台维护（checkpoint / optimize / 清理 / 归档），随 lifespan 启停
+db_maintenance = DatabaseMaintenance.from_config(db_manager, logger, config)
 # 让 prompt_bus 能够直接写库
 prompt_bus = PromptBus(hub, db_manager=db_manager)
 ping_manager = PingManager(hub)
@@ -62,6 +79,8 @@ class APIResponse(BaseModel):
     success: bool
     msg: str
     data: Any = None
+    # 分页接口的下一页游标，原样回传即可翻页；为空表示没有更多数据
+    cursor: Optional[str] = None
 
 
 # 请求模型
@@ -155,6 +174,10 @@ class UserNotifyRequest(BaseModel):
     timeout: int = 30
 
 
+class UserNotifyBatchRequest(BaseModel):
+    items: List[UserNotifyRequest] = []
+
+
 class UserPromptRequest(BaseModel):
     code: int
     params: List[str] = []
@@ -165,12 +188,17 @@ class UserPromptRequest(BaseModel):
 class FrontendPingRequest(BaseModel):
     timeout: Optional[int] = 3
 
+
+class InfoAddedRequest(BaseModel):
+    # focus_id -> {"count": 新增条数, "ids": 部分新增 info id}
+    focuses: Dict[int, Dict[str, Any]] = {}
+
 # 2. list_task
 @app.get("/list_task")
-async def list_task():
+async def list_task(request: Request):
     tasks = await db_manager.list_tasks()
     if tasks is not None:
-        return APIResponse(success=True, msg="", data=tasks)
+        return etag_response(request, APIResponse(success=True, msg="", data=tasks))
     else:
         return APIResponse(success=False, msg="获取任务列表失败", data=[])
 
@@ -277,20 +305,22 @@ async def clear_task_errors(task_id: int):
 
 # 7. read_focus
 @app.get("/read_focus")
-async def read_focus():
+async def read_focus(request: Request):
     focuses = await db_manager.list_all_focuses()
     if focuses is not None:
-        return APIResponse(success=True, msg="", data=focuses)
+        return etag_response(request, APIResponse(success=True, msg="", data=focuses))
     else:
         return APIResponse(success=False, msg="获取 focus 列表失败", data=[])
 
 # 8. list_info
 @app.get("/list_info")
-async def list_info(start_time: Optional[str] = None, max_items_per_focus: int = 0):
+async def list_info(request: Request, start_time: Optional[str] = None, max_items_per_focus: int = 0,
+                    cursor: Optional[str] = None):
     """
     按所有 focus_id 分组返回 start_time 之后的最新信息；
     每个 focus 最多返回 max_items_per_focus 条（<=0 时默认最多 12 条）。
     start_time 建议使用 ISO 8601 UTC（如 2025-01-01T00:00:00Z）。
+    cursor 为上一次响应中的游标，用于继续读取每个 focus 更早的信息。
     """
     focuses = await db_manager.list_all_focuses()
     if focuses is None:
@@ -300,21 +330,24 @@ async def list_info(start_time: Optional[str] = None, max_items_per_focus: int =
 
     # 1) 批量查询所有 focus 的信息，按每个 focus 限制数量
     focus_ids = [int(f.get("id")) for f in focuses if f.get("id") is not None]
-    infos = await db_manager.filter_infos(
+    page = await db_manager.page_infos(
         focus_ids=focus_ids,
         start_time=(start_time or None),
         limit=per_focus_limit,
-        offset=0,
+        cursor=cursor,
     )
+    if page is None:
+        return APIResponse(success=False, msg="查询信息失败", data={})
+    infos, next_cursor = page
 
     # 2) 组装为 { focus_id: [infos...] }，保证所有 focus_id 都存在键
     grouped: Dict[int, list] = {fid: [] for fid in focus_ids}
-    for item in infos or []:
+    for item in infos:
         fid = item.get("focus_id")
         if isinstance(fid, int) and fid in grouped:
             grouped[fid].append(item)
 
-    return APIResponse(success=True, msg="", data=grouped)
+    return etag_response(request, APIResponse(success=True, msg="", data=grouped, cursor=next_cursor))
 
 # 9. del_info
 @app.delete("/del_info")
@@ -328,7 +361,7 @@ async def del_info(info_id: str):
 
 # 10. info_stat
 @app.get("/info_stat")
-async def info_stat(focus_id: Optional[int] = None):
+async def info_stat(request: Request, focus_id: Optional[int] = None):
     """
     统计 infos 数量，按 focus_id 分组
     如果提供 focus_id，则只返回该 focus_id 的数量
@@ -337,10 +370,22 @@ async def info_stat(focus_id: Optional[int] = None):
     """
     result = await db_manager.count_infos_by_focus(focus_id=focus_id)
     if result is not None:
-        return APIResponse(success=True, msg="", data=result)
+        return etag_response(request, APIResponse(success=True, msg="", data=result))
     else:
         return APIResponse(success=False, msg="统计信息失败", data={})
 
+# 10.1 info_daily_stat
+@app.get("/info_daily_stat")
+async def info_daily_stat(request: Request, focus_id: Optional[int] = None, days: int = 30):
+    """
+    返回每个 focus 的 infos 总数、最新 created 以及最近 days 天（UTC）的按天计数
+    返回格式：{focus_id: {"count": int, "last_created": str, "daily": {"YYYY-MM-DD": int}}}
+    """
+    result = await db_manager.get_focus_stats(focus_id=focus_id, days=min(max(days, 1), 366))
+    if result is None:
+        return APIResponse(success=False, msg="统计信息失败", data={})
+    return etag_response(request, APIResponse(success=True, msg="", data=result))
+
 # 11. read_info
 class ReadInfoRequest(BaseModel):
     focuses: Optional[List[int]] = None
@@ -350,6 +395,10 @@ class ReadInfoRequest(BaseModel):
     end_time: Optional[str] = None
     source_url: Optional[str] = None
     info_id: Optional[str] = None
+    # 上一次响应中的游标；推荐用游标翻页，offset 仅为兼容保留（翻页越深越慢）
+    cursor: Optional[str] = None
+    # 增量读取：info_added 事件或上一次增量响应中的 since；传空字符串只返回当前位置
+    since: Optional[str] = None
 
 
 @app.post("/read_info")
@@ -357,7 +406,34 @@ async def read_info(request: ReadInfoRequest):
     """
     按条件读取 infos：支持 focus 列表、时间范围、分页。
     返回符合条件的 infos 列表（按 created 降序）。
+    不带 info_id / offset 时按游标分页，响应中的 cursor 用于请求下一页。
+    带 since 时改为增量读取（按写入顺序），响应中的 cursor 作为下一次的 since。
     """
+    if request.since is not None:
+        result = await db_manager.read_infos_since(
+            request.since or None,
+            focus_ids=request.focuses or None,
+            limit=(request.limit if request.limit is not None else 200),
+        )
+        if result is None:
+            return FastJSONResponse(APIResponse(success=False, msg="查询信息失败", data=[]))
+        infos, next_since = result
+        return FastJSONResponse(APIResponse(success=True, msg="", data=infos, cursor=next_since))
+
+    if not request.info_id and not request.offset:
+        page = await db_manager.page_infos(
+            focus_ids=request.focuses or None,
+            source_url=(request.source_url or None),
+            start_time=(request.start_time or None),
+            end_time=(request.end_time or None),
+            limit=(request.limit if request.limit is not None else 20),
+            cursor=request.cursor,
+        )
+        if page is None:
+            return FastJSONResponse(APIResponse(success=False, msg="查询信息失败", data=[]))
+        infos, next_cursor = page
+        return FastJSONResponse(APIResponse(success=True, msg="", data=infos, cursor=next_cursor))
+
     infos = await db_manager.filter_infos(
         source_url=(request.source_url or None),
         id=(request.info_id or None),
@@ -368,9 +444,100 @@ async def read_info(request: ReadInfoRequest):
         offset=(request.offset if request.offset is not None else 0),
     )
     if infos is not None:
-        return APIResponse(success=True, msg="", data=infos)
+        return FastJSONResponse(APIResponse(success=True, msg="", data=infos))
     else:
-        return APIResponse(success=False, msg="查询信息失败", data=[])
+        return FastJSONResponse(APIResponse(success=False, msg="查询信息失败", data=[]))
+
+# 11.1 search_info
+class SearchInfoRequest(BaseModel):
+    query: str
+    focuses: Optional[List[int]] = None
+    limit: Optional[int] = 20
+    cursor: Optional[str] = None
+
+
+@app.post("/search_info")
+async def search_info(request: SearchInfoRequest):
+    """
+    全文检索 infos（content / source_title / refers），空格分隔多个词（AND），按相关度排序。
+    每条结果附带 content_highlight / source_title_highlight（命中处以 <mark></mark> 标记）。
+    翻页：把响应中的 cursor 放入下一次请求，cursor 为空表示没有更多结果。
+    """
+    if not request.query or not request.query.strip():
+        return FastJSONResponse(APIResponse(success=False, msg="检索词不能为空", data=[]))
+    result = await db_manager.search_infos(
+        request.query,
+        focus_ids=request.focuses or None,
+        limit=(request.limit if request.limit is not None else 20),
+        cursor=request.cursor,
+    )
+    if result is None:
+        return FastJSONResponse(APIResponse(success=False, msg="检索信息失败", data=[]))
+    infos, next_cursor = result
+    return FastJSONResponse(APIResponse(success=True, msg="", data=infos, cursor=next_cursor))
+
+# 11.2 export_info
+EXPORT_COLUMNS = ["id", "type", "content", "focus_statement", "focus_id", "source_url", "source_title", "refers", "created"]
+
+
+def _encode_export_batch(rows: List[dict], fmt: str, header: bool) -> bytes:
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+        return buf.getvalue().encode("utf-8")
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+
+@app.get("/export_info")
+async def export_info(format: str = "ndjson",
+                      focuses: Optional[List[int]] = Query(None),
+                      types: Optional[List[str]] = Query(None),
+                      start_time: Optional[str] = None,
+                      end_time: Optional[str] = None,
+                      gzip: bool = False):
+    """
+    流式导出 infos（按 created 升序），format 为 ndjson 或 csv；gzip=true 时输出 .gz 文件。
+    分批读取、编码、发送，内存占用与导出条数无关；编码和压缩在线程中执行，不阻塞事件循环。
+    """
+    fmt = format.lower()
+    if fmt not in ("ndjson", "csv"):
+        return APIResponse(success=False, msg="format 只能是 ndjson 或 csv", data=None)
+
+    async def _stream():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+        batches = db_manager.iter_infos(focus_ids=focuses or None, start_time=(start_time or None),
+                                        end_time=(end_time or None), types=types or None)
+        header = True
+        try:
+            async for rows in batches:
+                chunk = await asyncio.to_thread(_encode_export_batch, rows, fmt, header)
+                header = False
+                if compressor:
+                    chunk = await asyncio.to_thread(compressor.compress, chunk)
+                if chunk:
+                    yield chunk
+            if header and fmt == "csv":
+                # 没有数据时仍输出表头
+                chunk = _encode_export_batch([], fmt, True)
+                yield compressor.compress(chunk) if compressor else chunk
+            if compressor:
+                yield compressor.flush()
+        except Exception as e:
+            # 响应头已发出，只能记录并提前结束
+            logger.error(f"Error exporting infos: {e}")
+        finally:
+            await batches.aclose()
+
+    filename = f"infos-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.{fmt}"
+    media_type = "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(_stream(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 # 12-15. local_proxies CRUD
 @app.get("/list_local_proxies")
@@ -499,6 +666,13 @@ async def user_notify(request: UserNotifyRequest):
     await prompt_bus.notify(request.code, request.params, request.timeout)
     return {"success": True}
 
+@app.post("/user_notify_batch")
+async def user_notify_batch(request: UserNotifyBatchRequest):
+    # 任务进程合并发送的通知，按顺序推送
+    for item in request.items:
+        await prompt_bus.notify(item.code, item.params, item.timeout)
+    return {"success": True}
+
 @app.post("/user_prompt")
 async def user_prompt(request: UserPromptRequest):
     result = await prompt_bus.request(
@@ -509,6 +683,20 @@ async def user_prompt(request: UserPromptRequest):
     )
     return {"result": result}
 
+@app.post("/info_added")
+async def info_added(request: InfoAddedRequest):
+    """任务进程推送的新增 infos（已按 focus 合并），广播给前端；since 可直接用于 read_info 增量读取"""
+    focuses = {
+        str(fid): {"count": int(entry.get("count") or 0), "ids": list(entry.get("ids") or [])}
+        for fid, entry in request.focuses.items()
+    }
+    if not focuses:
+        return {"success": True}
+    ids = [info_id for entry in focuses.values() for info_id in entry["ids"]]
+    since = await db_manager.since_cursor_before(ids)
+    await hub.broadcast({"type": "info_added", "focuses": focuses, "since": since, "ts": time.time()})
+    return {"success": True}
+
 @app.post("/ws_ping")
 async def ws_ping(request: FrontendPingRequest):
     timeout = request.timeout if request.timeout is not None else 3
@@ -518,13 +706,24 @@ async def ws_ping(request: FrontendPingRequest):
 
 # 28. ws_history
 @app.get("/ws_history")
-async def ws_history(limit: int = 10, offset: int = 0):
-    records = await db_manager.list_ws_history(limit=limit, offset=offset)
+async def ws_history(request: Request, limit: int = 10, offset: int = 0):
+    records = await db_manager.list_ws_history(limit=limit, offset=offset,
+                                               max_age_hours=config.get('WS_HISTORY_RETENTION_HOURS', 24))
     if records is not None:
-        return APIResponse(success=True, msg="", data=records)
+        return etag_response(request, APIResponse(success=True, msg="", data=records))
     else:
         return APIResponse(success=False, msg="获取消息历史失败", data=[])
 
+# 29. metrics
+WS_CONNECTIONS = metrics_registry.gauge("wiseflow_ws_connections", "当前 WebSocket 连接数")
+
+@app.get("/metrics")
+async def metrics():
+    WS_CONNECTIONS.set(len(hub.connections))
+    # 后端自身的指标 + 任务进程写入的快照
+    snapshots = [metrics_registry.snapshot("backend")] + read_snapshots(exclude=["backend"])
+    return PlainTextResponse(render_metrics(snapshots), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.websocket("/ws")
 async def ws_endpoint(ws: WebSocket):
     await hub.connect(ws)
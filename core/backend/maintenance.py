@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from core.async_database import AsyncDatabaseManager, base_directory
+
+
+class DatabaseMaintenance:
+    """Periodic data.db housekeeping, started from the backend lifespan.
+
+    Every tick runs whichever jobs are due:
+    - WAL checkpoint: PASSIVE on each interval, TRUNCATE once the -wal file exceeds wal_truncate_mb
+    - PRAGMA optimize
+    - incremental vacuum (only if the database was created with auto_vacuum=INCREMENTAL)
+    - ws_history pruning
+    - optional archival of old infos into monthly databases
+
+    Jobs never run inside request handlers and a failing job only logs a warning.
+    A full VACUUM is deliberately never run here: it renumbers rowids, which the
+    infos_fts index depends on (see core.tools.db_admin).
+    """
+
+    def __init__(self, db: AsyncDatabaseManager, logger, *,
+                 checkpoint_interval_minutes: float = 5,
+                 wal_truncate_mb: float = 64,
+                 optimize_interval_hours: float = 6,
+                 ws_history_retention_hours: float = 24,
+                 info_archive_after_days: int = 0,
+                 archive_dir: Optional[Path] = None,
+                 tick_seconds: float = 60,
+                 startup_delay_seconds: float = 60) -> None:
+        self.db = db
+        self.logger = logger
+        self.checkpoint_interval = max(checkpoint_interval_minutes, 0.1) * 60
+        self.wal_truncate_bytes = int(wal_truncate_mb * 1024 * 1024)
+        self.optimize_interval = max(optimize_interval_hours, 0.1) * 3600
+        self.ws_history_retention_hours = ws_history_retention_hours
+        self.info_archive_after_days = info_archive_after_days
+        self.archive_dir = Path(archive_dir) if archive_dir else base_directory / "archive"
+        self.tick_seconds = tick_seconds
+        self.startup_delay_seconds = startup_delay_seconds
+        # housekeeping jobs (vacuum, pruning, archival) run at most hourly
+        self.housekeeping_interval = 3600
+        self._last_run = {"checkpoint": 0.0, "optimize": 0.0, "housekeeping": 0.0}
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, db: AsyncDatabaseManager, logger, config: dict) -> "DatabaseMaintenance":
+        return cls(
+            db, logger,
+            checkpoint_interval_minutes=config.get('DB_CHECKPOINT_INTERVAL_MINUTES', 5),
+            wal_truncate_mb=config.get('DB_WAL_TRUNCATE_MB', 64),
+            optimize_interval_hours=config.get('DB_OPTIMIZE_INTERVAL_HOURS', 6),
+            ws_history_retention_hours=config.get('WS_HISTORY_RETENTION_HOURS', 24),
+            info_archive_after_days=config.get('INFO_ARCHIVE_AFTER_DAYS', 0),
+        )
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name="DatabaseMaintenance")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        await asyncio.sleep(self.startup_delay_seconds)
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.tick_seconds)
+
+    def _due(self, job: str, interval: float, now: float) -> bool:
+        if now - self._last_run[job] < interval:
+            return False
+        self._last_run[job] = now
+        return True
+
+    async def run_once(self, now: Optional[float] = None) -> None:
+        """Run every job that is due at `now` (defaults to the current time)."""
+        now = time.time() if now is None else now
+
+        if self._due("housekeeping", self.housekeeping_interval, now):
+            pruned = await self.db.prune_ws_history(self.ws_history_retention_hours)
+            if pruned:
+                self.logger.debug(f"pruned {pruned} ws_history rows")
+            await self._archive_infos()
+            await self.db.incremental_vacuum()
+
+        if self._due("optimize", self.optimize_interval, now):
+            await self.db.optimize()
+
+        # checkpoint last so that it also covers the writes above;
+        # a WAL that has grown past the limit is truncated on the next tick, regardless of the interval
+        oversized = self.wal_truncate_bytes > 0 and self.db.wal_size() > self.wal_truncate_bytes
+        if oversized or self._due("checkpoint", self.checkpoint_interval, now):
+            await self._checkpoint("TRUNCATE" if oversized else "PASSIVE")
+
+    async def _checkpoint(self, mode: str) -> None:
+        result = await self.db.checkpoint_wal(mode)
+        if result is None:
+            return
+        busy, log_pages, checkpointed = result
+        if mode == "TRUNCATE" or busy:
+            self.logger.info(f"WAL checkpoint {mode}: busy={busy}, wal pages={log_pages}, checkpointed={checkpointed}")
+
+    async def _archive_infos(self) -> None:
+        if self.info_archive_after_days <= 0:
+            return
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.info_archive_after_days)
+        before = cutoff.isoformat().replace('+00:00', 'Z')
+        try:
+            moved = await self.db.archive_infos(before, self.archive_dir)
+        except Exception as e:
+            self.logger.warning(f"Archiving infos failed: {e}")
+            return
+        if moved:
+            self.logger.info(f"archived {moved} infos created before {before} to {self.archive_dir}")
@@ -0,0 +1,90 @@
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, with orjson when it is installed."""
+    if isinstance(content, BaseModel):
+        content = content.model_dump()
+    if orjson is not None:
+        try:
+            # int dict keys (e.g. {focus_id: count}) become strings, as with the stdlib encoder
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. integers beyond 64 bit; take the slow path
+            pass
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by `dumps`.
+
+    Used as the app's default response class. Endpoints returning large payloads
+    should return it directly, so FastAPI's jsonable_encoder pass is skipped too.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def etag_response(request: Request, content: Any) -> Response:
+    """JSON response carrying a strong ETag of its body; 304 when If-None-Match matches.
+
+    For GET list endpoints the frontend polls: an unchanged payload is neither sent
+    nor parsed again. Browsers revalidate automatically thanks to Cache-Control: no-cache.
+    """
+    body = dumps(content)
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that passes the given paths through untouched.
+
+    Streaming downloads that compress themselves (export_info?gzip=true) must not be compressed
+    a second time; whether the stock middleware skips them depends on the starlette version.
+    """
+
+    def __init__(self, app, exclude_paths=(), **kwargs) -> None:
+        super().__init__(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -1,39 +1,142 @@
 import asyncio
-import json
+import copy
 import time
 import uuid
-from typing import Dict, Set, Optional, List
+from collections import deque
+from typing import Deque, Dict, Optional, List
 from fastapi import WebSocket
+from core.tools.metrics import registry as metrics_registry
+from .responses import dumps
+
+
+# message types that must reach the client; everything else may be dropped or merged under backpressure
+CRITICAL_TYPES = {"prompt", "prompt_resolved"}
+# info_added events keep at most this many ids per focus after merging
+INFO_ADDED_MAX_IDS = 50
+
+WS_DROPPED = metrics_registry.counter("wiseflow_ws_dropped_messages_total", "因客户端积压被丢弃的 WebSocket 消息数")
+
+
+class _Outbox:
+    """Bounded outbound queue and writer task for one WebSocket connection.
+
+    A `notify` identical to a pending one replaces it and `info_added` events are
+    merged into the pending one; when the queue is full the oldest non-critical
+    message is dropped. A client that cannot keep up even with critical messages, or whose
+    send stalls longer than `send_timeout`, is disconnected; it can catch up
+    through /ws_history and read_info(since=...) after reconnecting.
+    """
+
+    def __init__(self, hub: "WSHub", ws: WebSocket, max_size: int, send_timeout: float) -> None:
+        self.hub = hub
+        self.ws = ws
+        self.max_size = max_size
+        self.send_timeout = send_timeout
+        self.queue: Deque[dict] = deque()
+        self.overflowed = False
+        self._wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run(), name="WSOutbox")
+
+    def put(self, data: dict) -> bool:
+        """Enqueue without waiting; returns False if the connection has to be dropped."""
+        msg_type = data.get("type")
+        if msg_type == "info_added":
+            for pending in self.queue:
+                if pending.get("type") == "info_added":
+                    _merge_info_added(pending, data)
+                    return True
+            data = copy.deepcopy(data)
+        elif msg_type == "notify":
+            for i, pending in enumerate(self.queue):
+                if (pending.get("type") == "notify" and pending.get("code") == data.get("code")
+                        and pending.get("params") == data.get("params")):
+                    self.queue[i] = data
+                    return True
+
+        if len(self.queue) >= self.max_size and not self._drop_oldest():
+            # the writer task closes the connection
+            self.overflowed = True
+            self._wakeup.set()
+            return False
+        self.queue.append(data)
+        self._wakeup.set()
+        return True
+
+    def _drop_oldest(self) -> bool:
+        for i, pending in enumerate(self.queue):
+            if pending.get("type") not in CRITICAL_TYPES:
+                del self.queue[i]
+                self.hub.dropped_messages += 1
+                WS_DROPPED.inc()
+                return True
+        return False
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                while not self.queue and not self.overflowed:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if self.overflowed:
+                    raise OverflowError("outbound queue full of critical messages")
+                message = dumps(self.queue.popleft()).decode("utf-8")
+                await asyncio.wait_for(self.ws.send_text(message), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # send failed, stalled or overflowed: forget the connection, the receive loop will notice the close
+            self.hub.connections.pop(self.ws, None)
+            try:
+                await asyncio.wait_for(self.ws.close(), timeout=1)
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+
+def _merge_info_added(pending: dict, data: dict) -> None:
+    for fid, entry in (data.get("focuses") or {}).items():
+        merged = pending["focuses"].setdefault(fid, {"count": 0, "ids": []})
+        merged["count"] += entry.get("count", 0)
+        merged["ids"] = (merged["ids"] + list(entry.get("ids") or []))[:INFO_ADDED_MAX_IDS]
+    # the earlier cursor also covers the infos of the later event
+    pending["since"] = pending.get("since") or data.get("since")
+    pending["ts"] = data.get("ts", pending.get("ts"))
 
 
 class WSHub:
     """Simple broadcast hub for single-user local app.
 
-    Holds active WebSocket connections and supports broadcast to all.
+    Holds active WebSocket connections and supports broadcast to all. Every
+    connection has its own bounded queue and writer task, so broadcast never
+    waits for a client and a slow browser tab cannot stall the others.
     """
 
-    def __init__(self) -> None:
-        self.connections: Set[WebSocket] = set()
-        self._lock = asyncio.Lock()
+    def __init__(self, max_queue_size: int = 256, send_timeout: float = 10.0) -> None:
+        self.connections: Dict[WebSocket, _Outbox] = {}
+        self.max_queue_size = max_queue_size
+        self.send_timeout = send_timeout
+        self.dropped_messages = 0
 
     async def connect(self, ws: WebSocket) -> None:
         await ws.accept()
-        async with self._lock:
-            self.connections.add(ws)
+        self.connections[ws] = _Outbox(self, ws, self.max_queue_size, self.send_timeout)
 
     async def disconnect(self, ws: WebSocket) -> None:
-        async with self._lock:
-            self.connections.discard(ws)
+        outbox = self.connections.pop(ws, None)
+        if outbox:
+            await outbox.close()
 
     async def broadcast(self, data: dict) -> None:
-        message = json.dumps(data, ensure_ascii=False)
-        async with self._lock:
-            conns = list(self.connections)
-        for ws in conns:
-            try:
-                await ws.send_text(message)
-            except Exception:
-                await self.disconnect(ws)
+        for ws, outbox in list(self.connections.items()):
+            if not outbox.put(data):
+                self.connections.pop(ws, None)
 
 
 hub = WSHub()
@@ -13,6 +13,7 @@ from core.async_database import AsyncDatabaseManager
 from core.wis.config import config
 from core.tools.general_utils import Recorder
 from core.wis.ws_connect import notify_user
+from core.tools.tracing import traced, current_span
 # from tools.existing_manage import get_existings_for_focus, save_existings_for_focus
 
 def wrap_task(coro, meta):
@@ -26,6 +27,7 @@ def wrap_task(coro, meta):
 
 # 理论上 general_process 要捕获并处理所有错误，因为这一层都是批处理多个信源，不能因为某个信源的错误就放弃其他信源了，除非是来自用户设置层面的错误，并且这个错误预计下一次执行还会发生，此时设置任务执行状态为 2
 # 如果存在着与用户设置相关，但是并不妨碍走下去的错误，应该将错误的 task_error_code 放入 warning_msg 中，然后将任务执行状态 设置为 1
+@traced("focus")
 async def main_process(focus: dict, 
                        sources: list[dict],
                        search: list[str],
@@ -40,6 +42,7 @@ async def main_process(focus: dict,
     # 0. prepare the work
     focuspoint = focus["focuspoint"].strip()
     focus_name = f"#{focus['id']} {focuspoint}"
+    current_span().set(focus_id=focus['id'], focus=focuspoint)
     limit_hours = 24 if (config['WEB_ARTICLE_TTL'] == 1 or config['SocialMedia_TTL'] == 1) else limit_hours
 
     wis_logger.info(f'new job initializing: {focus_name}, limit_hours: {limit_hours}')
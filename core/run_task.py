@@ -4,8 +4,11 @@ from core.warm_up import prepare_to_work
 from core.wis import SqliteCache, MAIN_CACHE_FILE
 from datetime import datetime, timezone
 from core.async_logger import wis_logger
-from core.wis.ws_connect import notify_user, notify_user_sync, ask_user
+from core.wis.ws_connect import notify_user, notify_user_sync, ask_user, InfoAddedPublisher, close_backend_channel
 from core.async_database import AsyncDatabaseManager
+from core.tools.metrics import start_file_exporter
+from core.tools import tracing
+from core.tools.profiling import maybe_profile
 import copy, random
 from core.wis.config import load_runtime_overrides, config
 import time, sys
@@ -65,13 +68,19 @@ def calculate_limit_hours(updated_str: str) -> int:
 
 async def execute_time_slot_tasks(time_slot: str):
     """执行指定时间段的任务，每次都重新初始化所有资源"""
-    db_manager = cache_manager = None
+    db_manager = cache_manager = info_publisher = slot_span = None
     crawlers = {}
     try:
+        # 0. 链路追踪：本时段所有 span 属于同一个 trace，用 python -m core.tools.tracing summarize 分析
+        slot_span = tracing.start_span("time_slot", slot=time_slot)
+
         # 1. 初始化资源
         db_manager = AsyncDatabaseManager(logger=wis_logger)
         await db_manager.initialize()
-        
+        # 新写入的 infos 合并后推送给前端
+        info_publisher = InfoAddedPublisher()
+        db_manager.add_info_listener(info_publisher)
+
         # 2. 获取任务并分析所需平台
         all_tasks = await db_manager.list_tasks(only_activated=True)
         date_str = datetime.now().strftime("%Y-%m-%d")
@@ -144,10 +153,22 @@ async def execute_time_slot_tasks(time_slot: str):
         
         # 4. work prepare, user account check/initialize crawlers/execute pre-login
         crawlers = {platform: None for platform in required_platforms}
-        cache_manager = SqliteCache(db_path=MAIN_CACHE_FILE, default_namespace='articles')
-        await cache_manager.open()
-
         load_runtime_overrides()
+
+        # write-behind: 50ms 内的缓存写入合并为一次提交，高并发时段避免逐条 commit/fsync
+        cache_manager = SqliteCache(
+            db_path=MAIN_CACHE_FILE,
+            default_namespace='articles',
+            write_behind_ms=50,
+            max_total_bytes=config['CACHE_MAX_SIZE_MB'] * 1024 * 1024,
+            namespace_max_bytes={ns: int(mb) * 1024 * 1024 for ns, mb in config['CACHE_NAMESPACE_MAX_SIZE_MB'].items()},
+            eviction_policy=config['CACHE_EVICTION_POLICY'],
+            compression=config['CACHE_COMPRESSION'],
+            compression_level=config['CACHE_COMPRESSION_LEVEL'],
+            zstd_dict_namespaces=config['CACHE_ZSTD_DICT_NAMESPACES'],
+            stale_grace_minutes=config['CACHE_STALE_GRACE_MINUTES'],
+        )
+        await cache_manager.open()
         
         try:
             await prepare_to_work(db_manager, cache_manager, crawlers)
@@ -243,8 +264,12 @@ async def execute_time_slot_tasks(time_slot: str):
         await ask_user(199, [str(e)])
     
     finally:
-        # 7. 清理资源
+        # 7. 清理资源（先发出尚未推送的 info_added 事件）
+        if info_publisher:
+            await info_publisher.aclose()
         await graceful_shutdown(crawlers, db_manager, cache_manager)
+        if slot_span:
+            slot_span.end()
 
 async def process_single_result(result, task_job_count, db_manager):
     """处理单个任务的结果"""
@@ -302,7 +327,7 @@ def run_time_slot_task_in_thread(time_slot: str):
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            loop.run_until_complete(execute_time_slot_tasks(time_slot))
+            loop.run_until_complete(maybe_profile(execute_time_slot_tasks(time_slot), time_slot))
         except Exception as e:
             wis_logger.error(f"子线程执行失败: {e}")
         finally:
@@ -317,6 +342,14 @@ async def graceful_shutdown(crawlers, db_manager, cache_manager):
     # 先等 1s，让残存任务完成
     await asyncio.sleep(1)
     try:
+        # 先关闭缓存：取消仍在后台刷新的搜索/RSS 缓存，避免它们在浏览器关闭后继续调用爬虫
+        if cache_manager:
+            try:
+                await cache_manager.close()
+                wis_logger.debug("✓ 缓存管理器已清理")
+            except Exception as e:
+                wis_logger.warning(f"✗ 缓存清理失败: {e}")
+
         # 清理爬虫
         if "web" in crawlers and crawlers["web"]:
             if hasattr(crawlers["web"], "close"):
@@ -326,20 +359,16 @@ async def graceful_shutdown(crawlers, db_manager, cache_manager):
                 except Exception as e:
                     wis_logger.warning(f"✗ Browser 资源清理失败: {e}")
         
-        # 清理缓存和数据库
-        if cache_manager:
-            try:
-                await cache_manager.close()
-                wis_logger.debug("✓ 缓存管理器已清理")
-            except Exception as e:
-                wis_logger.warning(f"✗ 缓存清理失败: {e}")
-        
+        # 清理数据库
         if db_manager:
             try:
                 await db_manager.cleanup()
                 wis_logger.debug("✓ 数据库管理器已清理")
             except Exception as e:
                 wis_logger.warning(f"✗ 数据库清理失败: {e}")
+
+        # 发出剩余的通知，关闭到后端的通道
+        await close_backend_channel()
         
         # 确保所有 pending 任务被驱动完成，避免在 run() 退出后遗留到已关闭的事件循环
         pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
@@ -407,7 +436,19 @@ async def check_on_startup():
     finally:
         await graceful_shutdown(crawlers, db_manager, cache_manager)
 
+def configure_tracing():
+    # 各时间段在各自线程中运行、可能重叠，追踪只能按进程开关：启动时配置一次，退出时（atexit）关闭
+    tracing.configure(
+        enabled=config['TRACING_ENABLED'],
+        max_file_mb=config['TRACE_FILE_MAX_MB'],
+        backups=config['TRACE_FILE_BACKUPS'],
+        otlp_endpoint=config['TRACE_OTLP_ENDPOINT'],
+    )
+
 def schedule_task():
+    # 任务进程的指标定期写入 work_dir/metrics，由后端 /metrics 一并输出
+    start_file_exporter("task")
+    configure_tracing()
     setup_schedule()
     try:
         next_job = schedule.next_run()
@@ -422,14 +463,20 @@ def schedule_task():
     except Exception as e:
         wis_logger.error(f"调度器异常: {e}")
         schedule.clear()
+    finally:
+        tracing.shutdown()
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
         print("用法: python run_task.py <time_slot>")
         sys.exit(1)
     
+    start_file_exporter("task")
+    configure_tracing()
     try:
-        asyncio.run(execute_time_slot_tasks(sys.argv[1]))
+        asyncio.run(maybe_profile(execute_time_slot_tasks(sys.argv[1]), sys.argv[1]))
     except KeyboardInterrupt:
         pass
+    finally:
+        tracing.shutdown()
     
\ No newline at end of file
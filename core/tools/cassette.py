@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+离线录制/回放：把一次真实运行中的网络响应（httpx 请求、浏览器抓取结果）和 LLM completion 存为 cassette 目录，
+之后在无网络的机器上按相同输入回放，用于 main_process 端到端基准测试（见 test/replay_bench.py）。
+
+录制：install("record", dir) 后，httpx 异步请求、AsyncPlaywrightCrawlerStrategy._crawl_web 与 llm_async 的结果
+连同当时的耗时一起写入 cassette。
+回放：install("replay", dir, server_url) 后，上述网络请求都改发给本地替身服务（python -m core.tools.cassette serve），
+替身服务按记录返回内容，并按 latency 规则注入确定性的延迟；LLM 通过把 LLM_API_BASE 指向替身服务的 /v1 回放。
+
+目录结构：
+    http/<key>.json  http/<key>.body     # 一次 HTTP 响应（key 由 方法+URL+请求体 计算）
+    llm/<key>.json                       # 一次 chat.completions 请求与响应（key 由请求体计算）
+    snapshot.json                        # 录制时的任务、关注点与模型配置（由录制脚本写入）
+
+延迟规则（--latency / WISEFLOW_CASSETTE_LATENCY）：
+    recorded（默认，按录制时的耗时） | none | fixed:<秒> | scale:<倍数> | uniform:<最小秒>-<最大秒>（按 key 确定性取值）
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# 替身服务不回传的响应头：正文已解压，长度会重新计算
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+# 提示词里的当天日期（extractor 追加的“今天是 YYYY-MM-DD”）不参与 key 计算，否则隔天就无法回放
+_DATE_IN_PROMPT = re.compile(r"今天是 \d{4}-\d{2}-\d{2}")
+_LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "::1", "0.0.0.0"}
+
+
+def http_key(method: str, url: str, body: bytes = b"") -> str:
+    digest = hashlib.sha256(f"{method.upper()} {url}\n".encode("utf-8"))
+    digest.update(body or b"")
+    return digest.hexdigest()[:32]
+
+
+def llm_key(request: Dict[str, Any]) -> str:
+    normalized = {k: v for k, v in request.items() if k not in ("stream", "user")}
+    text = _DATE_IN_PROMPT.sub("今天是 <date>", json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class LatencyModel:
+    """回放延迟规则；同一 key 每次得到相同的延迟"""
+
+    def __init__(self, spec: str = "recorded"):
+        self.spec = (spec or "recorded").strip().lower()
+        kind, _, arg = self.spec.partition(":")
+        self.kind = kind
+        try:
+            if kind in ("fixed", "scale"):
+                self.value = float(arg)
+            elif kind == "uniform":
+                low, high = arg.split("-", 1)
+                self.low, self.high = float(low), float(high)
+            elif kind not in ("recorded", "none"):
+                raise ValueError(kind)
+        except ValueError:
+            raise ValueError(f"invalid latency spec: {spec}")
+
+    def delay(self, key: str, recorded: float) -> float:
+        if self.kind == "none":
+            return 0.0
+        if self.kind == "fixed":
+            return self.value
+        if self.kind == "scale":
+            return recorded * self.value
+        if self.kind == "uniform":
+            fraction = int(key[:8], 16) / 0xFFFFFFFF
+            return self.low + (self.high - self.low) * fraction
+        return recorded
+
+
+class Cassette:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.http_dir = self.directory / "http"
+        self.llm_dir = self.directory / "llm"
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _write_json(self, path: Path, data: dict) -> None:
+        self._write(path, json.dumps(data, ensure_ascii=False, indent=1, default=str).encode("utf-8"))
+
+    def save_http(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+        self._write(self.http_dir / f"{key}.body", body)
+        self._write_json(self.http_dir / f"{key}.json", meta)
+
+    def load_http(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        try:
+            meta = json.loads((self.http_dir / f"{key}.json").read_text(encoding="utf-8"))
+            return meta, (self.http_dir / f"{key}.body").read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def save_llm(self, key: str, request: Dict[str, Any], response: Dict[str, Any], latency: float) -> None:
+        self._write_json(self.llm_dir / f"{key}.json", {"request": request, "response": response, "latency": latency})
+
+    def load_llm(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.llm_dir / f"{key}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def save_snapshot(self, data: Dict[str, Any]) -> None:
+        self._write_json(self.directory / "snapshot.json", data)
+
+    def load_snapshot(self) -> Dict[str, Any]:
+        return json.loads((self.directory / "snapshot.json").read_text(encoding="utf-8"))
+
+
+def _is_loopback(url: httpx.URL) -> bool:
+    # 本地后端（通知、提问）和替身服务自身的请求不录制也不改写
+    return url.host in _LOOPBACK_HOSTS
+
+
+def _response_headers(headers) -> Dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+
+
+# -------------- 挂载 --------------
+_installed: Optional[str] = None
+# (对象, 属性名, 原值)，uninstall 时还原
+_patches: List[Tuple[Any, str, Any]] = []
+
+
+def _patch(owner: Any, name: str, value: Any) -> None:
+    _patches.append((owner, name, getattr(owner, name)))
+    setattr(owner, name, value)
+
+
+def install(mode: str, directory: Path, server_url: str = "", browser: bool = True, llm: bool = True) -> None:
+    """在进程内挂载录制或回放；只应在基准/录制脚本中调用，重复调用无效"""
+    global _installed
+    if _installed:
+        return
+    if mode not in ("record", "replay"):
+        raise ValueError(f"unknown cassette mode: {mode}")
+    if mode == "replay" and not server_url:
+        raise ValueError("replay needs the stand-in server url")
+    cassette = Cassette(directory)
+    _patch_httpx(mode, cassette, server_url.rstrip("/"))
+    if browser:
+        _patch_browser(mode, cassette, server_url.rstrip("/"))
+    if llm and mode == "record":
+        _patch_llm(cassette)
+    _installed = mode
+
+
+def uninstall() -> None:
+    global _installed
+    while _patches:
+        owner, name, original = _patches.pop()
+        setattr(owner, name, original)
+    _installed = None
+
+
+def _patch_httpx(mode: str, cassette: Cassette, server_url: str) -> None:
+    original = httpx.AsyncHTTPTransport.handle_async_request
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if _is_loopback(request.url):
+            return await original(self, request)
+        body = await request.aread()
+        key = http_key(request.method, str(request.url), body)
+
+        if mode == "record":
+            started = time.perf_counter()
+            response = await original(self, request)
+            content = await response.aread()
+            headers = _response_headers(response.headers)
+            cassette.save_http(key, {"method": request.method, "url": str(request.url), "status": response.status_code,
+                                     "headers": headers, "latency": time.perf_counter() - started}, content)
+        else:
+            response = await original(self, httpx.Request("GET", f"{server_url}/http/{key}"))
+            content = await response.aread()
+            headers = _response_headers(response.headers)
+        await response.aclose()
+        return httpx.Response(status_code=response.status_code, headers=headers, content=content, request=request)
+
+    _patch(httpx.AsyncHTTPTransport, "handle_async_request", handle_async_request)
+
+
+def _patch_browser(mode: str, cassette: Cassette, server_url: str) -> None:
+    from core.tools.tracing import traced
+    from core.wis.basemodels import AsyncCrawlResponse
+    from core.wis.async_crawler_strategy import AsyncPlaywrightCrawlerStrategy
+    original = AsyncPlaywrightCrawlerStrategy._crawl_web
+    client: Dict[str, httpx.AsyncClient] = {}
+
+    @traced("fetch", attrs=("url",))
+    async def _crawl_web(self, url: str, config) -> AsyncCrawlResponse:
+        key = http_key("BROWSER", url)
+        if mode == "record":
+            started = time.perf_counter()
+            response = await original(self, url, config)
+            cassette.save_http(key, {"method": "BROWSER", "url": url, "status": response.status_code,
+                                     "headers": response.response_headers or {},
+                                     "redirected_url": response.redirected_url,
+                                     "latency": time.perf_counter() - started},
+                               (response.html or "").encode("utf-8"))
+            return response
+
+        # 回放时不打开页面，直接取回录制的渲染结果（每个事件循环一个 client）
+        loop = asyncio.get_running_loop()
+        if client.get("loop") is not loop:
+            client["loop"], client["client"] = loop, httpx.AsyncClient(timeout=None)
+        replayed = await client["client"].get(f"{server_url}/http/{key}")
+        return AsyncCrawlResponse(
+            html=replayed.text,
+            response_headers=_response_headers(replayed.headers),
+            status_code=replayed.status_code,
+            redirected_url=replayed.headers.get("x-cassette-redirected-url") or None,
+        )
+
+    _patch(AsyncPlaywrightCrawlerStrategy, "_crawl_web", _crawl_web)
+
+
+def _patch_llm(cassette: Cassette) -> None:
+    from core.wis import llmuse
+    completions = llmuse.client.chat.completions
+    original = completions.create
+
+    async def create(**kwargs):
+        started = time.perf_counter()
+        response = await original(**kwargs)
+        cassette.save_llm(llm_key(kwargs), kwargs, response.model_dump(), time.perf_counter() - started)
+        return response
+
+    _patch(completions, "create", create)
+
+
+# -------------- 替身服务 --------------
+def create_app(directory: Path, latency: str = "recorded"):
+    """按 cassette 回放的本地服务：GET /http/<key> 与 OpenAI 兼容的 POST /v1/chat/completions"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, Response
+
+    cassette = Cassette(directory)
+    model = LatencyModel(latency)
+    app = FastAPI()
+    app.state.misses = {"http": 0, "llm": 0}
+
+    @app.get("/http/{key}")
+    async def replay_http(key: str):
+        entry = cassette.load_http(key)
+        if entry is None:
+            app.state.misses["http"] += 1
+            return Response(status_code=404, headers={"x-cassette": "miss"})
+        meta, body = entry
+        await asyncio.sleep(model.delay(key, meta.get("latency", 0.0)))
+        headers = _response_headers(meta.get("headers") or {})
+        if meta.get("redirected_url"):
+            headers["x-cassette-redirected-url"] = meta["redirected_url"]
+        return Response(content=body, status_code=meta.get("status", 200), headers=headers)
+
+    @app.post("/v1/chat/completions")
+    async def replay_completion(request: Request):
+        body = await request.json()
+        key = llm_key(body)
+        entry = cassette.load_llm(key)
+        if entry is None:
+            app.state.misses["llm"] += 1
+            # 400：llm_async 不重试，直接按失败处理
+            return JSONResponse(status_code=400, content={"error": {
+                "message": f"request {key} is not in the cassette", "type": "invalid_request_error"}})
+        await asyncio.sleep(model.delay(key, entry.get("latency", 0.0)))
+        return JSONResponse(entry["response"])
+
+    @app.get("/misses")
+    async def misses():
+        return app.state.misses
+
+    return app
+
+
+def serve(directory: Path, host: str = "127.0.0.1", port: int = 8099, latency: str = "recorded") -> None:
+    import uvicorn
+    uvicorn.run(create_app(directory, latency), host=host, port=port, log_level="warning")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="wiseflow cassette stand-in server")
+    parser.add_argument('command', choices=['serve'])
+    parser.add_argument('--dir', type=str, required=True, help='cassette directory')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=str, default=os.environ.get("WISEFLOW_CASSETTE_LATENCY", "recorded"))
+    args = parser.parse_args()
+    if not Path(args.dir).is_dir():
+        sys.exit(f"cassette directory not found: {args.dir}")
+    serve(Path(args.dir), args.host, args.port, args.latency)
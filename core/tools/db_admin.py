@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+data.db 维护命令，在项目根目录执行（建议先停止 wiseflow）：
+
+python -m core.tools.db_admin check-stats                # 对比 focus_stats 与 infos 实际计数
+python -m core.tools.db_admin rebuild-stats              # 从 infos 重算 focus_stats / focus_daily_stats
+python -m core.tools.db_admin rebuild-search-index       # 从 infos 重建全文检索索引
+python -m core.tools.db_admin enable-incremental-vacuum  # 旧的 data.db 与 main_cache.sqlite 开启增量 vacuum（各完整 VACUUM 一次，必须先停止 wiseflow）
+"""
+import sys
+import asyncio
+import argparse
+import aiosqlite
+from loguru import logger
+from core.async_database import AsyncDatabaseManager
+from core.wis.async_cache import SqliteCache, MAIN_CACHE_FILE
+
+
+async def check_stats(db: AsyncDatabaseManager) -> int:
+    """返回计数或最新时间不一致的 focus 数"""
+    async with db.get_connection() as conn:
+        async with conn.execute(
+            "SELECT focus_id, COUNT(*), MAX(created) FROM infos WHERE focus_id IS NOT NULL GROUP BY focus_id"
+        ) as cursor:
+            actual = {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+        async with conn.execute("SELECT focus_id, info_count, last_created FROM focus_stats") as cursor:
+            stored = {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+
+    drift = 0
+    for fid in sorted(set(actual) | set(stored)):
+        if actual.get(fid) != stored.get(fid):
+            drift += 1
+            print(f"focus {fid}: infos={actual.get(fid)} focus_stats={stored.get(fid)}")
+    print(f"{len(actual)} focuses checked, {drift} drifted")
+    return drift
+
+
+async def enable_incremental_vacuum(db: AsyncDatabaseManager) -> bool:
+    """auto_vacuum 只能通过一次完整 VACUUM 切换；VACUUM 可能重排 rowid，之后重建全文检索索引"""
+    async with aiosqlite.connect(db.db_path, timeout=30.0, isolation_level=None) as conn:
+        async with conn.execute("PRAGMA auto_vacuum") as cursor:
+            if (await cursor.fetchone())[0] == 2:
+                print("incremental vacuum already enabled")
+                return True
+        await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.execute("VACUUM")
+    if db._fts_available and not await db.rebuild_info_search_index():
+        return False
+    print("incremental vacuum enabled")
+    return True
+
+
+async def enable_cache_incremental_vacuum() -> bool:
+    """缓存库设置了 CACHE_MAX_SIZE_MB 后，淘汰释放的空间要靠增量 vacuum 还给系统"""
+    if not MAIN_CACHE_FILE.exists():
+        return True
+    cache = SqliteCache(db_path=MAIN_CACHE_FILE, read_pool_size=0)
+    await cache.open()
+    try:
+        if not await cache.enable_incremental_vacuum():
+            return False
+    finally:
+        await cache.close()
+    print(f"incremental vacuum enabled for {MAIN_CACHE_FILE}")
+    return True
+
+
+async def main(command: str) -> int:
+    db = AsyncDatabaseManager(pool_size=1, logger=logger)
+    await db.initialize()
+    try:
+        if command == 'check-stats':
+            return 1 if await check_stats(db) else 0
+        if command == 'rebuild-stats':
+            count = await db.rebuild_focus_stats()
+            if count is None:
+                return 1
+            print(f"focus stats rebuilt for {count} focuses")
+            return 0
+        if command == 'rebuild-search-index':
+            if not await db.rebuild_info_search_index():
+                return 1
+            print("search index rebuilt")
+            return 0
+        if command == 'enable-incremental-vacuum':
+            if not await enable_incremental_vacuum(db):
+                return 1
+            return 0 if await enable_cache_incremental_vacuum() else 1
+    finally:
+        await db.cleanup()
+    return 2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="wiseflow data.db maintenance")
+    parser.add_argument('command', choices=['check-stats', 'rebuild-stats', 'rebuild-search-index',
+                                            'enable-incremental-vacuum'])
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    sys.exit(asyncio.run(main(args.command)))
@@ -1,11 +1,12 @@
 import asyncio
 import httpx
 from core.async_logger import wis_logger
-from typing import Tuple
+from typing import Optional, Tuple
 from urllib.parse import urlencode
 import json
 from core.wis import SqliteCache
 from core.wis.ws_connect import notify_user
+from core.tools.tracing import traced
 
 
 def gen_request(query: str) -> dict:
@@ -57,45 +58,48 @@ def parse_response(response_text: str) -> list[dict]:
 
     return results
 
-async def search_with_github(query: str, existings: set[str] = set(), cache_manager: SqliteCache = None) -> Tuple[str, dict]:
-    raw_result = None
-    if cache_manager:
-        raw_result = await cache_manager.get(query, namespace='github_search')
-        if raw_result == '**empty**':
-            return '', {}
-        
-    if not raw_result:
-        request_params = gen_request(query)
-        max_retries = 3
-        base_delay = 10  # seconds
-        for attempt in range(max_retries):
-            try:
-                method = request_params.get("method", "GET").upper()
-                url = request_params["url"]
-                headers = request_params.get("headers")
+async def _fetch_github(query: str, background: bool = False) -> Optional[list]:
+    """请求 github 搜索并解析，失败（重试耗尽）返回 None；后台刷新（已返回过期缓存）只试一次，也不通知用户"""
+    request_params = gen_request(query)
+    max_retries = 1 if background else 3
+    base_delay = 10  # seconds
+    for attempt in range(max_retries):
+        try:
+            method = request_params.get("method", "GET").upper()
+            url = request_params["url"]
+            headers = request_params.get("headers")
 
-                async with httpx.AsyncClient(timeout=30) as client:
-                    response = await client.request(method, url, headers=headers, timeout=30)
-                response.raise_for_status()
-                break
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)
-                    wis_logger.debug(f"github search attempt {attempt + 1} failed with error: {str(e)}, retrying in {delay} seconds")
-                    await asyncio.sleep(delay)
-                else:
-                    wis_logger.warning(
-                        f"github search failed after {max_retries} attempts with error: {str(e)}"
-                    )
+            async with httpx.AsyncClient(timeout=30) as client:
+                response = await client.request(method, url, headers=headers, timeout=30)
+            response.raise_for_status()
+            break
+        except Exception as e:
+            if attempt < max_retries - 1:
+                delay = base_delay * (2 ** attempt)
+                wis_logger.debug(f"github search attempt {attempt + 1} failed with error: {str(e)}, retrying in {delay} seconds")
+                await asyncio.sleep(delay)
+            else:
+                wis_logger.warning(
+                    f"github search failed after {max_retries} attempts with error: {str(e)}"
+                )
+                if not background:
                     await notify_user(15, ['github'])
-                    return "", {}
-        
-        # Parse response
-        raw_result = parse_response(response.text)
+                return None
+
+    # Parse response
+    return parse_response(response.text)
+
+
+@traced("github", attrs=("query",))
+async def search_with_github(query: str, existings: set[str] = set(), cache_manager: SqliteCache = None) -> Tuple[str, dict]:
+    # 过期但仍在宽限期内的缓存会被立即返回，同时在后台刷新
+    if cache_manager:
+        raw_result = await cache_manager.get_swr(query, lambda background: _fetch_github(query, background), 60*24, namespace='github_search')
+    else:
+        raw_result = await _fetch_github(query)
+    if not raw_result or raw_result == '**empty**':
+        return '', {}
 
-        if cache_manager:
-            await cache_manager.set(query, raw_result, 60*24, namespace='github_search')
-    
     markdown = ""
     link_dict = {}
     for result in raw_result:
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+进程内指标，输出为 Prometheus 文本格式（后端 GET /metrics）。
+
+任务进程和后端是两个进程：任务进程调用 start_file_exporter 定期把本进程指标快照写到
+work_dir/metrics/<process>.json，后端 /metrics 输出自身指标时一并读取这些快照，每条序列带 process 标签。
+
+用法（接口参照 prometheus_client）：
+    from core.tools.metrics import registry
+    LLM_SECONDS = registry.histogram("wiseflow_llm_request_duration_seconds", "LLM 请求耗时", ["model"])
+    LLM_SECONDS.labels(model=model).observe(cost)
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 快照超过这个时间（秒）未更新，视为进程已退出，不再输出
+SNAPSHOT_STALE_SECONDS = 600
+# 每个指标最多保留的标签组合数，超出后标签值一律记为 "other"（避免按域名等无限增长）
+MAX_SERIES_PER_METRIC = 500
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _Metric:
+    kind = ""
+    child_class: type = None  # 在 _Child 定义后设置
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str]):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        if key not in self._series and len(self._series) >= MAX_SERIES_PER_METRIC:
+            key = tuple("other" for _ in self.labelnames)
+        return key
+
+    def labels(self, **labels) -> "_Child":
+        return self.child_class(self, self._key(labels))
+
+    # 无标签的指标可直接调用
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _new_value(self):
+        return 0.0
+
+    def _update(self, key: Tuple[str, ...], fn) -> None:
+        with self._registry.lock:
+            value = self._series.get(key)
+            if value is None:
+                value = self._new_value()
+            self._series[key] = fn(value)
+
+    def snapshot(self) -> dict:
+        with self._registry.lock:
+            samples = [[list(key), value if not isinstance(value, list) else list(value)]
+                       for key, value in self._series.items()]
+        return {"name": self.name, "type": self.kind, "help": self.documentation,
+                "labelnames": list(self.labelnames), "samples": samples}
+
+
+class _Child:
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric: _Metric, key: Tuple[str, ...]):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric._update(self._key, lambda v: v + amount)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+
+class _GaugeChild(_Child):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self._metric._update(self._key, lambda v: float(value))
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._metric._update(self._key, lambda v: v - amount)
+
+
+_Metric.child_class = _Child
+
+
+class Counter(_Metric):
+    """只增不减；需要设置为某个值的量用 Gauge"""
+    kind = "counter"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_class = _GaugeChild
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self):
+        # 各桶计数（非累计），最后一项为 +Inf；然后是 sum、count
+        return [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+    def _observe(self, key: Tuple[str, ...], value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+
+        def update(v):
+            v[index] += 1
+            v[-2] += value
+            v[-1] += 1
+            return v
+
+        self._update(key, update)
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self.lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def snapshot(self, process: str) -> dict:
+        with self.lock:
+            metrics = list(self._metrics.values())
+        return {"process": process, "pid": os.getpid(), "ts": time.time(),
+                "metrics": [m.snapshot() for m in metrics]}
+
+
+registry = MetricsRegistry()
+
+
+# -------------- 跨进程导出 --------------
+def metrics_dir() -> Path:
+    # 延迟导入：core.async_database 自身也会使用本模块
+    from core.async_database import base_directory
+    return base_directory / "metrics"
+
+
+def write_snapshot(process: str, directory: Optional[Path] = None) -> None:
+    """原子写入本进程的指标快照"""
+    directory = directory or metrics_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{process}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(registry.snapshot(process), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception:
+        # 指标导出失败不影响主流程
+        pass
+
+
+_exporter: Optional[threading.Thread] = None
+
+
+def start_file_exporter(process: str, interval: float = 15.0) -> None:
+    """后台线程定期写快照，进程退出时再写一次；同一进程重复调用无副作用"""
+    global _exporter
+    if _exporter is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            write_snapshot(process)
+
+    _exporter = threading.Thread(target=run, name="MetricsExporter", daemon=True)
+    _exporter.start()
+    atexit.register(write_snapshot, process)
+
+
+def read_snapshots(directory: Optional[Path] = None, exclude: Iterable[str] = ()) -> List[dict]:
+    directory = directory or metrics_dir()
+    snapshots = []
+    now = time.time()
+    for path in sorted(directory.glob("*.json")):
+        if path.stem in exclude:
+            continue
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if now - data.get("ts", 0) <= SNAPSHOT_STALE_SECONDS:
+            snapshots.append(data)
+    return snapshots
+
+
+# -------------- Prometheus 文本格式 --------------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(snapshots: List[dict]) -> str:
+    """把多个进程的快照合并为 Prometheus 文本格式；同名指标的 HELP/TYPE 只输出一次"""
+    families: Dict[str, dict] = {}
+    for snap in snapshots:
+        process = snap.get("process", "")
+        for metric in snap.get("metrics", []):
+            family = families.setdefault(metric["name"], {"meta": metric, "rows": []})
+            family["rows"].append((process, metric))
+
+    lines = []
+    for name, family in families.items():
+        meta = family["meta"]
+        lines.append(f"# HELP {name} {meta['help']}")
+        lines.append(f"# TYPE {name} {meta['type']}")
+        for process, metric in family["rows"]:
+            for key, value in metric["samples"]:
+                pairs = [("process", process)] + list(zip(metric["labelnames"], key))
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric["buckets"] + [float("inf")], value[:-2]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{_format_labels(pairs + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value[-2])}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {value[-1]}")
+    return "\n".join(lines) + "\n"
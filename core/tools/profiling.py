@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+时间段运行的按需性能剖析，无需改代码：
+
+    WISEFLOW_PROFILE=sample python core/run_task.py first       # 环境变量优先
+    或在配置中设置 PROFILE_MODE = "sample" / "cprofile"
+
+sample（推荐）：后台线程每 WISEFLOW_PROFILE_INTERVAL_MS（默认 10ms）对事件循环线程采样一次调用栈，开销很小，可用于正式运行。
+cprofile：cProfile 确定性剖析，数据精确但会明显拖慢运行，适合单独复现问题。
+两种模式都会记录 asyncio 任务级耗时：每个任务（按协程名汇总）实际占用事件循环的时间、单步最长耗时（阻塞事件循环的元凶）。
+
+每个时间段在 work_dir/profiles/ 下输出：
+    <时间>-<时段>.folded   折叠调用栈（sample 模式），可直接用 flamegraph.pl / speedscope / inferno 生成火焰图
+    <时间>-<时段>.pstats   cProfile 原始数据（cprofile 模式），可用 snakeviz / gprof2dot 查看
+    <时间>-<时段>.txt      热点 Top-N 与 asyncio 任务耗时报告
+"""
+import io
+import os
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import threading
+import collections.abc
+from pathlib import Path
+from datetime import datetime
+from typing import Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+PROFILE_MODES = ("sample", "cprofile")
+DEFAULT_INTERVAL_MS = 10
+MAX_STACK_DEPTH = 128
+_project_root = str(Path(__file__).resolve().parents[2])
+
+
+def profile_mode() -> str:
+    """环境变量 WISEFLOW_PROFILE 优先，其次配置 PROFILE_MODE；无效值视为关闭"""
+    mode = os.environ.get("WISEFLOW_PROFILE")
+    if mode is None:
+        from core.wis.config import config
+        mode = config.get("PROFILE_MODE", "")
+    mode = (mode or "").strip().lower()
+    if mode in ("1", "true", "yes", "on"):
+        return "sample"
+    return mode if mode in PROFILE_MODES else ""
+
+
+def profiles_dir() -> Path:
+    from core.async_database import base_directory
+    return base_directory / "profiles"
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_project_root):
+        return os.path.relpath(filename, _project_root)
+    parts = Path(filename).parts
+    if "site-packages" in parts:
+        return "/".join(parts[parts.index("site-packages") + 1:])
+    return "/".join(parts[-2:])
+
+
+# -------------- 调用栈采样 --------------
+class StackSampler:
+    """定时采样指定线程的 Python 调用栈，按折叠栈（root;...;leaf）计数"""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self.samples = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                # 跳过 _TimedCoroutine 自身的帧
+                if frame.f_code.co_filename != __file__:
+                    stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+
+    def hotspots(self, top: int) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]], int]:
+        """返回 (按自身采样数排序, 按包含子调用采样数排序, 事件循环空闲采样数)"""
+        self_counts: Dict[str, int] = {}
+        inclusive: Dict[str, int] = {}
+        idle = 0
+        for stack, count in self.counts.items():
+            frames = stack.split(";")
+            leaf = frames[-1]
+            # 事件循环在 selector 上等待 IO/定时器，即空闲
+            if "selectors.py" in leaf:
+                idle += count
+                continue
+            self_counts[leaf] = self_counts.get(leaf, 0) + count
+            for label in set(frames):
+                inclusive[label] = inclusive.get(label, 0) + count
+        by_self = sorted(self_counts.items(), key=lambda kv: -kv[1])[:top]
+        by_inclusive = sorted(inclusive.items(), key=lambda kv: -kv[1])[:top]
+        return by_self, by_inclusive, idle
+
+
+# -------------- asyncio 任务耗时 --------------
+class _TaskStats:
+    __slots__ = ("count", "busy", "steps", "max_step", "wall")
+
+    def __init__(self):
+        self.count = 0
+        self.busy = 0.0
+        self.steps = 0
+        self.max_step = 0.0
+        self.wall = 0.0
+
+
+class _TimedCoroutine(collections.abc.Coroutine):
+    """包装任务的协程，统计每一步 send/throw 占用事件循环的时间"""
+    __slots__ = ("_coro", "_stats", "_created")
+
+    def __init__(self, coro, stats: _TaskStats):
+        self._coro = coro
+        self._stats = stats
+        self._created = time.perf_counter()
+        stats.count += 1
+
+    def _step(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        except BaseException:
+            self._stats.wall += time.perf_counter() - self._created
+            raise
+        finally:
+            cost = time.perf_counter() - start
+            stats = self._stats
+            stats.busy += cost
+            stats.steps += 1
+            if cost > stats.max_step:
+                stats.max_step = cost
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def __getattr__(self, name):
+        # cr_frame / cr_code 等交给原协程，asyncio 调试输出与 get_stack() 仍然可用
+        return getattr(self._coro, name)
+
+
+class TaskTimer:
+    """通过 task factory 统计本事件循环上新建任务的耗时，按协程名汇总"""
+
+    def __init__(self):
+        self.stats: Dict[str, _TaskStats] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous = None
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._previous = loop.get_task_factory()
+        loop.set_task_factory(self._factory)
+
+    def uninstall(self) -> None:
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous)
+            self._loop = None
+
+    def _factory(self, loop, coro, **kwargs):
+        name = getattr(coro, "__qualname__", None) or type(coro).__name__
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = _TaskStats()
+        wrapped = _TimedCoroutine(coro, stats)
+        if self._previous is not None:
+            return self._previous(loop, wrapped, **kwargs)
+        return asyncio.Task(wrapped, loop=loop, **kwargs)
+
+    def report(self, top: int) -> List[str]:
+        rows = sorted(self.stats.items(), key=lambda kv: -kv[1].busy)[:top]
+        lines = [f"  {'coroutine':<60} {'tasks':>7} {'busy s':>10} {'steps':>9} {'max step ms':>12} {'avg wall s':>11}"]
+        for name, s in rows:
+            avg_wall = s.wall / s.count if s.count else 0.0
+            lines.append(f"  {name[-60:]:<60} {s.count:7d} {s.busy:10.3f} {s.steps:9d} {s.max_step * 1000:12.1f} {avg_wall:11.2f}")
+        return lines
+
+
+# -------------- 入口 --------------
+async def maybe_profile(coro: Awaitable[T], label: str) -> T:
+    """未开启剖析时直接执行 coro；开启时剖析其运行并把结果写到 work_dir/profiles/"""
+    mode = profile_mode()
+    if not mode:
+        return await coro
+    return await profile(coro, label, mode)
+
+
+async def profile(coro: Awaitable[T], label: str, mode: str = "sample", directory: Optional[Path] = None,
+                  top: Optional[int] = None) -> T:
+    try:
+        interval = max(1, int(os.environ.get("WISEFLOW_PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS))) / 1000
+    except ValueError:
+        interval = DEFAULT_INTERVAL_MS / 1000
+    if top is None:
+        from core.wis.config import config
+        top = int(config.get("PROFILE_TOP_N", 30))
+
+    timer = TaskTimer()
+    timer.install(asyncio.get_running_loop())
+    sampler = profiler = None
+    if mode == "cprofile":
+        # 只剖析当前（事件循环）线程
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        elapsed = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        timer.uninstall()
+        _write_outputs(label, mode, elapsed, timer, sampler, profiler, directory or profiles_dir(), top)
+
+
+def _write_outputs(label: str, mode: str, elapsed: float, timer: TaskTimer, sampler: Optional[StackSampler],
+                   profiler: Optional[cProfile.Profile], directory: Path, top: int) -> None:
+    from core.async_logger import wis_logger
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{label}"
+        lines = [f"wiseflow profile: slot {label}, mode {mode}, wall {elapsed:.1f}s", ""]
+
+        if sampler is not None:
+            base.with_suffix(".folded").write_text(sampler.folded(), encoding="utf-8")
+            by_self, by_inclusive, idle = sampler.hotspots(top)
+            total = max(1, sampler.samples)
+            lines.append(f"{sampler.samples} samples every {sampler.interval * 1000:.0f}ms, "
+                         f"event loop idle {idle * 100 / total:.1f}%")
+            lines.append(f"top {top} by self samples (time spent in the function itself):")
+            lines += [f"  {count * 100 / total:6.2f}%  {name}" for name, count in by_self]
+            lines.append(f"top {top} by inclusive samples (function and its callees):")
+            lines += [f"  {count * 100 / total:6.2f}%  {name}" for name, count in by_inclusive]
+
+        if profiler is not None:
+            profiler.dump_stats(str(base.with_suffix(".pstats")))
+            buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=buffer)
+            stats.sort_stats("tottime").print_stats(top)
+            stats.sort_stats("cumulative").print_stats(top)
+            lines.append(buffer.getvalue())
+
+        lines.append("")
+        lines.append(f"asyncio tasks, top {top} by time holding the event loop "
+                     "(a large max step means the loop was blocked):")
+        lines += timer.report(top)
+        report = base.with_suffix(".txt")
+        report.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        wis_logger.info(f"profile of {label} written to {report}")
+    except Exception as e:
+        wis_logger.warning(f"failed to write profile of {label}: {e}")
@@ -2,48 +2,52 @@ import httpx
 import feedparser
 from core.async_logger import wis_logger
 from core.wis import CrawlResult, SqliteCache
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from core.wis.ws_connect import notify_user
 from core.tools.general_utils import normalize_publish_date
+from core.tools.tracing import traced
 import asyncio
 
 
+async def _fetch_rss_entries(url: str, background: bool = False) -> Optional[list]:
+    """下载并解析 RSS，失败（重试耗尽）返回 None；后台刷新（已返回过期缓存）只试一次，也不通知用户"""
+    max_retries = 1 if background else 3
+    base_delay = 10  # seconds
+    for attempt in range(max_retries):
+        try:
+            async with httpx.AsyncClient(timeout=30) as client:
+                response = await client.get(url)
+                response.raise_for_status()
+            content = response.content  # bytes
+            break
+        except Exception as e:
+            if attempt < max_retries - 1:
+                delay = base_delay * (2 ** attempt)
+                wis_logger.debug(f"fetching RSS from {url} attempt {attempt + 1} failed with error: {str(e)}, retrying in {delay} seconds")
+                await asyncio.sleep(delay)
+            else:
+                wis_logger.warning(f"fetching RSS from {url} failed after {max_retries} attempts with error: {str(e)}")
+                if not background:
+                    await notify_user(15, [url])
+                return None
+
+    parsed = feedparser.parse(content)
+    if parsed.get("bozo", False):
+        wis_logger.warning(f"Error parsing RSS from {url}: {parsed.get('bozo_exception', '')}")
+        raise RuntimeError(f"RSS from {url}: {parsed.get('bozo_exception', '')}")
+    return parsed.entries
+
+
+@traced("rss", attrs=("url",))
 async def fetch_rss(url, existings: set=set(), cache_manager: SqliteCache = None) -> Tuple[List[CrawlResult], str, dict]:
-    entries = None
+    # 过期但仍在宽限期内的缓存会被立即返回，同时在后台刷新
     if cache_manager:
-        entries = await cache_manager.get(url, namespace='rss')
-        if entries == '**empty**':
-            return [], '', {}
-        
-    if not entries:
-        max_retries = 3
-        base_delay = 10  # seconds
-        for attempt in range(max_retries):
-            try:
-                async with httpx.AsyncClient(timeout=30) as client:
-                    response = await client.get(url)
-                    response.raise_for_status()
-                content = response.content  # bytes
-                break
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)
-                    wis_logger.debug(f"fetching RSS from {url} attempt {attempt + 1} failed with error: {str(e)}, retrying in {delay} seconds")
-                    await asyncio.sleep(delay)
-                else:
-                    wis_logger.warning(f"fetching RSS from {url} failed after {max_retries} attempts with error: {str(e)}")
-                    await notify_user(15, [url])
-                    return [], '', {}
-        
-        parsed = feedparser.parse(content)
-        if parsed.get("bozo", False):
-            wis_logger.warning(f"Error parsing RSS from {url}: {parsed.get('bozo_exception', '')}")
-            raise RuntimeError(f"RSS from {url}: {parsed.get('bozo_exception', '')}")
-        
-        entries = parsed.entries
-        if cache_manager:
-            await cache_manager.set(url, entries, 60*24, namespace='rss')
-    
+        entries = await cache_manager.get_swr(url, lambda background: _fetch_rss_entries(url, background), 60*24, namespace='rss')
+    else:
+        entries = await _fetch_rss_entries(url)
+    if not entries or entries == '**empty**':
+        return [], '', {}
+
     results = []
     markdown = ''
     link_dict = {}
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+轻量级链路追踪：用 contextvars 在协程间传递当前 span，记录一个时间段内每个关注点、每个 URL 在
+搜索、抓取、滚动、html→markdown、chunk hash 查询、LLM 排队/推理、写库上各花了多少时间。
+
+任务进程启动时调用一次 configure()、退出时 shutdown()，span 写入 work_dir/traces/spans.jsonl（按大小轮转）；
+配置了 TRACE_OTLP_ENDPOINT 时同时以 OTLP/HTTP JSON 发送给 collector（Jaeger、Tempo 等）。
+未 configure 时所有 span 都是空操作，后端和测试不受影响。
+
+埋点：
+    @traced("crawl", attrs=("url",))          # 记录被装饰协程的 url 参数
+    async def arun(self, url, ...): ...
+
+    async with span("chunk_hash_lookup", sections=len(sections)):
+        ...
+
+分析（在项目根目录执行）：
+    python -m core.tools.tracing summarize             # 最近一个时间段的关键路径与各阶段耗时
+    python -m core.tools.tracing summarize --last 3 --top 20
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import inspect
+import argparse
+import functools
+import threading
+import logging.handlers
+from pathlib import Path
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence
+
+# 属性值截断长度，避免把整段 markdown 写进 span
+MAX_ATTR_LENGTH = 300
+
+_enabled = False
+# span 行经 QueueHandler 交给后台线程写入轮转文件；独立的 logger，不进入 loguru 的日志输出
+_trace_logger = logging.getLogger("wiseflow.trace")
+_trace_logger.propagate = False
+_trace_logger.setLevel(logging.INFO)
+_listener: Optional[logging.handlers.QueueListener] = None
+_otlp: Optional["_OTLPExporter"] = None
+_current: ContextVar[Optional["Span"]] = ContextVar("wiseflow_current_span", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def _attr(value) -> object:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    value = str(value)
+    return value if len(value) <= MAX_ATTR_LENGTH else value[:MAX_ATTR_LENGTH] + "…"
+
+
+class Span:
+    """一次计时；既可 `with` / `async with`，也可 start_span() / end() 手动配对"""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "_t0", "attrs", "error", "_token")
+
+    def __init__(self, name: str, attrs: dict, parent: Optional["Span"]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = _new_id(8)
+        self.attrs = {k: _attr(v) for k, v in attrs.items()}
+        self.error = None
+        self._token = None
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs) -> None:
+        self.attrs.update({k: _attr(v) for k, v in attrs.items()})
+
+    def activate(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                # 在别的上下文里结束（例如跨任务），仅恢复父 span 不影响记录
+                pass
+            self._token = None
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"[:MAX_ATTR_LENGTH]
+        _export(self, time.perf_counter() - self._t0)
+
+    def __enter__(self) -> "Span":
+        return self.activate()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end(exc)
+
+    async def __aenter__(self) -> "Span":
+        return self.activate()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.end(exc)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def activate(self) -> "_NoopSpan":
+        return self
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs):
+    """当前 span 的子 span（没有当前 span 时开启新的 trace），用作上下文管理器"""
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs, _current.get())
+
+
+def start_span(name: str, **attrs):
+    """开启并激活一个 span，需在同一上下文中调用 end()；适合不便缩进整段代码的场合"""
+    return span(name, **attrs).activate()
+
+
+def current_span():
+    return _current.get() or _NOOP
+
+
+def emit_span(name: str, duration: float, **attrs) -> None:
+    """事后补记一个刚结束、耗时 duration 秒的子 span（如等待信号量、写库排队）；没有当前 span 时忽略"""
+    parent = _current.get()
+    if not _enabled or parent is None:
+        return
+    record = Span(name, attrs, parent)
+    record.start = time.time() - duration
+    _export(record, duration)
+
+
+def traced(name: str, attrs: Sequence[str] = ()):
+    """把协程函数包在一个 span 里；attrs 中列出的参数值记为 span 属性"""
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not _enabled:
+                return await fn(*args, **kwargs)
+            values = {}
+            if attrs:
+                try:
+                    bound = signature.bind_partial(*args, **kwargs).arguments
+                    values = {key: bound[key] for key in attrs if key in bound}
+                except TypeError:
+                    pass
+            async with Span(name, values, _current.get()):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# -------------- 导出 --------------
+def _export(record: Span, duration: float) -> None:
+    data = {"trace": record.trace_id, "span": record.span_id, "parent": record.parent_id, "name": record.name,
+            "start": round(record.start, 6), "dur": round(duration, 6), "attrs": record.attrs}
+    if record.error:
+        data["error"] = record.error
+    if _listener is not None:
+        _trace_logger.info(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    if _otlp is not None:
+        _otlp.put(data)
+
+
+def traces_dir() -> Path:
+    # 延迟导入：core.async_database 也会使用本模块
+    from core.async_database import base_directory
+    return base_directory / "traces"
+
+
+def configure(enabled: bool = True, directory: Optional[Path] = None, max_file_mb: int = 20,
+              backups: int = 5, otlp_endpoint: str = "") -> None:
+    """（重新）配置导出；每个进程只在启动时调用一次——各时间段在各自线程中运行、可能重叠，不能在时间段内开关"""
+    global _enabled, _listener, _otlp
+    shutdown()
+    if not enabled:
+        return
+    directory = directory or traces_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            directory / "spans.jsonl",
+            maxBytes=max(1, int(max_file_mb)) * 1024 * 1024,
+            backupCount=max(1, int(backups)),
+            encoding="utf-8",
+        )
+    except Exception as e:
+        from core.async_logger import wis_logger
+        wis_logger.warning(f"tracing disabled, cannot open trace file: {e}")
+        return
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _trace_logger.handlers = [logging.handlers.QueueHandler(records)]
+    _listener = logging.handlers.QueueListener(records, file_handler)
+    _listener.start()
+    if otlp_endpoint:
+        _otlp = _OTLPExporter(otlp_endpoint)
+    _enabled = True
+
+
+def shutdown() -> None:
+    """停止追踪并刷新导出器"""
+    global _enabled, _listener, _otlp
+    _enabled = False
+    if _listener is not None:
+        _listener.stop()  # 等待队列中的 span 写完
+        for handler in _listener.handlers:
+            handler.close()
+        _trace_logger.handlers = []
+        _listener = None
+    if _otlp is not None:
+        _otlp.close()
+        _otlp = None
+
+
+atexit.register(shutdown)
+
+
+class _OTLPExporter:
+    """把 span 批量转换为 OTLP/HTTP JSON 发送到 <endpoint>/v1/traces；失败只丢弃，不影响主流程"""
+
+    def __init__(self, endpoint: str, batch_size: int = 256, interval: float = 5.0, max_queue: int = 10000):
+        self.url = endpoint.rstrip("/")
+        if not self.url.endswith("/v1/traces"):
+            self.url += "/v1/traces"
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=max_queue)
+        self.thread = threading.Thread(target=self._run, name="OTLPExporter", daemon=True)
+        self.thread.start()
+
+    def put(self, data: dict) -> None:
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            pass
+
+    def close(self) -> None:
+        try:
+            self.queue.put(None, timeout=1)
+        except queue.Full:
+            return
+        self.thread.join(timeout=10)
+
+    def _run(self) -> None:
+        import httpx
+        with httpx.Client(timeout=10) as client:
+            stopping = False
+            while not stopping:
+                batch = []
+                deadline = time.monotonic() + self.interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                if not batch:
+                    continue
+                try:
+                    client.post(self.url, json=_to_otlp(batch))
+                except Exception:
+                    pass
+
+
+def _to_otlp(batch: List[dict]) -> dict:
+    def attribute(key, value):
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": "" if value is None else str(value)}}
+
+    spans = []
+    for data in batch:
+        start = int(data["start"] * 1e9)
+        item = {
+            "traceId": data["trace"],
+            "spanId": data["span"],
+            "name": data["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(start + int(data["dur"] * 1e9)),
+            "attributes": [attribute(k, v) for k, v in data["attrs"].items()],
+            "status": {"code": 2, "message": data["error"]} if data.get("error") else {"code": 1},
+        }
+        if data["parent"]:
+            item["parentSpanId"] = data["parent"]
+        spans.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [attribute("service.name", "wiseflow")]},
+        "scopeSpans": [{"scope": {"name": "core.tools.tracing"}, "spans": spans}],
+    }]}
+
+
+# -------------- 分析 --------------
+def load_spans(directory: Optional[Path] = None) -> List[dict]:
+    directory = directory or traces_dir()
+    spans = []
+    # 轮转出的旧文件为 spans.jsonl.1 ... spans.jsonl.N
+    for path in sorted(directory.glob("spans.jsonl*"), key=lambda p: p.stat().st_mtime):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return spans
+
+
+def critical_path(root: dict, children: Dict[str, List[dict]]) -> List[dict]:
+    """从根开始每层取最晚结束的子 span：它决定了父 span 何时结束"""
+    path = [root]
+    node = root
+    while children.get(node["span"]):
+        node = max(children[node["span"]], key=lambda s: s["start"] + s["dur"])
+        path.append(node)
+    return path
+
+
+def _label(data: dict) -> str:
+    attrs = data.get("attrs") or {}
+    detail = " ".join(f"{k}={v}" for k, v in attrs.items() if v not in (None, ""))
+    return f"{data['name']} {detail}".strip()
+
+
+def summarize(spans: List[dict], last: int = 1, top: int = 10) -> str:
+    by_trace: Dict[str, List[dict]] = {}
+    for data in spans:
+        by_trace.setdefault(data["trace"], []).append(data)
+
+    roots = []
+    for trace_spans in by_trace.values():
+        ids = {s["span"] for s in trace_spans}
+        # 只分析时间段根 span（独立运行的抓取等也会产生 trace，但没有可比性）
+        roots.extend(s for s in trace_spans if s["name"] == "time_slot" and s["parent"] not in ids)
+    roots.sort(key=lambda s: s["start"])
+
+    lines = []
+    if not roots:
+        return "no time_slot traces found\n"
+    for root in roots[-last:]:
+        trace_spans = by_trace[root["trace"]]
+        children: Dict[str, List[dict]] = {}
+        for data in trace_spans:
+            if data["parent"]:
+                children.setdefault(data["parent"], []).append(data)
+
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(root["start"]))
+        lines.append(f"=== {_label(root)}  started {started}  wall {root['dur']:.1f}s  spans {len(trace_spans)} ===")
+
+        lines.append("critical path (self = time not covered by the next span on the path):")
+        path = critical_path(root, children)
+        for depth, (node, child) in enumerate(zip(path, path[1:] + [None])):
+            self_time = node["dur"] - (child["dur"] if child else 0)
+            mark = "  ✗" if node.get("error") else ""
+            lines.append(f"  {'  ' * depth}{_label(node):<70.70} {node['dur']:9.2f}s  self {self_time:8.2f}s{mark}")
+
+        lines.append("time by stage (summed over concurrent spans):")
+        stages: Dict[str, List[float]] = {}
+        for data in trace_spans:
+            stages.setdefault(data["name"], []).append(data["dur"])
+        for name, durs in sorted(stages.items(), key=lambda kv: -sum(kv[1])):
+            durs.sort()
+            p95 = durs[min(len(durs) - 1, int(len(durs) * 0.95))]
+            lines.append(f"  {name:<20} n {len(durs):6d}  total {sum(durs):10.1f}s  "
+                         f"p50 {durs[len(durs) // 2]:8.3f}s  p95 {p95:8.3f}s  max {durs[-1]:8.3f}s")
+
+        crawls = sorted((s for s in trace_spans if s["name"] == "crawl"), key=lambda s: -s["dur"])[:top]
+        if crawls:
+            lines.append(f"slowest {len(crawls)} urls:")
+            for data in crawls:
+                lines.append(f"  {data['dur']:8.2f}s  {data['attrs'].get('url', '')}")
+        errors = [s for s in trace_spans if s.get("error")]
+        if errors:
+            lines.append(f"{len(errors)} spans ended with an error, e.g. {_label(errors[0])}: {errors[0]['error']}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="wiseflow trace analysis")
+    parser.add_argument('command', choices=['summarize'])
+    parser.add_argument('--dir', type=str, default='', help='trace directory (default: work_dir/traces)')
+    parser.add_argument('--last', type=int, default=1, help='number of most recent time slots to summarize')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest urls to list')
+    args = parser.parse_args()
+    sys.stdout.write(summarize(load_spans(Path(args.dir) if args.dir else None), last=args.last, top=args.top))
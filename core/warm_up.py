@@ -1,5 +1,5 @@
 from core.wis.config import config
-from core.wis.ws_connect import ask_user, notify_user, ping_frontend
+from core.wis.ws_connect import ask_user, notify_user, ping_frontend, close_backend_channel
 from core.async_logger import wis_logger, base_directory
 import json
 import asyncio
@@ -337,7 +337,13 @@ def _parse_cli_args():
 
     return parser.parse_args()
 
+async def _main(url: str):
+    browser_manager = BrowserManager(browser_config=BrowserConfig(), logger=wis_logger)
+    try:
+        await pre_login(urls=[url], browser_manager=browser_manager, run_config=DEFAULT_CRAWLER_CONFIG)
+    finally:
+        await close_backend_channel()
+
 if __name__ == "__main__":
     cli_args = _parse_cli_args()
-    browser_manager = BrowserManager(browser_config=BrowserConfig(), logger=wis_logger)
-    asyncio.run(pre_login(urls=[cli_args.url], browser_manager=browser_manager, run_config=DEFAULT_CRAWLER_CONFIG))
+    asyncio.run(_main(cli_args.url))
@@ -2,17 +2,30 @@ import asyncio
 import gzip
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
 import aiosqlite
 
+try:
+    import zstandard
+except ImportError:  # optional, the cache falls back to gzip
+    zstandard = None
+
 from core.async_logger import wis_logger, base_directory
+from core.tools.metrics import registry as metrics_registry
 
 
 DEFAULT_CACHE_DIR = base_directory / "wis_cache"
 MAIN_CACHE_FILE = DEFAULT_CACHE_DIR / "main_cache.sqlite"
 
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on old builds) for IN (...) queries
+_MAX_SQL_VARIABLES = 500
+
+CACHE_LOOKUPS = metrics_registry.counter("wiseflow_cache_lookups_total", "按 namespace 统计的缓存查询次数（result：hit/miss/expired）", ["namespace", "result"])
+
 
 class ValueTooLargeError(Exception):
     pass
@@ -42,6 +55,42 @@ def _deserialize_value(payload: bytes, value_format: str) -> Any:
     return json.loads(payload.decode("utf-8"))
 
 
+def _expires_at_from_ttl(expire_time: int, now: int) -> int:
+    """TTL in minutes -> expires_at (seconds). 0 means never expire."""
+    if expire_time and expire_time > 0:
+        return now + int(expire_time) * 60
+    return 0
+
+
+# codec name -> (compress(data, level, zdict), decompress(data, zdict)); zdict is None unless trained
+_CODECS: Dict[str, Tuple[Callable[..., bytes], Callable[..., bytes]]] = {
+    "gzip": (
+        lambda data, level, zdict: gzip.compress(data, compresslevel=9 if level is None else level),
+        lambda data, zdict: gzip.decompress(data),
+    ),
+}
+if zstandard is not None:
+    _CODECS["zstd"] = (
+        lambda data, level, zdict: zstandard.ZstdCompressor(level=3 if level is None else level, dict_data=zdict).compress(data),
+        lambda data, zdict: zstandard.ZstdDecompressor(dict_data=zdict).decompress(data),
+    )
+
+
+def register_codec(name: str, compress: Callable[..., bytes], decompress: Callable[..., bytes]) -> None:
+    """Register a codec usable as `SqliteCache(compression=name)`.
+
+    compress(data, level, zdict) -> bytes, decompress(data, zdict) -> bytes; both run in the codec thread pool.
+    """
+    if ":" in name or name == "none":
+        raise ValueError(f"invalid codec name {name!r}")
+    _CODECS[name] = (compress, decompress)
+
+
+def _chunked(items: List[Any], size: int = _MAX_SQL_VARIABLES) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
 def _to_sql_like(pattern: str) -> str:
     """Translate simple glob-like pattern to SQL LIKE pattern.
 
@@ -52,7 +101,7 @@ def _to_sql_like(pattern: str) -> str:
 
 
 class SqliteCache:
-    """An async SQLite-backed key-value cache with TTL, namespace, and optional gzip compression.
+    """An async SQLite-backed key-value cache with TTL, namespace, and optional compression.
 
     TTL unit: minutes. TTL == 0 means never expires.
 
@@ -61,13 +110,54 @@ class SqliteCache:
         key TEXT NOT NULL,
         value_blob BLOB NOT NULL,
         value_format TEXT NOT NULL,   -- json | bytes
-        compression TEXT NOT NULL,    -- none | gzip
+        compression TEXT NOT NULL,    -- none | <codec> | <codec>:<dict_id>, e.g. gzip, zstd, zstd:3
         size_bytes INTEGER NOT NULL,
         expires_at INTEGER NOT NULL,  -- Unix seconds; 0 means never expire
         created_at INTEGER NOT NULL,
+        last_access_at INTEGER NOT NULL,  -- Unix seconds, for LRU eviction
+        hit_count INTEGER NOT NULL,       -- read hits, for LFU eviction
         UNIQUE(namespace, key)
     Indexes:
         idx_cache_expires_at(expires_at)
+        idx_cache_last_access(last_access_at)
+        idx_cache_ns_last_access(namespace, last_access_at)
+    Table schema (cache_usage), maintained by triggers on cache_items:
+        namespace TEXT PRIMARY KEY, total_bytes INTEGER, item_count INTEGER
+    Table schema (cache_dicts): trained zstd dictionaries, referenced by id from the compression column
+        dict_id INTEGER PRIMARY KEY, namespace TEXT, dict_data BLOB, created_at INTEGER
+
+    Stale-while-revalidate: namespaces listed in `stale_grace_minutes` keep expired entries for that many
+    extra minutes. Plain reads still treat them as missing, but `get_swr` returns such a stale value at once
+    and refreshes it in the background, with at most one refresh in flight per key.
+
+    Compression: values of at least `gzip_threshold_bytes` (after serialization) are compressed with the
+    `compression` codec ("gzip", "zstd" or any name added via `register_codec`) at `compression_level`
+    (None means the codec default). Compression and decompression run in a small thread pool
+    (`codec_workers`), never on the event loop. The codec is recorded per row, so changing it only affects
+    new writes and old rows stay readable.
+    With zstd, a namespace can get a trained dictionary (`train_dictionary`, or automatically for the
+    namespaces listed in `zstd_dict_namespaces` once they hold `zstd_dict_min_samples` entries); values of
+    such a namespace are then compressed with the dictionary from `dict_threshold_bytes` on, which pays
+    off for many similar, moderately sized values such as HTML pages of the same sites.
+
+    Connections: one writer connection (all writes, cleanup and eviction, serialized by `_write_lock`) plus
+    `read_pool_size` query_only reader connections. In WAL mode readers see the last committed state and
+    never wait for the writer, so lookups are not held up by cleanup batches or large blob writes.
+    read_pool_size=0 runs reads on the writer connection.
+
+    Bulk APIs (get_many/set_many/delete_many) run in a single statement batch and a single commit.
+
+    Write-behind mode (write_behind_ms > 0): `set` only stages the row in memory and returns; staged rows
+    are coalesced and flushed in one transaction at most `write_behind_ms` later (or as soon as
+    `write_behind_max_items` rows are staged). Reads from the same instance see staged rows, and a batch
+    being flushed stays visible until its commit is done, so the only staleness is for other
+    processes/connections, bounded by `write_behind_ms`. Call `flush()` to force it.
+
+    Size budget (max_total_bytes / namespace_max_bytes, 0 or missing means unbounded): the background
+    loop evicts least recently (lru) or least frequently (lfu) used entries until usage is back under
+    `evict_to_ratio` of the budget, then runs incremental vacuum to return the freed pages to the OS
+    (files created before auto_vacuum=INCREMENTAL keep them until converted by enable_incremental_vacuum()).
+    Read hits are recorded in memory and written back in batches right before each eviction pass.
     """
 
     def __init__(
@@ -79,6 +169,21 @@ class SqliteCache:
         busy_timeout_ms: int = 3000,
         cleanup_interval_seconds: int = 60,
         autostart_cleanup_task: bool = False,
+        write_behind_ms: int = 0,
+        write_behind_max_items: int = 256,
+        max_total_bytes: int = 0,
+        namespace_max_bytes: Optional[Dict[str, int]] = None,
+        eviction_policy: str = "lru",
+        evict_to_ratio: float = 0.9,
+        compression: str = "gzip",
+        compression_level: Optional[int] = None,
+        codec_workers: int = 2,
+        zstd_dict_namespaces: Optional[Iterable[str]] = None,
+        zstd_dict_size: int = 112 * 1024,
+        zstd_dict_min_samples: int = 200,
+        dict_threshold_bytes: int = 1024,
+        read_pool_size: int = 2,
+        stale_grace_minutes: Optional[Dict[str, int]] = None,
     ) -> None:
         # default_namespace is optional; callers may provide namespace per-call
         self.default_namespace = default_namespace
@@ -88,12 +193,54 @@ class SqliteCache:
         self.busy_timeout_ms = int(busy_timeout_ms)
         self.cleanup_interval_seconds = int(cleanup_interval_seconds)
         self.autostart_cleanup_task = autostart_cleanup_task
+        self.write_behind_ms = max(0, int(write_behind_ms))
+        self.write_behind_max_items = max(1, int(write_behind_max_items))
+        self.max_total_bytes = max(0, int(max_total_bytes or 0))
+        self.namespace_max_bytes = {ns: int(b) for ns, b in (namespace_max_bytes or {}).items() if b and int(b) > 0}
+        if eviction_policy not in ("lru", "lfu"):
+            wis_logger.warning(f"unknown eviction_policy {eviction_policy!r}, fallback to 'lru'")
+            eviction_policy = "lru"
+        self.eviction_policy = eviction_policy
+        self.evict_to_ratio = min(1.0, max(0.1, float(evict_to_ratio)))
+        if compression != "none" and compression not in _CODECS:
+            wis_logger.warning(f"compression codec {compression!r} is not available, fallback to 'gzip'")
+            compression = "gzip"
+        self.compression = compression
+        self.compression_level = compression_level
+        self.codec_workers = max(1, int(codec_workers))
+        self.zstd_dict_namespaces = set(zstd_dict_namespaces or ()) if compression == "zstd" else set()
+        self.zstd_dict_size = int(zstd_dict_size)
+        self.zstd_dict_min_samples = max(1, int(zstd_dict_min_samples))
+        self.dict_threshold_bytes = int(dict_threshold_bytes)
+        self.read_pool_size = max(0, int(read_pool_size))
+        self.stale_grace_minutes = {ns: int(m) for ns, m in (stale_grace_minutes or {}).items() if m and int(m) > 0}
 
-        self._connection: Optional[aiosqlite.Connection] = None
+        self._connection: Optional[aiosqlite.Connection] = None  # the single writer
+        self._read_connections: List[aiosqlite.Connection] = []
+        self._available_readers: Optional[asyncio.Queue] = None
         self._write_lock = asyncio.Lock()  # serialize writes and cleanup
         self._cleanup_task: Optional[asyncio.Task] = None
         self._closed = True
 
+        # write-behind staging area: (namespace, key) -> row tuple ready for upsert
+        self._pending_writes: Dict[Tuple[str, str], tuple] = {}
+        # the batch `flush` is writing right now, still served to readers until it is committed
+        self._inflight: Dict[Tuple[str, str], tuple] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # read hits not yet written back: (namespace, key) -> [last_access_at, hits]
+        self._access_log: Dict[Tuple[str, str], List[int]] = {}
+        self._codec_executor: Optional[ThreadPoolExecutor] = None
+        # trained zstd dictionaries: dict_id -> ZstdCompressionDict, namespace -> dict_id used for new writes
+        self._dicts: Dict[int, Any] = {}
+        self._namespace_dicts: Dict[str, int] = {}
+        self._dict_train_attempts: Dict[str, int] = {}
+        # in-flight get_swr refreshes: (namespace, key) -> task
+        self._refresh_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    @property
+    def eviction_enabled(self) -> bool:
+        return bool(self.max_total_bytes or self.namespace_max_bytes)
+
     def _resolve_namespace(self, namespace: Optional[str]) -> str:
         ns = namespace or self.default_namespace
         if not ns:
@@ -113,6 +260,8 @@ class SqliteCache:
         # PRAGMA for WAL, performance and safety
         # Note: execute PRAGMA one by one for clarity
         pragmas = [
+            # only takes effect on a fresh file; convert existing files with enable_incremental_vacuum()
+            "PRAGMA auto_vacuum=INCREMENTAL;",
             "PRAGMA journal_mode=WAL;",
             "PRAGMA synchronous=NORMAL;",
             f"PRAGMA busy_timeout={self.busy_timeout_ms};",
@@ -128,23 +277,52 @@ class SqliteCache:
 
         await self._initialize_schema()
         await self._connection.commit()
+        await self._init_read_pool()
+        self._codec_executor = ThreadPoolExecutor(max_workers=self.codec_workers, thread_name_prefix="SqliteCacheCodec")
+        await self._load_dicts()
         self._closed = False
 
+        if self.eviction_enabled and not await self._incremental_vacuum_enabled():
+            wis_logger.info(f"{self.db_path} was created without incremental auto_vacuum, evicted space stays in the "
+                            f"file; run `python -m core.tools.db_admin enable-incremental-vacuum` to convert it")
+
         # Initial cleanup at startup
         try:
             cleaned_count = await self._cleanup_expired_items_batch()
             wis_logger.debug(f"auto cleanup deleted {cleaned_count} expired items at startup")
             await self._connection.commit()
+            if self.eviction_enabled:
+                await self.evict()
         except Exception as e:
             wis_logger.warning(f"Initial cleanup failed: {e}")
 
-        if self.autostart_cleanup_task:
+        if self.autostart_cleanup_task or self.eviction_enabled or self.zstd_dict_namespaces:
             task_ns = self.default_namespace or "*"
             self._cleanup_task = asyncio.create_task(self._cleanup_loop(), name=f"SqliteCacheCleanup[{task_ns}]")
 
     async def close(self) -> None:
         if self._closed:
             return
+        for task in list(self._refresh_tasks.values()):
+            task.cancel()
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks.values(), return_exceptions=True)
+        self._refresh_tasks.clear()
+        try:
+            await self.flush()
+            await self._flush_access_log()
+        except Exception as e:
+            wis_logger.warning(f"Final write-behind flush failed: {e}")
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                pass
+            self._flush_task = None
+
         try:
             # Final cleanup on shutdown
             cleaned_count = await self._cleanup_expired_items_batch()
@@ -163,9 +341,20 @@ class SqliteCache:
                 wis_logger.warning(f"Cleanup task termination error: {e}")
             self._cleanup_task = None
 
+        for conn in self._read_connections:
+            try:
+                await conn.close()
+            except Exception as e:
+                wis_logger.warning(f"Failed to close cache reader connection: {e}")
+        self._read_connections.clear()
+        self._available_readers = None
+
         if self._connection is not None:
             await self._connection.close()
             self._connection = None
+        if self._codec_executor is not None:
+            self._codec_executor.shutdown(wait=False)
+            self._codec_executor = None
 
         self._closed = True
 
@@ -196,112 +385,185 @@ class SqliteCache:
         now = _utc_now_seconds()
         ns = self._resolve_namespace(namespace)
 
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            """
-            SELECT value_blob, value_format, compression, expires_at
-            FROM cache_items
-            WHERE namespace = ? AND key = ?
-            """,
-            (ns, key),
-        )
-        row = await cursor.fetchone()
-        await cursor.close()
+        row = await self._fetch_row(ns, key)
         if row is None:
+            CACHE_LOOKUPS.labels(namespace=ns, result="miss").inc()
             return None
 
         expires_at = int(row["expires_at"]) if row["expires_at"] is not None else 0
         if expires_at != 0 and expires_at < now:
-            # expired: delete and return None
-            await self.delete(key, namespace=ns)
+            # expired: delete (unless still inside the stale grace window) and return None
+            CACHE_LOOKUPS.labels(namespace=ns, result="expired").inc()
+            if not self._within_grace(ns, expires_at, now):
+                await self.delete(key, namespace=ns)
             return None
 
-        payload: bytes = row["value_blob"]
-        compression: str = row["compression"]
-        value_format: str = row["value_format"]
-        if compression == "gzip":
-            try:
-                payload = gzip.decompress(payload)
-            except Exception as e:
-                wis_logger.warning(f"Failed to gunzip key={key}: {e}")
-                return None
-        try:
-            value = _deserialize_value(payload, value_format)
-            if include_expires_at:
-                return (value, expires_at)
-            return value
-        except Exception as e:
-            wis_logger.warning(f"Failed to decode value for key={key}: {e}")
+        value = await self._decode_payload(key, row["value_blob"], row["value_format"], row["compression"])
+        if value is None:
+            CACHE_LOOKUPS.labels(namespace=ns, result="miss").inc()
             return None
+        CACHE_LOOKUPS.labels(namespace=ns, result="hit").inc()
+        self._record_access(ns, key, now)
+        if include_expires_at:
+            return (value, expires_at)
+        return value
 
-    async def set(self, key: str, value: Any, expire_time: int, namespace: Optional[str] = None) -> None:
-        """Set a value with TTL in minutes. If expire_time == 0, the entry never expires."""
+    async def get_many(self, keys: Iterable[str], namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Get several keys of one namespace with a single query per 500 keys.
+
+        Returns:
+            Dict mapping each found (and non-expired) key to its value; missing keys are omitted.
+        """
         await self._ensure_open()
         ns = self._resolve_namespace(namespace)
+        now = _utc_now_seconds()
+        wanted = list(dict.fromkeys(keys))
+        if not wanted:
+            return {}
 
-        # Normalize empty-like values to a unified marker
-        if not value:
-            normalized_value = "**empty**"
+        rows: Dict[str, Any] = {}
+        to_query = []
+        for key in wanted:
+            staged = self._staged_row(ns, key)
+            if staged is not None:
+                rows[key] = {"value_blob": staged[2], "value_format": staged[3], "compression": staged[4], "expires_at": staged[6]}
+            else:
+                to_query.append(key)
+
+        async with self._reader() as conn:
+            for chunk in _chunked(to_query):
+                placeholders = ",".join("?" * len(chunk))
+                cursor = await conn.execute(
+                    f"""
+                    SELECT key, value_blob, value_format, compression, expires_at
+                    FROM cache_items
+                    WHERE namespace = ? AND key IN ({placeholders})
+                    """,
+                    (ns, *chunk),
+                )
+                for row in await cursor.fetchall():
+                    rows[row["key"]] = row
+                await cursor.close()
+
+        live = []
+        expired = []
+        for key, row in rows.items():
+            expires_at = int(row["expires_at"]) if row["expires_at"] is not None else 0
+            if expires_at != 0 and expires_at < now:
+                if not self._within_grace(ns, expires_at, now):
+                    expired.append(key)
+            else:
+                live.append((key, row))
+
+        def decode_all() -> List[Tuple[str, Any]]:
+            return [(key, self._decode_sync(key, row["value_blob"], row["value_format"], row["compression"]))
+                    for key, row in live]
+
+        # one thread-pool round trip for the whole batch, and none at all if nothing is compressed
+        if any(row["compression"] != "none" for _, row in live):
+            decoded = await self._run_codec(decode_all)
         else:
-            normalized_value = value
+            decoded = decode_all()
+        result: Dict[str, Any] = {}
+        for key, value in decoded:
+            if value is not None:
+                result[key] = value
+                self._record_access(ns, key, now)
 
-        payload, value_format = _serialize_value(normalized_value)
-        if len(payload) > self.max_item_bytes:
-            wis_logger.warning(
-                f"Value size {len(payload)} exceeds max_item_bytes {self.max_item_bytes}, reject to save"
-            )
+        CACHE_LOOKUPS.labels(namespace=ns, result="hit").inc(len(result))
+        if expired:
+            CACHE_LOOKUPS.labels(namespace=ns, result="expired").inc(len(expired))
+        misses = len(wanted) - len(result) - len(expired)
+        if misses:
+            CACHE_LOOKUPS.labels(namespace=ns, result="miss").inc(misses)
+
+        if expired:
+            await self.delete_many(expired, namespace=ns)
+        return result
+
+    async def get_swr(
+        self,
+        key: str,
+        refresh: Callable[[bool], Awaitable[Any]],
+        expire_time: int,
+        namespace: Optional[str] = None,
+    ) -> Optional[Any]:
+        """Stale-while-revalidate lookup.
+
+        Args:
+            key: Cache key.
+            refresh: Coroutine function producing the new value, or None when the upstream fetch failed
+                (nothing is stored then, a stale value stays available until its grace window ends).
+                Called with `background=True` when a stale value was already served, so it can skip
+                retries and user-facing failure notices.
+            expire_time: TTL in minutes for the refreshed value.
+            namespace: Optional namespace; defaults to the cache's default namespace.
+
+        Returns:
+            The fresh value on a hit; the stale value on a hit within the namespace's grace window, while
+            `refresh` runs in the background; otherwise the result of `refresh` awaited inline.
+            Concurrent callers for the same key share one `refresh` call.
+        """
+        await self._ensure_open()
+        ns = self._resolve_namespace(namespace)
+        now = _utc_now_seconds()
+
+        row = await self._fetch_row(ns, key)
+        if row is not None:
+            expires_at = int(row["expires_at"]) if row["expires_at"] is not None else 0
+            fresh = expires_at == 0 or expires_at >= now
+            if fresh or self._within_grace(ns, expires_at, now):
+                value = await self._decode_payload(key, row["value_blob"], row["value_format"], row["compression"])
+                if value is not None:
+                    self._record_access(ns, key, now)
+                    if not fresh:
+                        self._start_refresh(ns, key, refresh, expire_time, background=True)
+                    return value
+
+        # miss: wait for the (possibly already running) refresh; shield so one cancelled caller does not
+        # cancel the fetch for everybody else
+        return await asyncio.shield(self._start_refresh(ns, key, refresh, expire_time))
+
+    async def set(self, key: str, value: Any, expire_time: int, namespace: Optional[str] = None) -> None:
+        """Set a value with TTL in minutes. If expire_time == 0, the entry never expires."""
+        await self._ensure_open()
+        ns = self._resolve_namespace(namespace)
+        row = self._build_row(ns, key, value, expire_time, _utc_now_seconds())
+        if row is None:
             return
+        row, = await self._compress_rows([row])
 
-        compression = "none"
-        raw_size = len(payload)
-        if raw_size >= self.gzip_threshold_bytes:
-            try:
-                payload = gzip.compress(payload)
-                compression = "gzip"
-            except Exception as e:
-                wis_logger.warning(f"gzip failed for key={key} (store uncompressed). Error: {e}")
-                compression = "none"
-        stored_size = len(payload)
+        if self.write_behind_ms:
+            await self._stage_rows([row])
+            return
 
-        # TTL in minutes -> expires_at (seconds). 0 means never expire
+        async with self._write_lock:
+            await self._upsert_rows([row])
+            await self._connection.commit()
+
+    async def set_many(self, items: Dict[str, Any], expire_time: int, namespace: Optional[str] = None) -> None:
+        """Set several values of one namespace with the same TTL (minutes) in one transaction."""
+        await self._ensure_open()
+        ns = self._resolve_namespace(namespace)
         now = _utc_now_seconds()
-        if expire_time and expire_time > 0:
-            expires_at = now + int(expire_time) * 60
-        else:
-            expires_at = 0
+        rows = [row for row in (self._build_row(ns, k, v, expire_time, now) for k, v in items.items()) if row is not None]
+        if not rows:
+            return
+        rows = await self._compress_rows(rows)
 
-        created_at = now
+        if self.write_behind_ms:
+            await self._stage_rows(rows)
+            return
 
-        assert self._connection is not None
         async with self._write_lock:
-            await self._connection.execute(
-                """
-                INSERT INTO cache_items(namespace, key, value_blob, value_format, compression, size_bytes, expires_at, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(namespace, key) DO UPDATE SET
-                    value_blob=excluded.value_blob,
-                    value_format=excluded.value_format,
-                    compression=excluded.compression,
-                    size_bytes=excluded.size_bytes,
-                    expires_at=excluded.expires_at,
-                    created_at=excluded.created_at
-                """,
-                (
-                    ns,
-                    key,
-                    payload,
-                    value_format,
-                    compression,
-                    stored_size,
-                    expires_at,
-                    created_at,
-                ),
-            )
+            await self._upsert_rows(rows)
             await self._connection.commit()
 
     async def delete(self, key: str, namespace: Optional[str] = None) -> None:
         await self._ensure_open()
         ns = self._resolve_namespace(namespace)
+        self._pending_writes.pop((ns, key), None)
+        self._inflight.pop((ns, key), None)
         assert self._connection is not None
         async with self._write_lock:
             await self._connection.execute(
@@ -310,28 +572,73 @@ class SqliteCache:
             )
             await self._connection.commit()
 
+    async def delete_many(self, keys: Iterable[str], namespace: Optional[str] = None) -> None:
+        """Delete several keys of one namespace in one transaction."""
+        await self._ensure_open()
+        ns = self._resolve_namespace(namespace)
+        targets = list(dict.fromkeys(keys))
+        if not targets:
+            return
+        for key in targets:
+            self._pending_writes.pop((ns, key), None)
+            self._inflight.pop((ns, key), None)
+        assert self._connection is not None
+        async with self._write_lock:
+            for chunk in _chunked(targets):
+                placeholders = ",".join("?" * len(chunk))
+                await self._connection.execute(
+                    f"DELETE FROM cache_items WHERE namespace = ? AND key IN ({placeholders})",
+                    (ns, *chunk),
+                )
+            await self._connection.commit()
+
+    async def flush(self) -> int:
+        """Write all rows staged by write-behind mode in one transaction. Returns the number of rows written."""
+        if not self._pending_writes or self._connection is None:
+            return 0
+        async with self._write_lock:
+            # swap under the lock so rows staged meanwhile go to the next batch
+            batch, self._pending_writes = self._pending_writes, {}
+            if not batch:
+                return 0
+            # readers keep seeing the batch until the commit is done (deletes meanwhile drop keys from it)
+            self._inflight = batch
+            rows = list(batch.values())
+            try:
+                await self._upsert_rows(rows)
+                await self._connection.commit()
+            except Exception:
+                # put the batch back unless newer values were staged (or the keys deleted) meanwhile
+                for k, row in self._inflight.items():
+                    self._pending_writes.setdefault(k, row)
+                raise
+            finally:
+                self._inflight = {}
+            return len(rows)
+
     async def keys(self, pattern: str = "*", namespace: Optional[str] = None) -> List[str]:
         """List keys matching pattern for non-expired entries only.
 
         Pattern supports '*' and '?' wildcards.
         """
         await self._ensure_open()
+        await self.flush()
         ns = self._resolve_namespace(namespace)
         like = _to_sql_like(pattern)
         now = _utc_now_seconds()
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            """
-            SELECT key FROM cache_items
-            WHERE namespace = ?
-              AND (expires_at = 0 OR expires_at >= ?)
-              AND key LIKE ?
-            ORDER BY key
-            """,
-            (ns, now, like),
-        )
-        rows = await cursor.fetchall()
-        await cursor.close()
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT key FROM cache_items
+                WHERE namespace = ?
+                  AND (expires_at = 0 OR expires_at >= ?)
+                  AND key LIKE ?
+                ORDER BY key
+                """,
+                (ns, now, like),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
         return [row["key"] for row in rows]
 
     async def ttl(self, key: str, namespace: Optional[str] = None) -> int:
@@ -345,21 +652,26 @@ class SqliteCache:
         await self._ensure_open()
         ns = self._resolve_namespace(namespace)
         now = _utc_now_seconds()
-        assert self._connection is not None
-        cursor = await self._connection.execute(
-            "SELECT expires_at FROM cache_items WHERE namespace = ? AND key = ?",
-            (ns, key),
-        )
-        row = await cursor.fetchone()
-        await cursor.close()
-        if row is None:
-            return -1
-        expires_at = int(row["expires_at"]) if row["expires_at"] is not None else 0
+        staged = self._staged_row(ns, key)
+        if staged is not None:
+            expires_at = int(staged[6])
+        else:
+            async with self._reader() as conn:
+                cursor = await conn.execute(
+                    "SELECT expires_at FROM cache_items WHERE namespace = ? AND key = ?",
+                    (ns, key),
+                )
+                row = await cursor.fetchone()
+                await cursor.close()
+            if row is None:
+                return -1
+            expires_at = int(row["expires_at"]) if row["expires_at"] is not None else 0
         if expires_at == 0:
             return -1
         if expires_at < now:
             # best-effort cleanup of the single key
-            await self.delete(key, namespace=ns)
+            if not self._within_grace(ns, expires_at, now):
+                await self.delete(key, namespace=ns)
             return -1
         remaining_seconds = expires_at - now
         # Convert to minutes, rounding up any remaining seconds
@@ -381,11 +693,12 @@ class SqliteCache:
         ns = self._resolve_namespace(namespace)
         
         # Convert TTL in minutes to expires_at (seconds). 0 means never expire
-        now = _utc_now_seconds()
-        if expire_time and expire_time > 0:
-            expires_at = now + int(expire_time) * 60
-        else:
-            expires_at = 0
+        expires_at = _expires_at_from_ttl(expire_time, _utc_now_seconds())
+
+        staged = self._pending_writes.get((ns, key))
+        if staged is not None:
+            self._pending_writes[(ns, key)] = staged[:6] + (expires_at,) + staged[7:]
+            return True
             
         assert self._connection is not None
         async with self._write_lock:
@@ -400,7 +713,388 @@ class SqliteCache:
             await self._connection.commit()
             return (cursor.rowcount or 0) > 0
 
+    async def usage(self) -> Dict[str, Tuple[int, int]]:
+        """Return {namespace: (total_bytes, item_count)} as tracked by the cache_usage table."""
+        await self._ensure_open()
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                "SELECT namespace, total_bytes, item_count FROM cache_usage WHERE item_count > 0"
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
+        return {row["namespace"]: (int(row["total_bytes"]), int(row["item_count"])) for row in rows}
+
+    async def evict(self) -> int:
+        """Enforce the configured byte budgets. Returns the number of evicted entries."""
+        await self._ensure_open()
+        if not self.eviction_enabled:
+            return 0
+        await self.flush()
+        await self._flush_access_log()
+
+        usage = await self.usage()
+        evicted = 0
+        for ns, budget in self.namespace_max_bytes.items():
+            used = usage.get(ns, (0, 0))[0]
+            if used > budget:
+                evicted += await self._evict_bytes(used - int(budget * self.evict_to_ratio), namespace=ns)
+
+        if self.max_total_bytes:
+            used = sum(b for b, _ in (await self.usage()).values())
+            if used > self.max_total_bytes:
+                evicted += await self._evict_bytes(used - int(self.max_total_bytes * self.evict_to_ratio))
+
+        if evicted:
+            wis_logger.debug(f"[SqliteCache.evict] policy={self.eviction_policy} evicted={evicted}")
+            await self._incremental_vacuum()
+        return evicted
+
+    async def enable_incremental_vacuum(self) -> bool:
+        """Switch an existing file to auto_vacuum=INCREMENTAL with a one-time full VACUUM.
+
+        The VACUUM rewrites the whole file and blocks every other writer meanwhile, so this is only run from
+        the db_admin tool while wiseflow is stopped, never implicitly on open. Returns True on success.
+        """
+        await self._ensure_open()
+        if await self._incremental_vacuum_enabled():
+            return True
+        await self.flush()
+        async with self._write_lock:
+            await self._connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await self._connection.execute("VACUUM")
+        return await self._incremental_vacuum_enabled()
+
+    async def train_dictionary(
+        self,
+        namespace: Optional[str] = None,
+        max_samples: int = 2000,
+        max_sample_bytes: int = 8 * 1024 * 1024,
+    ) -> Optional[int]:
+        """Train a zstd dictionary on the most recent values of a namespace and use it for its new writes.
+
+        Returns:
+            The new dict_id, or None if zstd is not the active codec, there are fewer than
+            `zstd_dict_min_samples` entries, or training failed.
+        """
+        await self._ensure_open()
+        ns = self._resolve_namespace(namespace)
+        if self.compression != "zstd":
+            wis_logger.warning(f"train_dictionary requires compression='zstd', current is {self.compression!r}")
+            return None
+        await self.flush()
+
+        # pick samples by stored size first, so we never pull more than max_sample_bytes of blobs into memory
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                "SELECT rowid, size_bytes FROM cache_items WHERE namespace = ? ORDER BY created_at DESC LIMIT ?",
+                (ns, int(max_samples)),
+            )
+            candidates = await cursor.fetchall()
+            await cursor.close()
+            if len(candidates) < self.zstd_dict_min_samples:
+                return None
+            rowids, total = [], 0
+            for row in candidates:
+                rowids.append(row["rowid"])
+                total += int(row["size_bytes"])
+                if total >= max_sample_bytes:
+                    break
+            blobs = []
+            for chunk in _chunked(rowids):
+                placeholders = ",".join("?" * len(chunk))
+                cursor = await conn.execute(
+                    f"SELECT key, value_blob, compression FROM cache_items WHERE rowid IN ({placeholders})", chunk
+                )
+                blobs.extend((row["key"], row["value_blob"], row["compression"]) for row in await cursor.fetchall())
+                await cursor.close()
+
+        def train() -> bytes:
+            samples = []
+            for key, payload, compression in blobs:
+                try:
+                    samples.append(self._decompress(payload, compression))
+                except Exception as e:
+                    wis_logger.debug(f"skip sample key={key}: {e}")
+            return zstandard.train_dictionary(self.zstd_dict_size, samples).as_bytes()
+
+        try:
+            dict_data = await self._run_codec(train)
+        except Exception as e:
+            wis_logger.warning(f"zstd dictionary training failed for namespace {ns}: {e}")
+            return None
+
+        async with self._write_lock:
+            cursor = await self._connection.execute(
+                "INSERT INTO cache_dicts(namespace, dict_data, created_at) VALUES (?, ?, ?)",
+                (ns, dict_data, _utc_now_seconds()),
+            )
+            dict_id = cursor.lastrowid
+            await self._connection.commit()
+        self._add_dict(dict_id, ns, dict_data)
+        wis_logger.info(f"trained zstd dictionary {dict_id} for namespace {ns} ({len(dict_data)} bytes, {len(blobs)} samples)")
+        return dict_id
+
     # -------------- internals --------------
+    async def _init_read_pool(self) -> None:
+        self._available_readers = asyncio.Queue(maxsize=self.read_pool_size) if self.read_pool_size else None
+        for _ in range(self.read_pool_size):
+            try:
+                conn = await aiosqlite.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0)
+                conn.row_factory = aiosqlite.Row
+                await conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms};")
+                await conn.execute("PRAGMA query_only=ON;")
+                await conn.execute("PRAGMA temp_store=MEMORY;")
+            except Exception as e:
+                wis_logger.warning(f"Failed to open cache reader connection, reads fall back to the writer: {e}")
+                break
+            self._read_connections.append(conn)
+            self._available_readers.put_nowait(conn)
+        if not self._read_connections:
+            self._available_readers = None
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a reader connection; falls back to the writer when the pool is disabled."""
+        if self._available_readers is None:
+            assert self._connection is not None
+            yield self._connection
+            return
+        conn = await self._available_readers.get()
+        try:
+            yield conn
+        finally:
+            self._available_readers.put_nowait(conn)
+
+    async def _fetch_row(self, ns: str, key: str) -> Optional[Any]:
+        """Raw row lookup (staged writes first), without any expiry handling."""
+        staged = self._staged_row(ns, key)
+        if staged is not None:
+            # row layout: (ns, key, payload, value_format, compression, size_bytes, expires_at, created_at, last_access_at)
+            return {"value_blob": staged[2], "value_format": staged[3], "compression": staged[4], "expires_at": staged[6]}
+        async with self._reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT value_blob, value_format, compression, expires_at
+                FROM cache_items
+                WHERE namespace = ? AND key = ?
+                """,
+                (ns, key),
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
+        return row
+
+    def _staged_row(self, ns: str, key: str) -> Optional[tuple]:
+        """Row staged by write-behind mode, including the batch currently being flushed."""
+        staged = self._pending_writes.get((ns, key))
+        if staged is None:
+            staged = self._inflight.get((ns, key))
+        return staged
+
+    def _within_grace(self, ns: str, expires_at: int, now: int) -> bool:
+        """Whether an expired entry is still kept for stale-while-revalidate."""
+        grace = self.stale_grace_minutes.get(ns, 0)
+        return grace > 0 and expires_at >= now - grace * 60
+
+    def _start_refresh(self, ns: str, key: str, refresh: Callable[[bool], Awaitable[Any]], expire_time: int,
+                       background: bool = False) -> asyncio.Task:
+        task = self._refresh_tasks.get((ns, key))
+        if task is None:
+            task = asyncio.create_task(self._run_refresh(ns, key, refresh, expire_time, background),
+                                       name=f"SqliteCacheRefresh[{ns}]")
+            self._refresh_tasks[(ns, key)] = task
+            task.add_done_callback(lambda t: self._on_refresh_done(ns, key, t))
+        return task
+
+    async def _run_refresh(self, ns: str, key: str, refresh: Callable[[bool], Awaitable[Any]], expire_time: int,
+                           background: bool) -> Optional[Any]:
+        value = await refresh(background)
+        if value is not None and not self._closed:
+            await self.set(key, value, expire_time, namespace=ns)
+        return value
+
+    def _on_refresh_done(self, ns: str, key: str, task: asyncio.Task) -> None:
+        if self._refresh_tasks.get((ns, key)) is task:
+            del self._refresh_tasks[(ns, key)]
+        if not task.cancelled() and task.exception() is not None:
+            # also reported to inline waiters; this covers background refreshes nobody awaits
+            wis_logger.warning(f"cache refresh failed for {ns}:{key}: {task.exception()}")
+
+    def _build_row(self, ns: str, key: str, value: Any, expire_time: int, now: int) -> Optional[tuple]:
+        """Serialize a value into an uncompressed cache_items row tuple; None if it must not be stored."""
+        # Normalize empty-like values to a unified marker
+        if not value:
+            normalized_value = "**empty**"
+        else:
+            normalized_value = value
+
+        payload, value_format = _serialize_value(normalized_value)
+        if len(payload) > self.max_item_bytes:
+            wis_logger.warning(
+                f"Value size {len(payload)} exceeds max_item_bytes {self.max_item_bytes}, reject to save"
+            )
+            return None
+
+        expires_at = _expires_at_from_ttl(expire_time, now)
+        return (ns, key, payload, value_format, "none", len(payload), expires_at, now, now)
+
+    def _compression_for(self, ns: str, size: int) -> Optional[str]:
+        """compression column value a payload of this size in this namespace should be stored with."""
+        if self.compression == "none":
+            return None
+        dict_id = self._namespace_dicts.get(ns)
+        if dict_id is not None and size >= self.dict_threshold_bytes:
+            return f"zstd:{dict_id}"
+        if size >= self.gzip_threshold_bytes:
+            return self.compression
+        return None
+
+    def _compress_row(self, row: tuple) -> tuple:
+        target = self._compression_for(row[0], len(row[2]))
+        if target is None:
+            return row
+        codec, _, dict_id = target.partition(":")
+        try:
+            zdict = self._dicts[int(dict_id)] if dict_id else None
+            payload = _CODECS[codec][0](row[2], self.compression_level, zdict)
+        except Exception as e:
+            wis_logger.warning(f"{codec} failed for key={row[1]} (store uncompressed). Error: {e}")
+            return row
+        if len(payload) >= len(row[2]):
+            return row
+        # row layout: (ns, key, payload, value_format, compression, size_bytes, expires_at, created_at, last_access_at)
+        return row[:2] + (payload, row[3], target, len(payload)) + row[6:]
+
+    async def _compress_rows(self, rows: List[tuple]) -> List[tuple]:
+        if not any(self._compression_for(row[0], len(row[2])) for row in rows):
+            return rows
+        return await self._run_codec(lambda: [self._compress_row(row) for row in rows])
+
+    def _decompress(self, payload: bytes, compression: str) -> bytes:
+        if compression == "none":
+            return payload
+        codec, _, dict_id = compression.partition(":")
+        if codec not in _CODECS:
+            raise ValueError(f"codec {codec!r} is not available")
+        zdict = None
+        if dict_id:
+            zdict = self._dicts.get(int(dict_id))
+            if zdict is None:
+                raise ValueError(f"zstd dictionary {dict_id} is missing")
+        return _CODECS[codec][1](payload, zdict)
+
+    def _decode_sync(self, key: str, payload: bytes, value_format: str, compression: str) -> Optional[Any]:
+        try:
+            payload = self._decompress(payload, compression)
+        except Exception as e:
+            wis_logger.warning(f"Failed to decompress ({compression}) key={key}: {e}")
+            return None
+        try:
+            return _deserialize_value(payload, value_format)
+        except Exception as e:
+            wis_logger.warning(f"Failed to decode value for key={key}: {e}")
+            return None
+
+    async def _decode_payload(self, key: str, payload: bytes, value_format: str, compression: str) -> Optional[Any]:
+        if compression == "none":
+            return self._decode_sync(key, payload, value_format, compression)
+        return await self._run_codec(self._decode_sync, key, payload, value_format, compression)
+
+    async def _run_codec(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run CPU-bound (de)compression off the event loop; gzip and zstd release the GIL."""
+        return await asyncio.get_running_loop().run_in_executor(self._codec_executor, fn, *args)
+
+    def _add_dict(self, dict_id: int, ns: str, dict_data: bytes) -> None:
+        zdict = zstandard.ZstdCompressionDict(dict_data)
+        if self.compression == "zstd":
+            # precompute once here; lazy preparation inside worker threads would race
+            zdict.precompute_compress(level=3 if self.compression_level is None else self.compression_level)
+            self._namespace_dicts[ns] = dict_id
+        self._dicts[dict_id] = zdict
+
+    async def _load_dicts(self) -> None:
+        if zstandard is None:
+            return
+        assert self._connection is not None
+        cursor = await self._connection.execute("SELECT dict_id, namespace, dict_data FROM cache_dicts ORDER BY dict_id")
+        for row in await cursor.fetchall():
+            try:
+                self._add_dict(row["dict_id"], row["namespace"], row["dict_data"])
+            except Exception as e:
+                wis_logger.warning(f"Failed to load zstd dictionary {row['dict_id']}: {e}")
+        await cursor.close()
+
+    async def _auto_train_dicts(self) -> None:
+        """Train a dictionary for each configured namespace once it holds enough samples."""
+        pending = self.zstd_dict_namespaces - set(self._namespace_dicts)
+        if not pending:
+            return
+        usage = await self.usage()
+        for ns in pending:
+            count = usage.get(ns, (0, 0))[1]
+            # after a failed attempt only retry once the namespace has doubled
+            if count < max(self.zstd_dict_min_samples, 2 * self._dict_train_attempts.get(ns, 0)):
+                continue
+            self._dict_train_attempts[ns] = count
+            await self.train_dictionary(ns)
+
+    async def _upsert_rows(self, rows: List[tuple]) -> None:
+        """Upsert rows without committing; caller holds _write_lock and commits."""
+        assert self._connection is not None
+        await self._connection.executemany(
+            """
+            INSERT INTO cache_items(namespace, key, value_blob, value_format, compression, size_bytes, expires_at,
+                                    created_at, last_access_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(namespace, key) DO UPDATE SET
+                value_blob=excluded.value_blob,
+                value_format=excluded.value_format,
+                compression=excluded.compression,
+                size_bytes=excluded.size_bytes,
+                expires_at=excluded.expires_at,
+                created_at=excluded.created_at,
+                last_access_at=excluded.last_access_at
+            """,
+            rows,
+        )
+
+    def _record_access(self, ns: str, key: str, now: int) -> None:
+        if not self.eviction_enabled:
+            return
+        entry = self._access_log.get((ns, key))
+        if entry is None:
+            self._access_log[(ns, key)] = [now, 1]
+        else:
+            entry[0] = now
+            entry[1] += 1
+
+    async def _flush_access_log(self) -> None:
+        if not self._access_log or self._connection is None:
+            return
+        log, self._access_log = self._access_log, {}
+        async with self._write_lock:
+            await self._connection.executemany(
+                "UPDATE cache_items SET last_access_at = MAX(last_access_at, ?), hit_count = hit_count + ? "
+                "WHERE namespace = ? AND key = ?",
+                [(ts, hits, ns, key) for (ns, key), (ts, hits) in log.items()],
+            )
+            await self._connection.commit()
+
+    async def _stage_rows(self, rows: List[tuple]) -> None:
+        for row in rows:
+            self._pending_writes[(row[0], row[1])] = row
+        if len(self._pending_writes) >= self.write_behind_max_items:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later(), name="SqliteCacheWriteBehind")
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.write_behind_ms / 1000.0)
+        try:
+            await self.flush()
+        except Exception as e:
+            wis_logger.warning(f"write-behind flush failed, will retry on next write: {e}")
+
     async def _initialize_schema(self) -> None:
         assert self._connection is not None
         await self._connection.execute(
@@ -422,6 +1116,88 @@ class SqliteCache:
             "CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache_items(expires_at)"
         )
 
+        # access metadata columns were added after the first release; migrate older files in place
+        cursor = await self._connection.execute("PRAGMA table_info(cache_items)")
+        columns = {row["name"] for row in await cursor.fetchall()}
+        await cursor.close()
+        if "last_access_at" not in columns:
+            await self._connection.execute(
+                "ALTER TABLE cache_items ADD COLUMN last_access_at INTEGER NOT NULL DEFAULT 0"
+            )
+            await self._connection.execute("UPDATE cache_items SET last_access_at = created_at")
+        if "hit_count" not in columns:
+            await self._connection.execute(
+                "ALTER TABLE cache_items ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 0"
+            )
+        await self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_items(last_access_at)"
+        )
+        await self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_ns_last_access ON cache_items(namespace, last_access_at)"
+        )
+        # eviction order of the lfu policy
+        await self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_hits_last_access ON cache_items(hit_count, last_access_at)"
+        )
+        await self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_ns_hits_last_access ON cache_items(namespace, hit_count, last_access_at)"
+        )
+
+        # per-namespace byte/item totals, kept exact by triggers so budget checks never scan cache_items
+        cursor = await self._connection.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='cache_usage'"
+        )
+        usage_exists = await cursor.fetchone() is not None
+        await cursor.close()
+        if not usage_exists:
+            await self._connection.execute(
+                """
+                CREATE TABLE cache_usage (
+                    namespace   TEXT PRIMARY KEY,
+                    total_bytes INTEGER NOT NULL,
+                    item_count  INTEGER NOT NULL
+                )
+                """
+            )
+            await self._connection.execute(
+                """
+                INSERT INTO cache_usage(namespace, total_bytes, item_count)
+                SELECT namespace, SUM(size_bytes), COUNT(*) FROM cache_items GROUP BY namespace
+                """
+            )
+        await self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_dicts (
+                dict_id    INTEGER PRIMARY KEY,
+                namespace  TEXT NOT NULL,
+                dict_data  BLOB NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+            """
+        )
+        await self._connection.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_cache_usage_insert AFTER INSERT ON cache_items BEGIN
+                INSERT INTO cache_usage(namespace, total_bytes, item_count) VALUES (NEW.namespace, NEW.size_bytes, 1)
+                ON CONFLICT(namespace) DO UPDATE SET
+                    total_bytes = total_bytes + excluded.total_bytes,
+                    item_count = item_count + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_cache_usage_update AFTER UPDATE OF size_bytes, namespace ON cache_items BEGIN
+                UPDATE cache_usage SET total_bytes = total_bytes - OLD.size_bytes, item_count = item_count - 1
+                WHERE namespace = OLD.namespace;
+                INSERT INTO cache_usage(namespace, total_bytes, item_count) VALUES (NEW.namespace, NEW.size_bytes, 1)
+                ON CONFLICT(namespace) DO UPDATE SET
+                    total_bytes = total_bytes + excluded.total_bytes,
+                    item_count = item_count + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_cache_usage_delete AFTER DELETE ON cache_items BEGIN
+                UPDATE cache_usage SET total_bytes = total_bytes - OLD.size_bytes, item_count = item_count - 1
+                WHERE namespace = OLD.namespace;
+            END;
+            """
+        )
+
     async def _cleanup_expired_items_batch(self, batch_size: int = 1000) -> int:
         """Delete up to batch_size expired items.
 
@@ -429,21 +1205,74 @@ class SqliteCache:
         """
         assert self._connection is not None
         now = _utc_now_seconds()
+        # namespaces with a stale grace window are only purged once the window has passed too
+        cutoff_sql, cutoff_params = "?", [now]
+        if self.stale_grace_minutes:
+            whens = " ".join("WHEN ? THEN ?" for _ in self.stale_grace_minutes)
+            cutoff_sql = f"CASE namespace {whens} ELSE ? END"
+            cutoff_params = [p for ns, m in self.stale_grace_minutes.items() for p in (ns, now - m * 60)] + [now]
         async with self._write_lock:
             cursor = await self._connection.execute(
-                """
+                f"""
                 DELETE FROM cache_items
                 WHERE rowid IN (
                     SELECT rowid FROM cache_items
-                    WHERE expires_at > 0 AND expires_at < ?
+                    WHERE expires_at > 0 AND expires_at < ? AND expires_at < {cutoff_sql}
                     LIMIT ?
                 )
                 """,
-                (now, batch_size),
+                (now, *cutoff_params, batch_size),
             )
             await self._connection.commit()
             return cursor.rowcount or 0
 
+    async def _evict_bytes(self, bytes_to_free: int, namespace: Optional[str] = None, batch_size: int = 500) -> int:
+        """Delete coldest entries (by eviction policy) until at least bytes_to_free bytes are released."""
+        assert self._connection is not None
+        order = "last_access_at" if self.eviction_policy == "lru" else "hit_count, last_access_at"
+        where = "WHERE namespace = ?" if namespace else ""
+        params: tuple = (namespace,) if namespace else ()
+        evicted = 0
+        while bytes_to_free > 0:
+            async with self._write_lock:
+                cursor = await self._connection.execute(
+                    f"SELECT rowid, size_bytes FROM cache_items {where} ORDER BY {order} LIMIT ?",
+                    (*params, batch_size),
+                )
+                candidates = await cursor.fetchall()
+                await cursor.close()
+                if not candidates:
+                    break
+                victims = []
+                for row in candidates:
+                    victims.append(row["rowid"])
+                    bytes_to_free -= int(row["size_bytes"])
+                    if bytes_to_free <= 0:
+                        break
+                placeholders = ",".join("?" * len(victims))
+                await self._connection.execute(f"DELETE FROM cache_items WHERE rowid IN ({placeholders})", victims)
+                await self._connection.commit()
+                evicted += len(victims)
+        return evicted
+
+    async def _incremental_vacuum_enabled(self) -> bool:
+        assert self._connection is not None
+        cursor = await self._connection.execute("PRAGMA auto_vacuum")
+        row = await cursor.fetchone()
+        await cursor.close()
+        return row is not None and int(row[0]) == 2
+
+    async def _incremental_vacuum(self, max_pages: int = 2000) -> None:
+        assert self._connection is not None
+        try:
+            async with self._write_lock:
+                cursor = await self._connection.execute(f"PRAGMA incremental_vacuum({int(max_pages)})")
+                await cursor.fetchall()
+                await cursor.close()
+                await self._connection.commit()
+        except Exception as e:
+            wis_logger.warning(f"incremental vacuum failed: {e}")
+
     async def _cleanup_loop(self) -> None:
         try:
             while not self._closed:
@@ -459,6 +1288,9 @@ class SqliteCache:
                         wis_logger.debug(
                             f"[SqliteCache.cleanup] default_namespace={self.default_namespace or '*'} deleted={total_deleted}"
                         )
+                    # expired entries go first, then enforce the byte budget on what is left
+                    await self.evict()
+                    await self._auto_train_dicts()
                 except asyncio.CancelledError:
                     raise
                 except Exception as e:
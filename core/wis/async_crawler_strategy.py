@@ -21,6 +21,7 @@ from .async_configs import BrowserConfig, CrawlerRunConfig
 from .ssl_certificate import SSLCertificate
 from .browser_manager import BrowserManager
 from .browser_adapter import UndetectedAdapter
+from core.tools.tracing import traced
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -597,6 +598,7 @@ class AsyncPlaywrightCrawlerStrategy(AsyncCrawlerStrategy):
                 "URL must start with 'http://', 'https://', 'file://', or 'raw:'"
             )
 
+    @traced("fetch", attrs=("url",))
     async def _crawl_web(
         self, url: str, config: CrawlerRunConfig) -> AsyncCrawlResponse:
         """
@@ -636,6 +638,7 @@ class AsyncPlaywrightCrawlerStrategy(AsyncCrawlerStrategy):
         handle_error = None # 视 patchright 实现而定
 
         # 适用于 async_crawler_strategy.py
+        @traced("page.goto")
         async def page_go(url: str):
             nonlocal page, context
             max_retries = 2
@@ -1030,6 +1033,7 @@ class AsyncPlaywrightCrawlerStrategy(AsyncCrawlerStrategy):
                 await self.browser_manager.release_page(page)
 
     # async def _handle_full_page_scan(self, page: Page, scroll_delay: float = 0.1):
+    @traced("scroll")
     async def _handle_full_page_scan(self, page: Page, scroll_delay: float = 0.1, max_scroll_steps: Optional[int] = None):
         """
         Helper method to handle full page scanning.
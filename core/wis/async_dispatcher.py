@@ -18,6 +18,14 @@ from abc import ABC, abstractmethod
 
 from .utils import get_true_memory_usage_percent
 from .config import config
+from core.tools.metrics import registry as metrics_registry
+
+QUEUE_DEPTH = metrics_registry.gauge("wiseflow_dispatcher_queue_depth", "dispatcher 队列中等待抓取的 URL 数")
+ACTIVE_SESSIONS = metrics_registry.gauge("wiseflow_dispatcher_active_sessions", "正在执行的抓取任务数")
+MEMORY_PERCENT = metrics_registry.gauge("wiseflow_dispatcher_memory_percent", "dispatcher 最近一次采样的内存占用百分比")
+MEMORY_PRESSURE_SECONDS = metrics_registry.counter(
+    "wiseflow_dispatcher_memory_pressure_seconds_total", "处于内存压力模式（不启动新任务）的累计时长"
+)
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -166,6 +174,10 @@ class MemoryAdaptiveDispatcher(BaseDispatcher):
                 self._high_memory_start_time = None
             elif self.current_memory_percent < self.memory_threshold_percent:
                 self._high_memory_start_time = None
+
+            MEMORY_PERCENT.set(self.current_memory_percent)
+            if self.memory_pressure_mode:
+                MEMORY_PRESSURE_SECONDS.inc(self.check_interval)
                 
             await asyncio.sleep(self.check_interval)
     
@@ -327,6 +339,9 @@ class MemoryAdaptiveDispatcher(BaseDispatcher):
                     # If no active tasks but still waiting, sleep briefly
                     await asyncio.sleep(self.check_interval / 2)
                     
+                QUEUE_DEPTH.set(self.task_queue.qsize())
+                ACTIVE_SESSIONS.set(len(active_tasks))
+
                 # Update priorities for waiting tasks if needed
                 await self._update_queue_priorities()
 
@@ -336,6 +351,7 @@ class MemoryAdaptiveDispatcher(BaseDispatcher):
         finally:
             # Clean up
             memory_monitor.cancel()
+            ACTIVE_SESSIONS.set(0)
             return results
                 
     async def _update_queue_priorities(self):
@@ -446,12 +462,16 @@ class MemoryAdaptiveDispatcher(BaseDispatcher):
                     # If no active tasks but still waiting, sleep briefly
                     await asyncio.sleep(self.check_interval / 2)
                 
+                QUEUE_DEPTH.set(self.task_queue.qsize())
+                ACTIVE_SESSIONS.set(len(active_tasks))
+
                 # Update priorities for waiting tasks if needed
                 await self._update_queue_priorities()
                 
         finally:
             # Clean up
-            memory_monitor.cancel()             
+            memory_monitor.cancel()
+            ACTIVE_SESSIONS.set(0)
 
 
 class SemaphoreDispatcher(BaseDispatcher):
@@ -30,6 +30,13 @@ from .utils import (
     common_file_exts,
 )
 from core.tools.general_utils import normalize_publish_date
+from core.tools.metrics import registry as metrics_registry
+from core.tools.tracing import traced
+from urllib.parse import urlparse
+
+FETCH_SECONDS = metrics_registry.histogram(
+    "wiseflow_fetch_duration_seconds", "按域名与结果（ok/empty/error）统计的页面抓取耗时",
+    ["domain", "outcome"])
 
 
 class AsyncWebCrawler:
@@ -106,6 +113,7 @@ class AsyncWebCrawler:
         """异步空上下文管理器"""
         yield
 
+    @traced("crawl", attrs=("url",))
     async def arun(self, url: str, config: CrawlerRunConfig = None, session_id: str = None) -> Optional[CrawlResult]:
         if self.db_manager:
             cached_result = await self.db_manager.get(url)
@@ -139,6 +147,7 @@ class AsyncWebCrawler:
         #        break
 
         async with self._lock or self.nullcontext():
+            t1 = time.perf_counter()
             try:
                 # Initialize processing variables
                 async_response: AsyncCrawlResponse = None
@@ -148,7 +157,6 @@ class AsyncWebCrawler:
                 # pro 版本无需根据domain获取config
                 config = config or self.crawler_config_map['default']
 
-                t1 = time.perf_counter()
                 ##############################
                 # Call CrawlerStrategy.crawl #
                 ##############################
@@ -165,11 +173,15 @@ class AsyncWebCrawler:
                 js_execution_result = async_response.js_execution_result
                 success = bool(html)
                 t2 = time.perf_counter()
+                FETCH_SECONDS.labels(domain=urlparse(url).netloc.lower(),
+                                     outcome="ok" if success else "empty").observe(t2 - t1)
                 if success:
                     wis_logger.debug(f"[FETCH] ✓ {url:.30}... | ⏱: {t2 - t1:.2f}s")
                 else:
                     wis_logger.info(f"[FETCH] ✗ {url} | ⏱: {t2 - t1:.2f}s")
             except Exception as e:
+                FETCH_SECONDS.labels(domain=urlparse(url).netloc.lower(),
+                                     outcome="error").observe(time.perf_counter() - t1)
                 wis_logger.error(f"[Crawl Failed] {url}\n{str(e)}")
                 return CrawlResult(
                     url=url, html="", success=False, error_message=str(e)
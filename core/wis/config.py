@@ -25,6 +25,36 @@ _default_config = {
     # Caching LifeTime Setting(in days)
     'WEB_ARTICLE_TTL': 15,
     'SocialMedia_TTL': 2,
+    # Cache size budget (in MB, 0 means unbounded / eviction off), per-namespace budgets e.g. {"articles": 1024};
+    # caches created by older versions only shrink on disk after `python -m core.tools.db_admin enable-incremental-vacuum`
+    'CACHE_MAX_SIZE_MB': 0,
+    'CACHE_NAMESPACE_MAX_SIZE_MB': {},
+    'CACHE_EVICTION_POLICY': 'lru',  # lru | lfu
+    # Cache compression codec: zstd | gzip | none (zstd falls back to gzip if zstandard is not installed)
+    'CACHE_COMPRESSION': 'zstd',
+    'CACHE_COMPRESSION_LEVEL': 3,
+    # namespaces that get a trained zstd dictionary once they hold enough entries
+    'CACHE_ZSTD_DICT_NAMESPACES': ['articles'],
+    # stale-while-revalidate grace window (in minutes) per namespace: expired entries are served while refreshing
+    'CACHE_STALE_GRACE_MINUTES': {'rss': 60 * 24, 'github_search': 60 * 24, 'bing': 60 * 24, 'arxiv': 60 * 24},
+    # data.db background maintenance (run by the backend): WAL checkpoint cadence, WAL size that triggers a
+    # TRUNCATE checkpoint, PRAGMA optimize cadence, ws_history retention, and moving infos older than N days
+    # into monthly archive databases under work_dir/archive (0 keeps infos forever)
+    'DB_CHECKPOINT_INTERVAL_MINUTES': 5,
+    'DB_WAL_TRUNCATE_MB': 64,
+    'DB_OPTIMIZE_INTERVAL_HOURS': 6,
+    'WS_HISTORY_RETENTION_HOURS': 24,
+    'INFO_ARCHIVE_AFTER_DAYS': 0,
+    # tracing (off by default, read once when the task process starts): per-slot spans written to
+    # work_dir/traces/spans.jsonl (rotated at TRACE_FILE_MAX_MB, keeping TRACE_FILE_BACKUPS old files);
+    # set TRACE_OTLP_ENDPOINT (e.g. http://localhost:4318) to also send them to a collector
+    'TRACING_ENABLED': False,
+    'TRACE_FILE_MAX_MB': 20,
+    'TRACE_FILE_BACKUPS': 5,
+    'TRACE_OTLP_ENDPOINT': '',
+    # profiling of time-slot runs ('' off | sample | cprofile; env WISEFLOW_PROFILE overrides), reports in work_dir/profiles
+    'PROFILE_MODE': '',
+    'PROFILE_TOP_N': 30,
     
     # Web 配置
     'CHUNK_TOKEN_THRESHOLD': 2**11,  # 2048 tokens
@@ -8,7 +8,8 @@ from .llmuse import *
 from .chunking_strategy import ChunkingStrategy, MaxLengthChunking
 from .extraction_strategy import ExtractionStrategy
 from .markdown_generation_strategy import DefaultMarkdownGenerator, WeixinArticleMarkdownGenerator
-from .utils import split_and_parse_json_objects
+from .utils import split_and_parse_json_objects, extract_xml_data
+from core.tools.tracing import traced, span, current_span
 import asyncio
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING, Tuple, Any, List, Dict
@@ -24,41 +25,6 @@ _chunker = MaxLengthChunking(max_length=config['MAX_CHUNK_SIZE'])
 default_markdown_generator = DefaultMarkdownGenerator()
 weixin_markdown_generator = WeixinArticleMarkdownGenerator()
 
-def extract_xml_data(tags, string):
-    """
-    Extract data for specified XML tags from a string, returning the longest content for each tag.
-
-    How it works:
-    1. Finds all occurrences of each tag in the string using regex.
-    3. Returns a dictionary of tag-content pairs.
-
-    Args:
-        tags (List[str]): The list of XML tags to extract.
-        string (str): The input string containing XML data.
-
-    Returns:
-        Dict[str, str]: A dictionary with tag names as keys and longest extracted content as values.
-    """
-
-    if '</think>' in string:
-        string = string.split('</think>')[1]
-
-    data = {}
-
-    for tag in tags:
-        pattern = f"<{tag}>(.*?)</{tag}>"
-        matches = re.findall(pattern, string, re.DOTALL)
-        
-        if matches:
-            # Find the longest content for this tag
-            # longest_content = max(matches, key=len).strip()
-            # 改为返回所有匹配
-            data[tag] = matches
-        else:
-            data[tag] = []
-
-    return data
-
 def hash_calculate(text: str) -> str:
     if not text:
         return ''
@@ -200,6 +166,7 @@ class ExtractManager:
         else:
             self.prompt = role_and_purpose + PROMPT_EXTRACT_BLOCKS.replace('{FOCUS_POINT}', focus_str)
 
+    @traced("extract", attrs=("mode",))
     async def __call__(self, article: Optional[CrawlResult] = None, mode: Optional[str] = 'both', **kwargs) -> Tuple[int, set]:
         # 统一异步函数，多种用途，除了解析外，未来还可以灵活搭配其他方案，用作 article 对象的更新
         markdown = kwargs.get('markdown', article.markdown if article else None)
@@ -211,6 +178,7 @@ class ExtractManager:
         html = kwargs.get('html', article.html if article else None)
         cleaned_html = kwargs.get('cleaned_html', article.cleaned_html if article else None)
         metadata = kwargs.get('metadata', article.metadata if article else {})
+        current_span().set(url=url)
 
         if mode == 'only_link' and config['EXCLUDE_EXTERNAL_LINKS'] and "mp.weixin.qq.com" in url:
             return 0, set()
@@ -295,25 +263,36 @@ class ExtractManager:
                 return 0, set()
             mode = 'only_info'
 
-        for section in sections:
-            content_hash = await asyncio.get_event_loop().run_in_executor(
+        # 一次性计算所有 section 的 hash，并批量检查缓存（单次查询代替逐 section 的 get）
+        loop = asyncio.get_event_loop()
+        cache_namespace = f"focus_{self.focus_id}"
+        async with span("chunk_hash_lookup", sections=len(sections)):
+            section_hashes = await loop.run_in_executor(
                 None,  # 使用默认线程池
-                hash_calculate,
-                section
+                lambda: [hash_calculate(section) for section in sections]
             )
+            processed = await self.cache_manager.get_many([h for h in section_hashes if h], namespace=cache_namespace)
+        to_process = []
+        seen_hashes = set()
+        for section, content_hash in zip(sections, section_hashes):
             if not content_hash:
                 continue
-
             # 从缓存中检查该内容是否已经被当前focus_id处理过
-            cache_namespace = f"focus_{self.focus_id}"
+            if processed.get(content_hash):
+                wis_logger.info(f"Content already processed: hash={content_hash[:8]}..., focus_id={self.focus_id}")
+                continue
+            if content_hash in seen_hashes:
+                continue
+            seen_hashes.add(content_hash)
+            to_process.append((section, content_hash))
+
+        for i, (section, content_hash) in enumerate(to_process):
             cache_key = f"{content_hash}"
-            
-            # 检查缓存中是否已存在处理记录
-            cached_result = await self.cache_manager.get(cache_key, namespace=cache_namespace)
-            if cached_result:
+            # 前面段落的 LLM 调用期间，同一内容可能已被其他任务（同一文章经不同信源/关注点到达）处理，标记前再查一次
+            if i and await self.cache_manager.get(cache_key, namespace=cache_namespace):
                 wis_logger.info(f"Content already processed: hash={content_hash[:8]}..., focus_id={self.focus_id}")
                 continue
-            # 先存一次，避免相同内容短时间并发导致重复提交
+            # 先存一次，避免相同内容短时间并发导致重复提交（只标记即将处理的这一段，中途取消时后续段落不受影响）
             await self.cache_manager.set(cache_key, True, 0, namespace=cache_namespace)
             sec_infos = []
             sec_link_blocks = []
@@ -430,6 +409,7 @@ class ExtractManager:
         
         # 解析 infos 存储过程，注意过滤 **empty** 和 空内容
         info_count = 0
+        to_save = []
         for info in infos:
             if not info or not isinstance(info, dict):
                 continue
@@ -447,12 +427,10 @@ class ExtractManager:
                     continue
             
             info_count += 1
-            if self.db_manager:
-                await self.db_manager.add_info(
-                    focus_statement=self.focus_statement,
-                    focus_id=self.focus_id,
-                    **info
-                )
+            to_save.append(info)
+        # 同一篇文章的全部 infos 一次写入
+        if self.db_manager and to_save:
+            await self.db_manager.add_infos(to_save, focus_statement=self.focus_statement, focus_id=self.focus_id)
         # 根据抽取结果判断是否需要缓存（作为信源级已经缓存5h了，这里其实是判断这是文章页还是列表页，标准是提取出 info 且提取出的links 不超过5个）：
         if (mode == 'only_info' or (info_count > 0 and len(more_links) < 5)) and markdown and url:
             await self.cache_manager.update_ttl(url, 60*24*config['WEB_ARTICLE_TTL'])
@@ -2,8 +2,11 @@ from openai import AsyncOpenAI as OpenAI
 from openai import RateLimitError, APIError
 from typing import List
 import os
+import time
 import asyncio
 from core.async_logger import wis_logger
+from core.tools.metrics import registry as metrics_registry
+from core.tools.tracing import traced, emit_span
 
 base_url = os.environ.get('LLM_API_BASE', "")
 token = os.environ.get('LLM_API_KEY', "")
@@ -22,6 +25,15 @@ else:
     client = OpenAI(api_key=token, base_url=base_url)
 
 concurrent_number = int(os.environ.get('LLM_CONCURRENT_NUMBER', 1))
+# 失败重试次数与首次重试等待（秒，之后每次翻倍）
+max_retries = max(1, int(os.environ.get('LLM_MAX_RETRIES', 3)))
+retry_wait = float(os.environ.get('LLM_RETRY_WAIT', 20))
+
+# 指标：单次请求耗时、排队（等待信号量）耗时、token 用量、错误数，均按模型区分
+LLM_SECONDS = metrics_registry.histogram("wiseflow_llm_request_duration_seconds", "LLM 单次请求耗时", ["model"])
+LLM_QUEUE_SECONDS = metrics_registry.histogram("wiseflow_llm_queue_wait_seconds", "等待 LLM 并发信号量的耗时", ["model"])
+LLM_TOKENS = metrics_registry.counter("wiseflow_llm_tokens_total", "LLM token 用量", ["model", "kind"])
+LLM_ERRORS = metrics_registry.counter("wiseflow_llm_errors_total", "LLM 请求错误数", ["model", "kind"])
 
 # 全局信号量对象，避免重复创建
 _semaphore = None
@@ -41,26 +53,40 @@ async def cleanup_semaphore():
     global _semaphore
     _semaphore = None
 
+@traced("llm", attrs=("model",))
 async def llm_async(messages: List, model: str, **kwargs):
-    max_retries = 3
-    wait_time = 20
+    wait_time = retry_wait
 
     semaphore = await get_semaphore()
+    queued_at = time.perf_counter()
     async with semaphore:  # 使用信号量控制并发
+        queue_wait = time.perf_counter() - queued_at
+        LLM_QUEUE_SECONDS.labels(model=model).observe(queue_wait)
+        emit_span("llm.queue", queue_wait, model=model)
         for retry in range(max_retries):
+            start = time.perf_counter()
             try:
                 response = await client.chat.completions.create(
                     messages=messages,
                     model=model,
                     **kwargs
                 )
+                cost = time.perf_counter() - start
+                LLM_SECONDS.labels(model=model).observe(cost)
+                emit_span("llm.inference", cost, model=model, attempt=retry + 1)
+                usage = getattr(response, 'usage', None)
+                if usage:
+                    LLM_TOKENS.labels(model=model, kind="prompt").inc(usage.prompt_tokens or 0)
+                    LLM_TOKENS.labels(model=model, kind="completion").inc(usage.completion_tokens or 0)
                 return response
             except RateLimitError as e:
                 # rate limit error, retry
+                LLM_ERRORS.labels(model=model, kind="rate_limit").inc()
                 if retry == max_retries - 1:
                     error_msg = f"{model} Rate limit error: {str(e)}. Already Retried {max_retries} times."
                     wis_logger.warning(error_msg)
             except APIError as e:
+                LLM_ERRORS.labels(model=model, kind=f"api_{getattr(e, 'status_code', 'unknown')}").inc()
                 if hasattr(e, 'status_code'):
                     if e.status_code in [400, 401, 413]:
                         # client error, no need to retry
@@ -81,6 +107,7 @@ async def llm_async(messages: List, model: str, **kwargs):
                     wis_logger.warning(error_msg)
             except Exception as e:
                 # other exception, retry
+                LLM_ERRORS.labels(model=model, kind="unexpected").inc()
                 error_msg = f"{model} Unexpected error: {str(e)}. Retry {retry+1}/{max_retries}."
                 wis_logger.warning(error_msg)
 
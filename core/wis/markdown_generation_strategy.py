@@ -3,10 +3,11 @@ from typing import Optional, Dict, Any, Tuple
 from .html2text import CustomHTML2Text
 import regex as re
 from .utils import normalize_url, url_pattern, is_valid_img_url, is_external_url, get_base_domain
-from core.wis.utils import normalize_publish_date
+from core.tools.general_utils import normalize_publish_date
 from .config import config
 from bs4 import BeautifulSoup
 from .llmuse import llm_async, vl_model, VL_PROMPT_EXTRACT_TEXT_FROM_IMG
+from core.tools.tracing import traced
 import asyncio
 
 # Pre-compile the regex pattern
@@ -283,6 +284,7 @@ class DefaultMarkdownGenerator(MarkdownGenerationStrategy):
             markdown += f"\n</main-content>"
         return markdown.strip(), link_dict
 
+    @traced("html2markdown", attrs=("base_url",))
     async def generate_markdown(
         self,
         raw_html: str,
@@ -366,6 +368,7 @@ class WeixinArticleMarkdownGenerator(DefaultMarkdownGenerator):
     def __init__(self, options: Optional[Dict[str, Any]] = None):
         self.options = options or {}
 
+    @traced("html2markdown", attrs=("base_url",))
     async def generate_markdown(
         self, 
         raw_html: str,
@@ -5,8 +5,9 @@ from core.async_logger import wis_logger
 from ..basemodels import CrawlResult
 from ..async_webcrawler import AsyncWebCrawler
 from ..async_cache import SqliteCache
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from ..ws_connect import notify_user
+from core.tools.tracing import traced
 
 # The unified search entry for every engine under `engines/`.
 # `engine` argument specifying which engine implementation to use.
@@ -14,6 +15,62 @@ from ..ws_connect import notify_user
 # prior to use httpx, but bing ebay cannot
 # use a web-crawler, you can bennifit the cache feature
 
+async def _fetch_search_results(engine: str, query: str, crawler: AsyncWebCrawler, background: bool = False,
+                                **kwargs) -> Optional[list]:
+    """Query *engine* and parse its response; None if the engine is unknown or the request failed.
+
+    A *background* refresh (a stale result was already served) tries once and does not notify the user.
+    """
+    # --- locate engine implementation ------------------------------------------------
+    try:
+        engine_module = importlib.import_module(f"wis.searchengines.engines.{engine}")
+    except ImportError as e:
+        wis_logger.error(f"Engine '{engine}' not found: {e}")
+        return None
+
+    if engine == "arxiv":
+        request_params = engine_module.gen_request_params(query, **kwargs)
+        method = request_params.get("method", "GET").upper()
+        url = request_params["url"]
+        attempts = 1 if background else 3
+        async with httpx.AsyncClient(timeout=120) as client:
+            for attempt in range(attempts):
+                try:
+                    response = await client.request(method, url)
+                    response.raise_for_status
+                    break
+                except Exception as e:
+                    if attempt < attempts - 1:
+                        delay = 1 * (2 ** attempt)
+                        wis_logger.debug(
+                            f"{engine} search attempt {attempt + 1} failed with error: {str(e)}, retrying in {delay} seconds"
+                        )
+                        await asyncio.sleep(delay)
+                    else:
+                        wis_logger.warning(
+                            f"{engine} search failed after {attempts} attempts with error: {str(e)}"
+                        )
+                        if not background:
+                            await notify_user(15, ['arxiv'])
+                        return None
+        html = response.text
+
+    elif engine == "bing":
+        url = engine_module.gen_query_url(query, **kwargs)
+        result = await crawler.arun(url)
+        if not result or not result.success:
+            wis_logger.warning(f"Search with Engine '{engine}', query '{query}', due to crawler, failed")
+            if not background:
+                await notify_user(15, ['bing'])
+            return None
+        html = result.html
+
+    search_results = engine_module.parse_response(html)
+    wis_logger.debug(f"from {engine} got {len(search_results)} search_results")
+    return search_results
+
+
+@traced("search", attrs=("engine", "query"))
 async def search_with_engine(engine: str, 
                              query: str, 
                              crawler: AsyncWebCrawler, 
@@ -38,58 +95,16 @@ async def search_with_engine(engine: str,
     Tuple[List[CrawlResult], str, dict]
         A tuple of search result dictionaries, the markdown content, and the link dictionary.
     """
-    # --- locate engine implementation ------------------------------------------------
-    search_results = []
+    # 过期但仍在宽限期内的缓存会被立即返回，同时在后台刷新
     if cache_manager:
-        search_results = await cache_manager.get(query, namespace=engine)
-        if search_results == '**empty**':
-            return [], "", {}
-        
-    if not search_results:
-        try:
-            engine_module = importlib.import_module(f"wis.searchengines.engines.{engine}")
-        except ImportError as e:
-            wis_logger.error(f"Engine '{engine}' not found: {e}")
-            return [], "", {}
-        
-        if engine == "arxiv":
-            request_params = engine_module.gen_request_params(query, **kwargs)
-            method = request_params.get("method", "GET").upper()
-            url = request_params["url"]
-            async with httpx.AsyncClient(timeout=120) as client:
-                for attempt in range(3):
-                    try:
-                        response = await client.request(method, url)
-                        response.raise_for_status
-                        break
-                    except Exception as e:
-                        if attempt < 2:
-                            delay = 1 * (2 ** attempt)
-                            wis_logger.debug(
-                                f"{engine} search attempt {attempt + 1} failed with error: {str(e)}, retrying in {delay} seconds"
-                            )
-                            await asyncio.sleep(delay)
-                        else:
-                            wis_logger.warning(
-                                f"{engine} search failed after 3 attempts with error: {str(e)}"
-                            )
-                            await notify_user(15, ['arxiv'])
-                            return [], "", {}
-            html = response.text
-
-        elif engine == "bing":
-            url = engine_module.gen_query_url(query, **kwargs)
-            result = await crawler.arun(url)
-            if not result or not result.success:
-                wis_logger.warning(f"Search with Engine '{engine}', query '{query}', due to crawler, failed")
-                await notify_user(15, ['bing'])
-                return [], "", {}
-            html = result.html
-
-        search_results = engine_module.parse_response(html)
-        wis_logger.debug(f"from {engine} got {len(search_results)} search_results")
-        if cache_manager:
-            await cache_manager.set(query, search_results, 60*24, namespace=engine)
+        search_results = await cache_manager.get_swr(
+            query, lambda background: _fetch_search_results(engine, query, crawler, background, **kwargs), 60*24,
+            namespace=engine
+        )
+    else:
+        search_results = await _fetch_search_results(engine, query, crawler, **kwargs)
+    if not search_results or search_results == '**empty**':
+        return [], "", {}
 
     articles = []
     markdown = ""
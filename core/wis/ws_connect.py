@@ -1,17 +1,161 @@
 import os
-from typing import Optional, Dict, List
+import json
+import asyncio
+import weakref
+import threading
+from collections import deque
+from typing import Optional, Dict, List, Deque
 import httpx
 from core.async_logger import wis_logger
+from core.async_database import base_directory
+
+
+# notify 合并发送的窗口（秒）
+NOTIFY_BATCH_WINDOW = 0.2
+# 后端不可用时暂存的通知上限（超出丢弃最旧的）
+NOTIFY_SPOOL_LIMIT = 200
+# 通道关闭时仍未送达的通知写入此文件，下次建立通道后补发
+NOTIFY_SPOOL_PATH = base_directory / "notify_spool.jsonl"
+# 各时段的通道在各自线程中读写同一个 spool 文件，读取+删除与追加写须互斥
+_spool_lock = threading.Lock()
+
+
+def _backend_url() -> str:
+    return f"http://127.0.0.1:{os.environ.get('WISEFLOW_BACKEND_PORT', 8077)}"
+
+
+class _BackendChannel:
+    """
+    任务进程到后端的长连接通道，每个事件循环一个（run_task 每个时段新建一个事件循环）。
+
+    - 复用同一个 httpx.AsyncClient（keep-alive），不必每条消息都重新建立 TCP 连接
+    - notify 只入队立即返回，后台在 NOTIFY_BATCH_WINDOW 内合并为一次 /user_notify_batch 请求
+    - 后端不可用时通知留在有界队列中按退避重试；关闭通道时仍未送达的写入本地 spool 文件
+    - spool 文件在线程池中读写，不阻塞事件循环；上次留下的通知排在本通道新通知之前
+    - 请求用户确认等其他请求发出前先送出排队中的通知，前端看到的顺序与调用顺序一致
+    """
+
+    def __init__(self) -> None:
+        self.client = httpx.AsyncClient(base_url=_backend_url(), timeout=5)
+        self.pending: Deque[Dict] = deque(maxlen=NOTIFY_SPOOL_LIMIT)
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._retry_delay = 0.0
+        self._restore_task = asyncio.create_task(self._restore_spool())
+
+    async def _restore_spool(self) -> None:
+        items = await asyncio.to_thread(self._load_spool)
+        if items:
+            # 放在本通道已入队的通知之前；超出上限时丢弃最旧的
+            pending = (items + list(self.pending))[-NOTIFY_SPOOL_LIMIT:]
+            self.pending.clear()
+            self.pending.extend(pending)
+            self._schedule(NOTIFY_BATCH_WINDOW)
+
+    @staticmethod
+    def _load_spool() -> List[Dict]:
+        try:
+            with _spool_lock:
+                with open(NOTIFY_SPOOL_PATH, encoding="utf-8") as f:
+                    items = [json.loads(line) for line in f if line.strip()]
+                os.remove(NOTIFY_SPOOL_PATH)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            wis_logger.warning(f"failed to load notify spool: {e}")
+            return []
+        return items[-NOTIFY_SPOOL_LIMIT:]
+
+    @staticmethod
+    def _save_spool(items: List[Dict]) -> None:
+        try:
+            NOTIFY_SPOOL_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with _spool_lock, open(NOTIFY_SPOOL_PATH, "a", encoding="utf-8") as f:
+                for item in items:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        except Exception as e:
+            wis_logger.warning(f"failed to save notify spool: {e}")
+
+    def _schedule(self, delay: float) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if not await self.flush():
+            # 后端暂不可用，指数退避重试
+            self._retry_delay = min(max(self._retry_delay * 2, 1.0), 60.0)
+            self._flush_task = None
+            self._schedule(self._retry_delay)
+
+    def notify(self, item: Dict) -> None:
+        self.pending.append(item)
+        self._schedule(NOTIFY_BATCH_WINDOW)
+
+    async def flush(self) -> bool:
+        """发送全部待发通知，失败时保留在队列中；返回是否已全部送达"""
+        await self._restore_task
+        async with self._flush_lock:
+            if not self.pending:
+                return True
+            batch = list(self.pending)
+            self.pending.clear()
+            try:
+                resp = await self.client.post("/user_notify_batch", json={"items": batch}, timeout=3)
+                resp.raise_for_status()
+            except Exception as e:
+                if self._retry_delay == 0:
+                    wis_logger.info(f"backend unavailable, {len(batch)} notifications kept for retry: {e}")
+                # 放回队首；超出上限时丢弃最旧的
+                pending = (batch + list(self.pending))[-NOTIFY_SPOOL_LIMIT:]
+                self.pending.clear()
+                self.pending.extend(pending)
+                return False
+            self._retry_delay = 0.0
+            return True
+
+    async def post_json(self, path: str, payload: Dict, timeout_seconds: int) -> Dict:
+        # 先送出排在前面的通知（等待中的批次不必等满合并窗口），保证前端看到的顺序
+        await self.flush()
+        resp = await self.client.post(path, json=payload, timeout=timeout_seconds)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def aclose(self) -> None:
+        # 先等 spool 读完，避免之后再排定新的发送任务
+        await self._restore_task
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        if not await self.flush():
+            await asyncio.to_thread(self._save_spool, list(self.pending))
+        await self.client.aclose()
+
+
+_channels: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _BackendChannel]" = weakref.WeakKeyDictionary()
+
+
+def _get_channel() -> _BackendChannel:
+    loop = asyncio.get_running_loop()
+    channel = _channels.get(loop)
+    if channel is None:
+        channel = _channels[loop] = _BackendChannel()
+    return channel
+
+
+async def close_backend_channel() -> None:
+    """发送剩余通知并关闭当前事件循环的后端通道，须在事件循环结束前调用"""
+    channel = _channels.pop(asyncio.get_running_loop(), None)
+    if channel:
+        await channel.aclose()
 
 
 async def _post_json(path: str, payload: Dict, timeout_seconds: int) -> Optional[Dict]:
-    base_url = f"http://127.0.0.1:{os.environ.get('WISEFLOW_BACKEND_PORT', 8077)}"
-    url = f"{base_url}{path}"
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, json=payload, timeout=timeout_seconds)
-            resp.raise_for_status()
-            return resp.json()
+        return await _get_channel().post_json(path, payload, timeout_seconds)
     except httpx.TimeoutException:
         wis_logger.info(f"backend connenct timeout")
         return None
@@ -27,9 +171,8 @@ async def notify_user(msg_code: int, params: List[str] = []) -> None:
         msg_code: 整数状态码（语义由前后端约定）
         params: 消息参数列表，用于填充消息模板
     """
-    payload = {"code": msg_code, "params": params, "timeout": 30}
-    # 直接等待发送完成，避免在短生命周期事件循环中遗留后台任务
-    await _post_json("/user_notify", payload, timeout_seconds=3)
+    # 只入队，由后端通道合并发送；事件循环结束前须调用 close_backend_channel
+    _get_channel().notify({"code": msg_code, "params": list(params), "timeout": 30})
 
 async def ask_user(msg_code: int, params: List[str] = [], timeout: int = 30) -> bool:
     """
@@ -44,6 +187,7 @@ async def ask_user(msg_code: int, params: List[str] = [], timeout: int = 30) ->
         bool: True表示用户确认，False表示超时或失败
     """
     # wis_logger.debug(f"Asking user for confirmation (code={msg_code}): {params}")
+    # 通道在发出请求前会先送出排在前面的通知
     payload = {"code": msg_code, "params": params, "timeout": timeout}
     data = await _post_json("/user_prompt", payload, timeout_seconds=timeout + 2)
     choice = None if data is None else data.get("result")
@@ -89,13 +233,57 @@ async def ping_frontend(timeout_seconds: int = 3) -> bool:
     return bool(data and data.get("alive"))
 
 
+class InfoAddedPublisher:
+    """
+    把新写入的 infos 推送给后端，由后端通过 /ws 广播 info_added 事件。
+
+    作为 AsyncDatabaseManager.add_info_listener 的回调：写入路径只做内存累积，
+    每 interval 秒最多发送一次（按 focus 合并 ids），发送失败直接丢弃——前端可用 since 游标补齐。
+    """
+
+    def __init__(self, interval: float = 1.0, max_ids_per_focus: int = 50):
+        self.interval = interval
+        self.max_ids_per_focus = max_ids_per_focus
+        self._pending: Dict[int, Dict] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __call__(self, focus_id: int, ids: List[str]) -> None:
+        entry = self._pending.setdefault(int(focus_id), {"count": 0, "ids": []})
+        entry["count"] += len(ids)
+        room = self.max_ids_per_focus - len(entry["ids"])
+        if room > 0:
+            entry["ids"].extend(ids[:room])
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.interval)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        focuses, self._pending = self._pending, {}
+        await _post_json("/info_added", {"focuses": focuses}, timeout_seconds=3)
+
+    async def aclose(self) -> None:
+        """取消等待中的定时发送，立即发送剩余事件"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self._flush()
+
+
 def notify_user_sync(msg_code: int, params: List[str]) -> None:
     """
     发送通知消息给用户（同步版本，纯同步 HTTP 调用）。
     避免在此阶段创建/关闭事件循环导致的 Loop is closed 提示。
     """
-    base_url = f"http://127.0.0.1:{os.environ.get('WISEFLOW_BACKEND_PORT', 8077)}"
-    url = f"{base_url}/user_notify"
+    url = f"{_backend_url()}/user_notify"
     payload = {"code": msg_code, "params": params, "timeout": 30}
     try:
         with httpx.Client(timeout=3) as client:
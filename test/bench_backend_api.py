@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+后端接口压测：在合成数据库上（默认 20 万条 infos、50 个 focus、20 个 task）测量主要接口的 p50 / p99 延迟和响应体积。
+
+python bench_backend_api.py -N 200000 -F 50
+python bench_backend_api.py -N 200000 -F 50 --stdlib-json   # 关闭 orjson，作为对比基线
+
+通过 httpx.ASGITransport 在进程内调用 app（不经过网络栈，只测后端自身开销），-C 个并发客户端，每个接口共请求 -R 次。
+最后一节对同一份 read_info 响应比较 FastAPI 原有编码路径（jsonable_encoder + json）与 responses.dumps 的耗时。
+数据库文件放在临时目录（或 -D 指定的目录），重复运行时若行数一致会复用已生成的数据。
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-N', '--rows', type=int, default=200_000, help='number of synthetic infos rows')
+parser.add_argument('-F', '--focuses', type=int, default=50, help='number of focuses')
+parser.add_argument('-D', '--dir', type=str, default='', help='work dir for data.db (default: temp dir)')
+parser.add_argument('-C', '--concurrency', type=int, default=4, help='concurrent clients')
+parser.add_argument('-R', '--requests', type=int, default=200, help='requests per endpoint')
+parser.add_argument('--stdlib-json', action='store_true', help='disable orjson (baseline)')
+args = parser.parse_args()
+
+os.environ["WISEFLOW_BASE_DIR"] = args.dir or os.path.join(tempfile.gettempdir(), "wiseflow_bench_api")
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+import httpx
+from loguru import logger
+from fastapi.encoders import jsonable_encoder
+from core.backend import responses
+from core.backend.app import app, db_manager, APIResponse
+
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+if args.stdlib_json:
+    responses.orjson = None
+
+BATCH = 20_000
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+STEP_SECONDS = 7
+TASKS = 20
+
+
+async def populate(rows: int, focuses: int):
+    async with db_manager.get_connection() as conn:
+        async with conn.execute("SELECT COUNT(*) FROM infos") as cursor:
+            existing = (await cursor.fetchone())[0]
+        if existing == rows:
+            print(f"reuse existing {rows} rows")
+            return
+        for table in ("infos", "focuses", "tasks"):
+            await conn.execute(f"DELETE FROM {table}")
+        created = START.strftime('%Y-%m-%dT%H:%M:%SZ')
+        await conn.executemany(
+            "INSERT INTO focuses (id, focuspoint, explanation, role, purpose, created) VALUES (?, ?, ?, ?, ?, ?)",
+            [(i, f"focus {i}", "explanation " * 10, "analyst", "tracking", created) for i in range(1, focuses + 1)],
+        )
+        await conn.executemany(
+            "INSERT INTO tasks (focuses, search, sources, time_slots, title, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            [(json.dumps(list(range(t % focuses + 1, min(t % focuses + 6, focuses) + 1))), '["bing"]',
+              json.dumps([{"type": "web", "detail": f"https://site{t}-{k}.com"} for k in range(10)]),
+              '["first", "third"]', f"task {t}", created) for t in range(TASKS)],
+        )
+        await conn.commit()
+
+        rnd = random.Random(42)
+        t0 = time.perf_counter()
+        for base in range(0, rows, BATCH):
+            batch = []
+            for i in range(base, min(base + BATCH, rows)):
+                created = (START + timedelta(seconds=i * STEP_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+                batch.append((f"{i:016x}", "news", f"synthetic info {i} " + "内容" * rnd.randint(40, 160),
+                              "focus", rnd.randint(1, focuses), f"https://site{i % 20000}.com/post/{i // 20000}",
+                              "title", "", created))
+            await conn.executemany(
+                "INSERT INTO infos (id, type, content, focus_statement, focus_id, source_url, source_title, refers, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            await conn.commit()
+            print(f"\rinserted {min(base + BATCH, rows)}/{rows}", end="", flush=True)
+        print(f"\npopulated in {time.perf_counter() - t0:.1f}s")
+        await conn.execute("ANALYZE")
+        await conn.commit()
+
+
+def percentile(costs: list, p: float) -> float:
+    return costs[min(len(costs) - 1, int(len(costs) * p))] * 1000
+
+
+async def load(client: httpx.AsyncClient, name: str, method: str, url: str, headers: dict = None, **kwargs):
+    costs, sizes = [], []
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            t0 = time.perf_counter()
+            resp = await client.request(method, url, headers={"Accept-Encoding": "identity", **(headers or {})}, **kwargs)
+            costs.append(time.perf_counter() - t0)
+            sizes.append(resp.num_bytes_downloaded)
+            assert resp.status_code in (200, 304), resp.status_code
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    costs.sort()
+    wire = sizes[0] if sizes else 0
+    print(f"{name:<44} p50 {percentile(costs, 0.5):8.2f} ms  p99 {percentile(costs, 0.99):8.2f} ms  wire {wire:>9} B")
+
+
+async def main():
+    await db_manager.initialize()
+    await populate(args.rows, args.focuses)
+    print(f"json encoder: {'stdlib' if responses.orjson is None else 'orjson'}, "
+          f"concurrency {args.concurrency}, {args.requests} requests per endpoint")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await load(client, "GET /list_task", "GET", "/list_task")
+        await load(client, "GET /list_info", "GET", "/list_info")
+        await load(client, "GET /list_info (gzip)", "GET", "/list_info", headers={"Accept-Encoding": "gzip"})
+        await load(client, "GET /info_stat", "GET", "/info_stat")
+        await load(client, "POST /read_info limit 200", "POST", "/read_info", json={"limit": 200})
+        await load(client, "POST /read_info limit 200 (gzip)", "POST", "/read_info", json={"limit": 200},
+                   headers={"Accept-Encoding": "gzip"})
+        etag = (await client.get("/list_info")).headers.get("etag")
+        await load(client, "GET /list_info If-None-Match (304)", "GET", "/list_info", headers={"If-None-Match": etag})
+
+    # 编码开销：同一份 read_info 响应
+    infos = await db_manager.filter_infos(limit=200)
+    payload = APIResponse(success=True, msg="", data=infos)
+    for name, encode in (
+        ("encode: jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode()),
+        ("encode: responses.dumps", lambda: responses.dumps(payload)),
+    ):
+        costs = []
+        for _ in range(200):
+            t0 = time.perf_counter()
+            encode()
+            costs.append(time.perf_counter() - t0)
+        costs.sort()
+        print(f"{name:<44} p50 {percentile(costs, 0.5):8.3f} ms  p99 {percentile(costs, 0.99):8.3f} ms")
+
+    await db_manager.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+HTML → markdown 各环节基准：在固定页面语料（html2md_corpus.json，新闻、门户、公众号文章、论坛、SPA 渲染页、电商）上
+分别测量抓取后处理与 markdown 生成流程中的每个环节：
+
+    metadata     extract_metadata_using_lxml(html)
+    preprocess   preprocess_html_for_schema(html)，为空时退回 get_content_of_website(html)（与 AsyncWebCrawler.arun 一致）→ cleaned_html
+    html2text    CustomHTML2Text.handle(cleaned_html)              → raw markdown（公众号文章取 #js_content，与 WeixinArticleMarkdownGenerator 一致）
+    citations    DefaultMarkdownGenerator.convert_links_to_citations(raw markdown)  → markdown, link_dict
+    chunk        MaxLengthChunking(MAX_CHUNK_SIZE).chunk(markdown)
+
+各环节按生产顺序串联，每个环节记录耗时（预热 1 次后重复 -R 次，取中位数与最小值）、tracemalloc 内存峰值（单独一次运行，
+避免影响计时）、输出大小与输出摘要（摘要变化即说明行为变了）。结果写入 JSON（键有序、每页一项），可直接 diff，
+也可用 --compare 与之前的结果对比，最小耗时或内存峰值超过 --threshold 倍即视为回退（退出码 1）。
+内存峰值只统计 Python 分配（tracemalloc），lxml 解析树等 C 层内存不在其中。
+
+python bench_html2md.py -o html2md-before.json
+python bench_html2md.py -o html2md-after.json --compare html2md-before.json
+python bench_html2md.py -c wechat,spa -R 10
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import platform
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+# 不调用视觉模型：图片链接一律按普通链接处理，保证结果可复现
+os.environ["VL_MODEL"] = ""
+os.environ.setdefault("LLM_API_KEY", "no_use")
+
+from bs4 import BeautifulSoup
+from core.wis.config import config
+from core.wis.utils import extract_metadata_using_lxml, preprocess_html_for_schema, get_content_of_website
+from core.wis.html2text import CustomHTML2Text
+from core.wis.chunking_strategy import MaxLengthChunking
+from core.wis.markdown_generation_strategy import DefaultMarkdownGenerator
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'html2md_corpus.json')
+STAGES = ("metadata", "preprocess", "html2text", "citations", "chunk")
+# 与 DefaultMarkdownGenerator.generate_markdown 的默认参数一致
+HTML2TEXT_OPTIONS = {
+    "body_width": 0,
+    "ignore_emphasis": False,
+    "ignore_links": False,
+    "ignore_images": False,
+    "protect_links": False,
+    "single_line_break": True,
+    "mark_code": True,
+    "escape_snob": False,
+}
+
+
+def load_corpus(categories: List[str] = None) -> List[dict]:
+    with open(CORPUS_FILE, encoding='utf-8') as f:
+        pages = json.load(f)["pages"]
+    if categories:
+        pages = [p for p in pages if p["category"] in categories]
+    base = os.path.dirname(CORPUS_FILE)
+    for page in pages:
+        with open(os.path.join(base, page["path"]), encoding='utf-8') as f:
+            sample = json.load(f)
+        page["url"] = sample.get("url", "")
+        page["html"] = sample.get("html") or ""
+    return pages
+
+
+def clean_html(html: str) -> str:
+    """与 AsyncWebCrawler.arun 相同的清洗路径：preprocess_html_for_schema 返回空时用 get_content_of_website"""
+    return preprocess_html_for_schema(html_content=html) or get_content_of_website(html) or ''
+
+
+def digest(value: Any) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(value.encode('utf-8')).hexdigest()[:12]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Tuple[Any, Dict[str, float]]:
+    """预热一次，计时 repeat 次，再单独用 tracemalloc 跑一次取内存峰值"""
+    result = fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "min_ms": round(min(times) * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_page(page: dict, repeat: int, chunker: MaxLengthChunking, loop: asyncio.AbstractEventLoop) -> dict:
+    html, url = page["html"], page["url"]
+    weixin = "mp.weixin.qq.com" in url
+    stages = {}
+
+    metadata, stats = measure(lambda: extract_metadata_using_lxml(html), repeat)
+    stages["metadata"] = dict(stats, output_chars=len(json.dumps(metadata, ensure_ascii=False)), digest=digest(metadata))
+
+    cleaned_html, stats = measure(lambda: clean_html(html), repeat)
+    stages["preprocess"] = dict(stats, output_chars=len(cleaned_html), digest=digest(cleaned_html))
+
+    if weixin:
+        # 公众号文章只转换正文块
+        js_content = BeautifulSoup(html, 'html.parser').find('div', id='js_content')
+        source = str(js_content) if js_content else cleaned_html
+    else:
+        source = cleaned_html
+
+    def html2text():
+        h = CustomHTML2Text(baseurl=url, img_src_attr="data-src" if weixin else "src")
+        h.update_params(**HTML2TEXT_OPTIONS)
+        return h.handle(source).replace("    ```", "```")
+
+    raw_markdown, stats = measure(html2text, repeat)
+    stages["html2text"] = dict(stats, input_chars=len(source), output_chars=len(raw_markdown), digest=digest(raw_markdown))
+
+    generator = DefaultMarkdownGenerator()
+    (markdown, link_dict), stats = measure(
+        lambda: loop.run_until_complete(
+            generator.convert_links_to_citations(raw_markdown, url, config['EXCLUDE_EXTERNAL_LINKS'])),
+        repeat)
+    stages["citations"] = dict(stats, output_chars=len(markdown), links=len(link_dict),
+                               digest=digest([markdown, link_dict]))
+
+    chunks, stats = measure(lambda: chunker.chunk(markdown), repeat)
+    stages["chunk"] = dict(stats, chunks=len(chunks), output_chars=sum(len(c) for c in chunks), digest=digest(chunks))
+
+    return {"category": page["category"], "url": url, "input_chars": len(html), "stages": stages}
+
+
+def summarize(pages: Dict[str, dict]) -> Dict[str, dict]:
+    totals = {}
+    for stage in STAGES:
+        rows = [p["stages"][stage] for p in pages.values()]
+        totals[stage] = {
+            "total_median_ms": round(sum(r["median_ms"] for r in rows), 3),
+            "max_peak_kb": max((r["peak_kb"] for r in rows), default=0),
+            "total_output_chars": sum(r["output_chars"] for r in rows),
+        }
+    return totals
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """返回回退说明；输出摘要变化单独列出（不算回退，但说明行为变了）。只比较两次都有的页面"""
+    common = [page_id for page_id in current["pages"] if page_id in baseline["pages"]]
+    regressions, changed = [], []
+    for page_id in common:
+        page, old_page = current["pages"][page_id], baseline["pages"][page_id]
+        for stage, now in page["stages"].items():
+            old = old_page["stages"].get(stage)
+            if not old:
+                continue
+            # 耗时用最小值比较（受机器抖动影响最小）；极小的值噪声大，不参与比较
+            for key, floor in (("min_ms", 5.0), ("peak_kb", 64.0)):
+                if old[key] >= floor and now[key] > old[key] * threshold:
+                    regressions.append(f"{page_id:<20} {stage:<11} {key:<8} {old[key]:>10} → {now[key]:<10} "
+                                       f"x{now[key] / old[key]:.2f}")
+            if now.get("digest") != old.get("digest"):
+                changed.append(f"{page_id:<20} {stage:<11} output {old.get('output_chars')} → {now.get('output_chars')} chars")
+
+    new_totals = summarize({k: current["pages"][k] for k in common})
+    old_totals = summarize({k: baseline["pages"][k] for k in common})
+    print(f"\ncompared with {baseline['meta'].get('revision') or 'baseline'} on {len(common)} pages (threshold x{threshold}):")
+    print(f"  {'stage':<11} {'total median ms':>22} {'max peak kb':>24}")
+    for stage in STAGES:
+        old, now = old_totals[stage], new_totals[stage]
+        print(f"  {stage:<11} {old['total_median_ms']:>10} → {now['total_median_ms']:<10} "
+              f"{old['max_peak_kb']:>10} → {now['max_peak_kb']:<10}")
+    if changed:
+        print(f"\noutput changed ({len(changed)}):")
+        print("\n".join(f"  {line}" for line in changed))
+    if regressions:
+        print(f"\nregressions ({len(regressions)}):")
+        print("\n".join(f"  {line}" for line in regressions))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-R', '--repeat', type=int, default=5, help='timed runs per stage and page')
+    parser.add_argument('-c', '--categories', type=str, default='', help='comma separated categories (default: all)')
+    parser.add_argument('-o', '--output', type=str, default='', help='result json (default: html2md-<revision>.json)')
+    parser.add_argument('--compare', type=str, default='', help='baseline result json to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown / memory ratio counted as regression')
+    args = parser.parse_args()
+
+    categories = [c.strip() for c in args.categories.split(',') if c.strip()]
+    pages = load_corpus(categories)
+    chunker = MaxLengthChunking(max_size=config['MAX_CHUNK_SIZE'])
+    loop = asyncio.new_event_loop()
+
+    results = {}
+    print(f"{'page':<20} {'input kb':>9}  " + "  ".join(f"{s:>12}" for s in STAGES) + "   (median ms / peak kb)")
+    for page in pages:
+        result = bench_page(page, args.repeat, chunker, loop)
+        results[page["id"]] = result
+        cells = "  ".join(f"{result['stages'][s]['median_ms']:>6.1f}/{result['stages'][s]['peak_kb']:<5.0f}"
+                          for s in STAGES)
+        print(f"{page['id']:<20} {result['input_chars'] / 1024:>9.0f}  {cells}")
+    loop.close()
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            "revision": revision,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "max_chunk_size": config['MAX_CHUNK_SIZE'],
+            "created": datetime.now().isoformat(timespec='seconds'),
+        },
+        "totals": summarize(results),
+        "pages": results,
+    }
+    output = args.output or f"html2md-{revision or 'local'}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"\nresult written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+infos 表查询基准：生成合成数据（默认 500 万行），测量 /list_info、/read_info 背后几类查询的耗时。
+
+python bench_infos_query.py -N 5000000 -F 50
+python bench_infos_query.py -N 5000000 -F 50 --drop-indexes   # 对比删除复合索引后的耗时
+
+数据库文件放在临时目录（或 -D 指定的目录），重复运行时若行数一致会复用已生成的数据。
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-N', '--rows', type=int, default=5_000_000, help='number of synthetic infos rows')
+parser.add_argument('-F', '--focuses', type=int, default=50, help='number of distinct focus_id')
+parser.add_argument('-D', '--dir', type=str, default='', help='work dir for data.db (default: temp dir)')
+parser.add_argument('-R', '--repeat', type=int, default=5, help='repeat each query and report the median')
+parser.add_argument('--drop-indexes', action='store_true', help='drop the composite indexes before querying')
+args = parser.parse_args()
+
+os.environ["WISEFLOW_BASE_DIR"] = args.dir or os.path.join(tempfile.gettempdir(), "wiseflow_bench_infos")
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from loguru import logger
+from core.async_database import AsyncDatabaseManager
+
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+BATCH = 50_000
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+STEP_SECONDS = 7
+
+
+async def populate(db: AsyncDatabaseManager, rows: int, focuses: int):
+    async with db.get_connection() as conn:
+        async with conn.execute("SELECT COUNT(*) FROM infos") as cursor:
+            existing = (await cursor.fetchone())[0]
+        if existing == rows:
+            print(f"reuse existing {rows} rows")
+            return
+        await conn.execute("DELETE FROM infos")
+        await conn.commit()
+
+        rnd = random.Random(42)
+        t0 = time.perf_counter()
+        for base in range(0, rows, BATCH):
+            batch = []
+            for i in range(base, min(base + BATCH, rows)):
+                created = (START + timedelta(seconds=i * STEP_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+                batch.append((f"{i:016x}", "news", f"synthetic info {i} " + "x" * rnd.randint(40, 160),
+                              "focus", rnd.randint(1, focuses), f"https://site{i % 20000}.com/post/{i // 20000}",
+                              "title", "", created))
+            await conn.executemany(
+                "INSERT INTO infos (id, type, content, focus_statement, focus_id, source_url, source_title, refers, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            await conn.commit()
+            print(f"\rinserted {min(base + BATCH, rows)}/{rows}", end="", flush=True)
+        print(f"\npopulated in {time.perf_counter() - t0:.1f}s")
+        await conn.execute("ANALYZE")
+        await conn.commit()
+
+
+async def timed(name: str, repeat: int, fn):
+    costs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = await fn()
+        costs.append(time.perf_counter() - t0)
+    costs.sort()
+    size = len(result) if result is not None else 0
+    print(f"{name:<48} median {costs[len(costs) // 2] * 1000:9.2f} ms  (rows={size})")
+
+
+async def main():
+    db = AsyncDatabaseManager(pool_size=2, logger=logger)
+    await db.initialize()
+    await populate(db, args.rows, args.focuses)
+
+    if args.drop_indexes:
+        async with db.get_connection() as conn:
+            await conn.execute("DROP INDEX IF EXISTS idx_infos_focus_created_id")
+            await conn.execute("DROP INDEX IF EXISTS idx_infos_source_url")
+            # 下次启动时重新执行迁移
+            await conn.execute("PRAGMA user_version = 0")
+            await conn.commit()
+        print("composite indexes dropped")
+
+    focus_ids = list(range(1, min(args.focuses, 5) + 1))
+    await timed("filter_infos 5 focus, limit 20", args.repeat,
+                lambda: db.filter_infos(focus_ids=focus_ids, limit=20))
+    await timed("filter_infos 5 focus, limit 20 offset 2000", args.repeat,
+                lambda: db.filter_infos(focus_ids=focus_ids, limit=20, offset=2000))
+    # 与 offset 2000 同样深度的 keyset 翻页
+    deep = await db.filter_infos(focus_ids=focus_ids, limit=1, offset=1999)
+    cursor = db._encode_cursor(['info', {str(r['focus_id']): [r['created'], r['id']] for r in deep}])
+
+    async def keyset_page():
+        rows, _ = await db.page_infos(focus_ids=focus_ids, limit=20, cursor=cursor)
+        return rows
+
+    await timed("page_infos 5 focus, limit 20, cursor at 2000", args.repeat, keyset_page)
+    # 取数据时间跨度中间的一天
+    middle = START + timedelta(seconds=args.rows * STEP_SECONDS // 2)
+    day_start, day_end = middle.strftime('%Y-%m-%dT%H:%M:%SZ'), (middle + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    await timed("filter_infos 1 focus, one day, limit 50", args.repeat,
+                lambda: db.filter_infos(focus_ids=[1], start_time=day_start, end_time=day_end, limit=50))
+    await timed("filter_infos by source_url", args.repeat,
+                lambda: db.filter_infos(source_url="https://site123.com/post/3"))
+    await timed("count_infos_by_focus (all)", args.repeat, db.count_infos_by_focus)
+    await timed("count_infos_by_focus (one)", args.repeat, lambda: db.count_infos_by_focus(focus_id=1))
+
+    await db.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+ExtractManager 的 LLM 压测：用合成页面驱动 ExtractManager，请求发往模拟 LLM 服务（mock_llm_server.py），
+比较不同 LLM_CONCURRENT_NUMBER、重试参数与分块大小下的吞吐和尾延迟。
+
+python llm_load_bench.py -N 200 -C 1,4,8,16 --latency lognormal:2,0.5 --slots 8 --error-429 0.02
+python llm_load_bench.py -N 200 -C 4,8 --chunk-size 3000 --retries 2 --retry-wait 1
+python llm_load_bench.py -N 200 -C 8 --server http://127.0.0.1:8098    # 使用单独进程运行的 mock_llm_server.py
+
+默认通过 httpx.ASGITransport 在进程内调用模拟服务（不经过网络栈）；--server 指定外部服务时模拟参数以该服务为准。
+每个并发档位使用全新的缓存库，逐页并发调用 ExtractManager（与 general_process 中的调用方式一致），输出：
+    页面与 LLM 调用的吞吐、p50 / p90 / p99 / max 延迟（LLM 调用延迟包含排队与 llm_async 内部重试）
+    LLM 失败次数、服务端状态码分布、token 用量、服务端峰值并发
+结果同时写入 JSON（-o，默认 llm_load_bench-<时间>.json），便于对比。
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_llm_server import add_arguments, create_app, mock_from_args
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-N', '--pages', type=int, default=200, help='number of synthetic pages')
+parser.add_argument('-S', '--page-size', type=int, default=12000, help='approximate markdown characters per page')
+parser.add_argument('-C', '--concurrency', type=str, default='1,4,8,16', help='LLM_CONCURRENT_NUMBER values to compare')
+parser.add_argument('--chunk-size', type=int, default=0, help='override the extractor chunk size (0: keep the production chunker)')
+parser.add_argument('--retries', type=int, default=3, help='LLM_MAX_RETRIES')
+parser.add_argument('--retry-wait', type=float, default=20, help='LLM_RETRY_WAIT, first backoff in seconds')
+parser.add_argument('--sdk-retries', type=int, default=2, help='max_retries of the openai client itself')
+parser.add_argument('--mode', type=str, default='both', choices=['both', 'only_info', 'only_link'])
+parser.add_argument('--schema', type=str, default='', help='custom_schema of the focus, e.g. "标题 | 日期 | 金额"')
+parser.add_argument('--server', type=str, default='', help='external mock server url (default: in-process)')
+parser.add_argument('-o', '--output', type=str, default='', help='result json path')
+add_arguments(parser)
+args = parser.parse_args()
+
+os.environ["WISEFLOW_BASE_DIR"] = tempfile.mkdtemp(prefix="wiseflow_llm_bench_")
+os.environ["LLM_API_BASE"] = f"{args.server.rstrip('/') or 'http://mock-llm'}/v1"
+os.environ["LLM_API_KEY"] = "mock"
+os.environ.setdefault("PRIMARY_MODEL", "mock-model")
+os.environ["LLM_MAX_RETRIES"] = str(args.retries)
+os.environ["LLM_RETRY_WAIT"] = str(args.retry_wait)
+
+import httpx
+from loguru import logger
+from openai import AsyncOpenAI
+from core.wis import llmuse, extractor
+from core.wis.async_cache import SqliteCache
+from core.wis.chunking_strategy import MaxLengthChunking
+
+logger.remove()
+logger.add(sys.stderr, level="ERROR")
+
+WORDS = ("人工智能 芯片 出口 管制 政策 发布 会议 融资 开源 模型 数据 安全 监管 合作 市场 报告 增长 产品 "
+         "release funding open source model regulation partnership market report growth launch").split()
+
+
+def make_page(index: int, size: int) -> dict:
+    """确定性的合成页面：带 <main-content> 的 markdown、引用标签与 link_dict"""
+    rng = random.Random(index)
+    lines, link_dict, length, ref = [f"# 合成页面 {index}", "<main-content>"], {}, 0, 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 30))) + "。"
+        if rng.random() < 0.4:
+            ref += 1
+            link_dict[f"[{ref}]"] = f"https://example.com/p{index}/{ref}"
+            sentence += f"[{ref}]"
+        lines.append(sentence)
+        length += len(sentence)
+    lines.append("</main-content>")
+    return {"markdown": "\n".join(lines), "link_dict": link_dict, "url": f"https://example.com/p{index}",
+            "title": f"合成页面 {index}", "author": "", "publish_date": ""}
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(values[-1], 3)}
+
+
+class Probe:
+    """包装 extractor 中的 llm_async，记录每次调用（含排队与重试）的耗时与 token 用量"""
+
+    def __init__(self):
+        self.original = extractor.llm_async
+        self.reset()
+
+    def reset(self):
+        self.latencies, self.failures, self.prompt_tokens, self.completion_tokens = [], 0, 0, 0
+
+    async def __call__(self, *a, **kw):
+        started = time.perf_counter()
+        response = await self.original(*a, **kw)
+        self.latencies.append(time.perf_counter() - started)
+        usage = getattr(response, "usage", None)
+        if usage:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+        elif response is None:
+            self.failures += 1
+        return response
+
+
+async def run_level(concurrency: int, pages: list, focus: dict, probe: Probe, server, mock) -> dict:
+    llmuse.concurrent_number = concurrency
+    await llmuse.cleanup_semaphore()
+    probe.reset()
+    if mock is not None:
+        mock.reset()
+    else:
+        await server.post("/stats/reset")
+
+    cache = SqliteCache(db_path=os.path.join(os.environ["WISEFLOW_BASE_DIR"], f"cache_{concurrency}.db"),
+                        default_namespace='articles', write_behind_ms=50)
+    await cache.open()
+    manager = extractor.ExtractManager(focus, None, cache)
+    page_latencies, infos, links, errors = [], 0, 0, 0
+
+    async def one(page: dict):
+        nonlocal infos, links, errors
+        started = time.perf_counter()
+        try:
+            count, more_links = await manager(mode=args.mode, **page)
+            infos += count
+            links += len(more_links)
+        except Exception as e:
+            errors += 1
+            logger.error(f"{page['url']}: {e}")
+        page_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(page) for page in pages))
+    wall = time.perf_counter() - started
+    await cache.close()
+
+    server_stats = mock.snapshot() if mock is not None else (await server.get("/stats")).json()
+    calls = len(probe.latencies)
+    result = {
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 2),
+        "pages_per_second": round(len(pages) / wall, 3),
+        "llm_calls": calls,
+        "llm_calls_per_second": round(calls / wall, 3),
+        "completion_tokens_per_second": round(probe.completion_tokens / wall, 1),
+        "page_latency": percentiles(page_latencies),
+        "llm_latency": percentiles(probe.latencies),
+        "llm_failures": probe.failures,
+        "page_errors": errors,
+        "infos": infos,
+        "links": links,
+        "prompt_tokens": probe.prompt_tokens,
+        "completion_tokens": probe.completion_tokens,
+        "server": {k: server_stats.get(k) for k in ("requests", "status", "peak_inflight", "queue_seconds")},
+    }
+    print(f"C={concurrency:<3} wall {wall:7.1f}s  pages/s {result['pages_per_second']:7.2f}  "
+          f"llm/s {result['llm_calls_per_second']:6.2f}  llm p50/p99 {result['llm_latency'].get('p50')}/"
+          f"{result['llm_latency'].get('p99')}s  failures {probe.failures}  server {server_stats.get('status')}")
+    return result
+
+
+async def main():
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    if args.chunk_size:
+        extractor._chunker = MaxLengthChunking(max_size=args.chunk_size)
+    focus = {"id": 1, "focuspoint": "AI 行业动态", "restrictions": "", "role": "", "purpose": "",
+             "explanation": "", "custom_schema": args.schema}
+    pages = [make_page(i, args.page_size) for i in range(args.pages)]
+
+    mock = server = None
+    if args.server:
+        server = httpx.AsyncClient(base_url=args.server.rstrip('/'), timeout=30)
+        http_client = httpx.AsyncClient(timeout=600)
+    else:
+        mock = mock_from_args(args)
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(mock)), timeout=600)
+    llmuse.client = AsyncOpenAI(base_url=os.environ["LLM_API_BASE"], api_key="mock", http_client=http_client,
+                                max_retries=args.sdk_retries)
+    probe = Probe()
+    extractor.llm_async = probe
+    # 压测关注吞吐，不触发“连续失败即放弃该 focus”的保护
+    extractor.APLPLY_FAILED_TIMES_THRESHOLD = float('inf')
+
+    print(f"{len(pages)} pages, {sum(len(extractor._chunker.chunk(p['markdown'])) for p in pages)} sections, "
+          f"chunk size {extractor._chunker.max_size}, mode {args.mode}{', schema' if args.schema else ''}")
+    results = []
+    for level in levels:
+        results.append(await run_level(level, pages, focus, probe, server, mock))
+    await http_client.aclose()
+    if server is not None:
+        await server.aclose()
+
+    report = {
+        "settings": {k: v for k, v in vars(args).items() if k != 'output'},
+        "chunk_size": extractor._chunker.max_size,
+        "results": results,
+        "finished_at": datetime.now().isoformat(),
+    }
+    output = args.output or f"llm_load_bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"result written to {output}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+本地 OpenAI 兼容的模拟 LLM 服务（POST /v1/chat/completions），用于调优 LLM_CONCURRENT_NUMBER、重试参数与分块大小的压测。
+
+按 core/wis/llmuse.py 中提示词要求的格式给出确定性的回答（同一输入总是同一输出）：
+    <info></info> + <links></links>   PROMPT_EXTRACT_BLOCKS
+    <info></info>                     PROMPT_EXTRACT_BLOCKS_ONLY_INFO
+    <links></links>                   PROMPT_EXTRACT_BLOCKS_ONLY_LINKS
+    <json></json>                     PROMPT_EXTRACT_SCHEMA_WITH_INSTRUCTION（按 <schema> 中的字段生成）
+info 取 <markdown> 中的前几句正文，links 取含引用标签 [x] 的行；--empty-ratio / --link-ratio 控制无结果与选中链接的比例。
+
+服务特性均可配置：
+    --latency      基础延迟分布 fixed:S | uniform:A-B | normal:MEAN,STD | lognormal:MEDIAN,SIGMA | exp:MEAN
+    --prefill-tps / --decode-tps   按 prompt / completion token 数追加的处理耗时（每秒 token 数，0 为不计）
+    --slots        服务端并发槽位，超出的请求排队（模拟推理服务满载），0 为不限
+    --tpm / --rpm  每分钟 token / 请求数上限，超出返回 429（带 retry-after）
+    --error-429 / --error-5xx      按概率注入 429 与 500/502/503
+GET /stats 返回请求数、状态码分布、token 用量、排队与峰值并发；POST /stats/reset 清零。
+
+python mock_llm_server.py --port 8098 --latency lognormal:2,0.5 --decode-tps 60 --slots 8 --error-429 0.02
+然后设置 LLM_API_BASE=http://127.0.0.1:8098/v1 运行 wiseflow 或 llm_load_bench.py --server http://127.0.0.1:8098
+"""
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+_REFERENCE = re.compile(r'\[(?:img)?\d+]')
+_CJK = re.compile(r'[\u4e00-\u9fff\u3040-\u30ff\uac00-\ud7af]')
+_WORD = re.compile(r'[A-Za-z0-9_]+|[^\sA-Za-z0-9_\u4e00-\u9fff\u3040-\u30ff\uac00-\ud7af]')
+
+
+def count_tokens(text: str) -> int:
+    """粗略估算 token 数：每个中日韩字符 1 个，其余按单词/符号计"""
+    return len(_CJK.findall(text)) + len(_WORD.findall(text))
+
+
+def _fraction(*parts: str) -> float:
+    """由内容得到 [0, 1) 之间的确定性数值"""
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class LatencyDistribution:
+    def __init__(self, spec: str = "fixed:0"):
+        self.spec = spec
+        kind, _, arg = spec.strip().lower().partition(":")
+        try:
+            if kind == "fixed":
+                self.params = (float(arg or 0),)
+            elif kind == "uniform":
+                low, high = arg.split("-", 1)
+                self.params = (float(low), float(high))
+            elif kind in ("normal", "lognormal"):
+                a, b = arg.split(",", 1)
+                self.params = (float(a), float(b))
+            elif kind == "exp":
+                self.params = (float(arg),)
+            else:
+                raise ValueError(kind)
+        except ValueError:
+            raise ValueError(f"invalid latency spec: {spec}")
+        self.kind = kind
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params))
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+
+
+# -------------- 确定性的回答 --------------
+def _between(text: str, start: str, end: str) -> str:
+    # 提示词的说明文字里也会提到 <markdown> 等标签，正文块的开始标签独占一行
+    head, found, tail = text.partition(f"{start}\n")
+    if not found:
+        return ""
+    return tail.partition(f"\n{end}")[0]
+
+
+def _sentences(markdown: str) -> List[str]:
+    lines = []
+    for line in markdown.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", "<", "|", "---")):
+            continue
+        if len(_REFERENCE.sub("", line).strip()) < 12:
+            continue
+        lines.append(line)
+    return lines
+
+
+def canned_reply(prompt: str, empty_ratio: float = 0.3, link_ratio: float = 0.5, max_links: int = 10,
+                 info_sentences: int = 2) -> Tuple[str, str]:
+    """返回 (提示词类型, 回答)；类型为 both / info / links / schema / other"""
+    if "<json>" in prompt and "<schema>" in prompt:
+        kind = "schema"
+        markdown = _between(prompt, "<url_content>", "</url_content>")
+    elif "<info></info>" in prompt:
+        kind = "both" if "<links></links>" in prompt else "info"
+        markdown = _between(prompt, "<markdown>", "</markdown>")
+    elif "<links></links>" in prompt:
+        kind = "links"
+        markdown = _between(prompt, "<markdown>", "</markdown>")
+    else:
+        return "other", f"ok ({count_tokens(prompt)} tokens received)"
+
+    sentences = _sentences(markdown)
+    empty = _fraction("empty", markdown) < empty_ratio
+    parts = []
+    if kind == "schema":
+        try:
+            fields = list(json.loads(_between(prompt, "<schema>", "</schema>")))
+        except ValueError:
+            fields = []
+        items = [] if empty else [{field: _REFERENCE.sub("", sentence)[:60] for field in fields}
+                                  for sentence in sentences[:info_sentences]]
+        return kind, f"<json>\n{json.dumps(items, ensure_ascii=False, indent=2)}\n</json>"
+
+    if kind in ("both", "info"):
+        info = "" if empty else " ".join(sentences[:info_sentences])
+        parts.append(f"<info>\n{info}\n</info>")
+    if kind in ("both", "links"):
+        linked = [line.strip() for line in markdown.splitlines() if _REFERENCE.search(line)]
+        chosen = [line for line in linked if _fraction("link", line) < link_ratio][:max_links]
+        parts.append("<links>\n" + "\n".join(chosen) + "\n</links>")
+    return kind, "\n\n".join(parts)
+
+
+# -------------- 服务 --------------
+class MockLLM:
+    def __init__(self, latency: str = "lognormal:1.5,0.5", prefill_tps: float = 0, decode_tps: float = 0,
+                 slots: int = 0, tpm: int = 0, rpm: int = 0, error_429: float = 0, error_5xx: float = 0,
+                 empty_ratio: float = 0.3, link_ratio: float = 0.5, max_links: int = 10, seed: int = 0):
+        self.latency = LatencyDistribution(latency)
+        self.prefill_tps = prefill_tps
+        self.decode_tps = decode_tps
+        self.slots = slots
+        self.tpm = tpm
+        self.rpm = rpm
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.empty_ratio = empty_ratio
+        self.link_ratio = link_ratio
+        self.max_links = max_links
+        self.seed = seed
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.rng = random.Random(self.seed)
+        self._window: deque = deque()  # (时间, token 数)，最近 60 秒
+        self._serial = 0
+        self.inflight = 0
+        self.stats: Dict[str, Any] = {
+            "requests": 0, "status": {}, "kinds": {}, "prompt_tokens": 0, "completion_tokens": 0,
+            "peak_inflight": 0, "queue_seconds": 0.0, "service_seconds": 0.0, "started": time.time(),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats = dict(self.stats, status=dict(self.stats["status"]), kinds=dict(self.stats["kinds"]))
+        stats["elapsed"] = time.time() - stats.pop("started")
+        return stats
+
+    def _count(self, status: int) -> None:
+        key = str(status)
+        self.stats["status"][key] = self.stats["status"].get(key, 0) + 1
+
+    def _over_limit(self, tokens: int) -> Optional[float]:
+        """超过 tpm / rpm 时返回建议的 retry-after 秒数"""
+        now = time.monotonic()
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+        if self.rpm and len(self._window) + 1 > self.rpm:
+            return 60 - (now - self._window[0][0])
+        if self.tpm and self._window and sum(t for _, t in self._window) + tokens > self.tpm:
+            return 60 - (now - self._window[0][0])
+        self._window.append((now, tokens))
+        return None
+
+    @staticmethod
+    def _error(status: int, kind: str, message: str) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        return status, {"error": {"message": message, "type": kind, "code": status}}, {}
+
+    async def complete(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """处理一次 chat.completions 请求，返回 (状态码, JSON, 响应头)"""
+        self.stats["requests"] += 1
+        status, payload, headers = await self._complete(body)
+        self._count(status)
+        return status, payload, headers
+
+    async def _complete(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        messages = body.get("messages")
+        if not isinstance(messages, list) or not messages:
+            return self._error(400, "invalid_request_error", "messages must be a non-empty list")
+        if body.get("stream"):
+            return self._error(400, "invalid_request_error", "streaming is not supported by the mock server")
+
+        prompt = "\n".join(m.get("content") if isinstance(m.get("content"), str)
+                           else json.dumps(m.get("content"), ensure_ascii=False) for m in messages)
+        prompt_tokens = count_tokens(prompt)
+        retry_after = self._over_limit(prompt_tokens)
+        if retry_after is not None:
+            status, payload, headers = self._error(429, "rate_limit_exceeded", "token or request rate limit reached")
+            return status, payload, {"retry-after": f"{max(1, math.ceil(retry_after))}"}
+        if self.rng.random() < self.error_429:
+            return self._error(429, "rate_limit_exceeded", "injected rate limit")
+
+        kind, reply = canned_reply(prompt, self.empty_ratio, self.link_ratio, self.max_links)
+        completion_tokens = count_tokens(reply)
+        delay = self.latency.sample(self.rng)
+        if self.prefill_tps:
+            delay += prompt_tokens / self.prefill_tps
+        if self.decode_tps:
+            delay += completion_tokens / self.decode_tps
+        fail = self.rng.random() < self.error_5xx
+        fail_status = self.rng.choice((500, 502, 503))
+
+        if self.slots and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.slots)
+        queued_at = time.perf_counter()
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        started = time.perf_counter()
+        self.inflight += 1
+        self.stats["peak_inflight"] = max(self.stats["peak_inflight"], self.inflight)
+        self.stats["queue_seconds"] += started - queued_at
+        try:
+            # 注入的 5xx 在处理到一半时返回
+            await asyncio.sleep(delay / 2 if fail else delay)
+        finally:
+            self.inflight -= 1
+            self.stats["service_seconds"] += time.perf_counter() - started
+            if self._semaphore is not None:
+                self._semaphore.release()
+        if fail:
+            return self._error(fail_status, "server_error", "injected upstream failure")
+
+        self.stats["kinds"][kind] = self.stats["kinds"].get(kind, 0) + 1
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+        self._serial += 1
+        return 200, {
+            "id": f"chatcmpl-mock-{self._serial}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }, {}
+
+
+def create_app(mock: MockLLM):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI()
+    app.state.mock = mock
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+        status, payload, headers = await mock.complete(body)
+        return JSONResponse(payload, status_code=status, headers=headers)
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "wiseflow"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return mock.snapshot()
+
+    @app.post("/stats/reset")
+    async def reset():
+        mock.reset()
+        return {"ok": True}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency', type=str, default='lognormal:1.5,0.5', help='base latency distribution')
+    parser.add_argument('--prefill-tps', type=float, default=0, help='prompt tokens processed per second (0: ignore)')
+    parser.add_argument('--decode-tps', type=float, default=0, help='completion tokens generated per second (0: ignore)')
+    parser.add_argument('--slots', type=int, default=0, help='server-side concurrent slots (0: unlimited)')
+    parser.add_argument('--tpm', type=int, default=0, help='tokens per minute before 429 (0: unlimited)')
+    parser.add_argument('--rpm', type=int, default=0, help='requests per minute before 429 (0: unlimited)')
+    parser.add_argument('--error-429', type=float, default=0, help='probability of an injected 429')
+    parser.add_argument('--error-5xx', type=float, default=0, help='probability of an injected 500/502/503')
+    parser.add_argument('--empty-ratio', type=float, default=0.3, help='share of sections answered with no info')
+    parser.add_argument('--link-ratio', type=float, default=0.5, help='share of referenced lines returned as links')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def mock_from_args(args: argparse.Namespace) -> MockLLM:
+    return MockLLM(latency=args.latency, prefill_tps=args.prefill_tps, decode_tps=args.decode_tps, slots=args.slots,
+                   tpm=args.tpm, rpm=args.rpm, error_429=args.error_429, error_5xx=args.error_5xx,
+                   empty_ratio=args.empty_ratio, link_ratio=args.link_ratio, seed=args.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8098)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(mock_from_args(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+端到端流水线离线基准：先联网录制一次时间段运行，之后在无网络的机器上反复回放，比较吞吐与每条 info 的 token 开销。
+
+录制（需要网络、LLM 与 .env 配置；从 work_dir/data.db 读取该时段的任务和关注点）：
+    python replay_bench.py record -c cassettes/demo -s first
+
+回放（无需网络；浏览器仍会启动，但不会打开页面）：
+    python replay_bench.py replay -c cassettes/demo                    # 按录制时的耗时注入延迟
+    python replay_bench.py replay -c cassettes/demo --latency none     # 只测本地处理开销
+    python replay_bench.py replay -c cassettes/demo --latency uniform:0.2-1.5
+
+两种模式都在临时目录（或 -D 指定的目录）中用录制时的任务、关注点和 custom_config.json 重建一个干净的 work_dir，
+保证录制与回放都从空缓存开始、走同样的路径。回放结果写入 cassette 目录下的 replay-<时间>.json，便于在版本之间对比。
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+parser = argparse.ArgumentParser()
+parser.add_argument('mode', choices=['record', 'replay'])
+parser.add_argument('-c', '--cassette', type=str, required=True, help='cassette directory')
+parser.add_argument('-s', '--slot', type=str, default='first', help='time slot to record (first/second/third/fourth)')
+parser.add_argument('-D', '--dir', type=str, default='', help='work dir for the run (default: temp dir)')
+parser.add_argument('--source-db', type=str, default='', help='data.db to take tasks/focuses from (record only)')
+parser.add_argument('--latency', type=str, default='recorded', help='recorded | none | fixed:S | scale:F | uniform:A-B')
+parser.add_argument('--port', type=int, default=8099, help='stand-in server port (replay only)')
+args = parser.parse_args()
+
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+cassette_dir = os.path.abspath(args.cassette)
+
+
+def read_snapshot_from_db(db_path: str, slot: str) -> dict:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    tasks = [dict(r) for r in conn.execute("SELECT * FROM tasks WHERE activated = 1")]
+    tasks = [t for t in tasks if slot in json.loads(t.get('time_slots') or '[]')]
+    focus_ids = {int(f) for t in tasks for f in json.loads(t.get('focuses') or '[]')}
+    focuses = [dict(r) for r in conn.execute("SELECT * FROM focuses")]
+    conn.close()
+    return {"slot": slot, "tasks": tasks, "focuses": [f for f in focuses if f['id'] in focus_ids]}
+
+
+if args.mode == 'record':
+    from dotenv import load_dotenv
+    env_path = os.path.join(project_root, '.env')
+    if os.path.exists(env_path):
+        load_dotenv(env_path)
+    source_root = os.path.join(os.environ.get("WISEFLOW_BASE_DIR") or project_root, "work_dir")
+    snapshot = read_snapshot_from_db(args.source_db or os.path.join(source_root, "data.db"), args.slot)
+    if not snapshot["tasks"]:
+        sys.exit(f"no activated task for time slot {args.slot}")
+    custom_config = os.path.join(source_root, "custom_config.json")
+    snapshot["custom_config"] = json.load(open(custom_config, encoding="utf-8")) if os.path.exists(custom_config) else {}
+    snapshot["models"] = {k: os.environ.get(k, "") for k in ("PRIMARY_MODEL", "VL_MODEL", "QA_MODEL")}
+    snapshot["recorded_at"] = datetime.now(timezone.utc).isoformat()
+else:
+    with open(os.path.join(cassette_dir, "snapshot.json"), encoding="utf-8") as f:
+        snapshot = json.load(f)
+    # LLM 请求发给替身服务
+    server_url = f"http://127.0.0.1:{args.port}"
+    os.environ.update({k: v for k, v in snapshot["models"].items() if v})
+    os.environ["LLM_API_BASE"] = f"{server_url}/v1"
+    os.environ["LLM_API_KEY"] = "replay"
+
+# 干净的 work_dir（必须在导入 core 之前设置）
+os.environ["WISEFLOW_BASE_DIR"] = args.dir or tempfile.mkdtemp(prefix=f"wiseflow_{args.mode}_")
+work_dir = os.path.join(os.environ["WISEFLOW_BASE_DIR"], "work_dir")
+os.makedirs(work_dir, exist_ok=True)
+with open(os.path.join(work_dir, "custom_config.json"), "w", encoding="utf-8") as f:
+    json.dump(snapshot["custom_config"], f, ensure_ascii=False)
+
+import asyncio
+from core.tools import cassette
+from core.tools.metrics import registry
+from core.async_database import AsyncDatabaseManager
+
+
+async def seed_database():
+    db = AsyncDatabaseManager()
+    await db.initialize()
+    # updated 设为当前时间：录制与回放的 limit_hours 一致（24 小时）
+    now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    async with db.get_connection() as conn:
+        for focus in snapshot["focuses"]:
+            cols = ", ".join(focus)
+            await conn.execute(f"INSERT INTO focuses ({cols}) VALUES ({', '.join('?' * len(focus))})", list(focus.values()))
+        for task in snapshot["tasks"]:
+            task = dict(task, updated=now, status=0, errors="", time_slots=json.dumps([snapshot["slot"]]))
+            cols = ", ".join(task)
+            await conn.execute(f"INSERT INTO tasks ({cols}) VALUES ({', '.join('?' * len(task))})", list(task.values()))
+        await conn.commit()
+    await db.cleanup()
+
+
+async def count_infos() -> int:
+    db = AsyncDatabaseManager()
+    await db.initialize()
+    async with db.get_connection() as conn:
+        async with conn.execute("SELECT COUNT(*) FROM infos") as cursor:
+            count = (await cursor.fetchone())[0]
+    await db.cleanup()
+    return count
+
+
+def start_stand_in():
+    import uvicorn
+    app = cassette.create_app(cassette_dir, args.latency)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return app, server, thread
+
+
+def metric_total(snapshot_metrics: list, name: str, index: int = None, **labels) -> float:
+    total = 0.0
+    for metric in snapshot_metrics:
+        if metric["name"] != name:
+            continue
+        for key, value in metric["samples"]:
+            values = dict(zip(metric["labelnames"], key))
+            if all(values.get(k) == v for k, v in labels.items()):
+                total += value[index] if index is not None else value
+    return total
+
+
+async def main():
+    await seed_database()
+    stand_in = None
+    if args.mode == 'record':
+        cassette.Cassette(cassette_dir).save_snapshot(snapshot)
+        cassette.install("record", cassette_dir)
+    else:
+        stand_in = start_stand_in()
+        cassette.install("replay", cassette_dir, server_url)
+
+    from core.run_task import execute_time_slot_tasks
+    started = time.perf_counter()
+    await execute_time_slot_tasks(snapshot["slot"])
+    wall = time.perf_counter() - started
+
+    metrics = registry.snapshot("bench")["metrics"]
+    infos = await count_infos()
+    fetches = metric_total(metrics, "wiseflow_fetch_duration_seconds", index=-1)
+    llm_calls = metric_total(metrics, "wiseflow_llm_request_duration_seconds", index=-1)
+    prompt_tokens = metric_total(metrics, "wiseflow_llm_tokens_total", kind="prompt")
+    completion_tokens = metric_total(metrics, "wiseflow_llm_tokens_total", kind="completion")
+    result = {
+        "mode": args.mode,
+        "slot": snapshot["slot"],
+        "latency": args.latency if args.mode == 'replay' else "live",
+        "wall_seconds": round(wall, 2),
+        "pages_fetched": int(fetches),
+        "pages_per_minute": round(fetches * 60 / wall, 2) if wall else 0,
+        "infos_added": infos,
+        "infos_per_minute": round(infos * 60 / wall, 2) if wall else 0,
+        "llm_calls": int(llm_calls),
+        "prompt_tokens": int(prompt_tokens),
+        "completion_tokens": int(completion_tokens),
+        "tokens_per_info": round((prompt_tokens + completion_tokens) / infos, 1) if infos else None,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if stand_in:
+        app, server, thread = stand_in
+        result["cassette_misses"] = dict(app.state.misses)
+        server.should_exit = True
+        thread.join(timeout=5)
+        output = os.path.join(cassette_dir, f"replay-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"result written to {output}")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,304 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# 使用临时目录作为 work_dir，避免测试污染项目目录
+_tmp_base = tempfile.mkdtemp(prefix="wiseflow_test_")
+os.environ.setdefault("WISEFLOW_BASE_DIR", _tmp_base)
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.wis.async_cache import SqliteCache, zstandard
+
+
+class TestSqliteCacheBatch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db_path = Path(tempfile.mkdtemp(prefix="cache_")) / "cache.sqlite"
+        self.cache = SqliteCache(db_path=self.db_path, default_namespace="articles")
+        await self.cache.open()
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def test_set_many_get_many_delete_many(self):
+        await self.cache.set_many({"a": {"x": 1}, "b": [1, 2], "c": "text"}, 0, namespace="ns")
+        self.assertEqual(await self.cache.get_many(["a", "b", "c", "missing"], namespace="ns"),
+                         {"a": {"x": 1}, "b": [1, 2], "c": "text"})
+        await self.cache.delete_many(["a", "c"], namespace="ns")
+        self.assertEqual(await self.cache.get_many(["a", "b", "c"], namespace="ns"), {"b": [1, 2]})
+
+    async def test_get_many_large_key_set(self):
+        items = {f"k{i}": i + 1 for i in range(1200)}
+        await self.cache.set_many(items, 10)
+        self.assertEqual(await self.cache.get_many(items.keys()), items)
+
+    async def test_get_many_drops_expired(self):
+        await self.cache.set("old", "v", 1)
+        await self.cache._connection.execute("UPDATE cache_items SET expires_at = 1 WHERE key = 'old'")
+        await self.cache._connection.commit()
+        self.assertEqual(await self.cache.get_many(["old"]), {})
+        self.assertEqual(await self.cache.keys(), [])
+
+    async def test_reads_use_query_only_pool(self):
+        await self.cache.set("k", "v", 0)
+        async with self.cache._reader() as conn:
+            self.assertIsNot(conn, self.cache._connection)
+            with self.assertRaises(sqlite3.OperationalError):
+                await conn.execute("DELETE FROM cache_items")
+        self.assertEqual(await self.cache.get("k"), "v")
+
+
+class TestSqliteCacheWriteBehind(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db_path = Path(tempfile.mkdtemp(prefix="cache_")) / "cache.sqlite"
+        self.cache = SqliteCache(db_path=self.db_path, default_namespace="articles", write_behind_ms=20)
+        await self.cache.open()
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def _count_rows(self) -> int:
+        cursor = await self.cache._connection.execute("SELECT COUNT(*) FROM cache_items")
+        row = await cursor.fetchone()
+        await cursor.close()
+        return row[0]
+
+    async def test_reads_see_staged_writes(self):
+        await self.cache.set("k", {"v": 1}, 5)
+        self.assertEqual(await self._count_rows(), 0)
+        self.assertEqual(await self.cache.get("k"), {"v": 1})
+        self.assertTrue(await self.cache.update_ttl("k", 0))
+        self.assertEqual(await self.cache.ttl("k"), -1)
+
+    async def test_staged_writes_are_flushed_within_window(self):
+        for i in range(10):
+            await self.cache.set(f"k{i}", i + 1, 5)
+        await asyncio.sleep(0.1)
+        self.assertEqual(await self._count_rows(), 10)
+
+    async def test_delete_discards_staged_write(self):
+        await self.cache.set("k", "v", 5)
+        await self.cache.delete("k")
+        await self.cache.flush()
+        self.assertIsNone(await self.cache.get("k"))
+        self.assertEqual(await self._count_rows(), 0)
+
+    async def test_reads_during_slow_flush(self):
+        await self.cache.set("a", {"v": 1}, 5)
+        await self.cache.set("b", {"v": 2}, 5)
+        upsert, started, release = self.cache._upsert_rows, asyncio.Event(), asyncio.Event()
+
+        async def slow_upsert(rows):
+            started.set()
+            await release.wait()
+            await upsert(rows)
+
+        self.cache._upsert_rows = slow_upsert
+        flush = asyncio.create_task(self.cache.flush())
+        await started.wait()
+        try:
+            # 批次已离开暂存区但尚未提交，本实例的读取仍应命中
+            self.assertEqual(await self.cache.get("a"), {"v": 1})
+            self.assertEqual(await self.cache.get_many(["a", "b"]), {"a": {"v": 1}, "b": {"v": 2}})
+            self.assertGreater(await self.cache.ttl("a"), 0)
+            delete = asyncio.create_task(self.cache.delete("b"))
+            await asyncio.sleep(0)
+            self.assertIsNone(await self.cache.get("b"))
+        finally:
+            release.set()
+        self.assertEqual(await flush, 2)
+        await delete
+        self.assertEqual(await self.cache.get_many(["a", "b"]), {"a": {"v": 1}})
+        self.assertEqual(await self._count_rows(), 1)
+
+    async def test_close_flushes(self):
+        await self.cache.set("k", "v", 5)
+        await self.cache.close()
+        reopened = SqliteCache(db_path=self.db_path, default_namespace="articles")
+        await reopened.open()
+        try:
+            self.assertEqual(await reopened.get("k"), "v")
+        finally:
+            await reopened.close()
+
+
+class TestSqliteCacheEviction(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db_path = Path(tempfile.mkdtemp(prefix="cache_")) / "cache.sqlite"
+
+    async def _open(self, **kwargs) -> SqliteCache:
+        cache = SqliteCache(db_path=self.db_path, default_namespace="articles", **kwargs)
+        await cache.open()
+        self.addAsyncCleanup(cache.close)
+        return cache
+
+    async def test_usage_tracked_incrementally(self):
+        cache = await self._open()
+        await cache.set_many({"a": "x" * 100, "b": "y" * 50}, 0, namespace="ns")
+        await cache.set("a", "x" * 10, 0, namespace="ns")
+        await cache.delete("b", namespace="ns")
+        bytes_used, count = (await cache.usage())["ns"]
+        self.assertEqual(count, 1)
+        self.assertEqual(bytes_used, len('"' + "x" * 10 + '"'))
+
+    async def test_lru_keeps_hot_entries(self):
+        cache = await self._open(namespace_max_bytes={"ns": 2000}, evict_to_ratio=0.5)
+        for i in range(30):
+            await cache.set(f"k{i}", "v" * 98, 0, namespace="ns")
+        # all rows share one created_at second; make k0 the most recently used
+        await cache._connection.execute("UPDATE cache_items SET last_access_at = last_access_at - 10")
+        await cache._connection.commit()
+        self.assertIsNotNone(await cache.get("k0", namespace="ns"))
+
+        self.assertGreater(await cache.evict(), 0)
+        bytes_used, _ = (await cache.usage())["ns"]
+        self.assertLessEqual(bytes_used, 1000)
+        self.assertIsNotNone(await cache.get("k0", namespace="ns"))
+
+    async def test_total_budget_and_incremental_vacuum(self):
+        cache = await self._open(max_total_bytes=10_000)
+        await cache.set_many({f"k{i}": "z" * 1000 for i in range(50)}, 0, namespace="ns")
+        await cache.evict()
+        total = sum(b for b, _ in (await cache.usage()).values())
+        self.assertLessEqual(total, 10_000)
+        cursor = await cache._connection.execute("PRAGMA auto_vacuum")
+        self.assertEqual((await cursor.fetchone())[0], 2)
+        await cursor.close()
+
+    async def test_existing_file_converted_only_on_request(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE legacy(x)")
+        conn.close()
+        cache = await self._open(max_total_bytes=10_000)
+        self.assertFalse(await cache._incremental_vacuum_enabled())
+        self.assertTrue(await cache.enable_incremental_vacuum())
+        self.assertTrue(await cache._incremental_vacuum_enabled())
+
+    async def test_eviction_order_uses_index(self):
+        cache = await self._open()
+        queries = {
+            "SELECT rowid, size_bytes FROM cache_items ORDER BY hit_count, last_access_at LIMIT 10": (),
+            "SELECT rowid, size_bytes FROM cache_items WHERE namespace = ? ORDER BY hit_count, last_access_at LIMIT 10": ("ns",),
+            "SELECT rowid, size_bytes FROM cache_items ORDER BY last_access_at LIMIT 10": (),
+        }
+        for sql, params in queries.items():
+            cursor = await cache._connection.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " | ".join(row[3] for row in await cursor.fetchall())
+            await cursor.close()
+            self.assertIn("USING INDEX", plan, sql)
+            self.assertNotIn("TEMP B-TREE", plan, sql)
+
+
+class TestSqliteCacheStaleWhileRevalidate(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db_path = Path(tempfile.mkdtemp(prefix="cache_")) / "cache.sqlite"
+        self.cache = SqliteCache(db_path=self.db_path, default_namespace="articles",
+                                 stale_grace_minutes={"rss": 60})
+        await self.cache.open()
+        self.calls = 0
+        self.background = []
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def _refresh(self, background: bool):
+        self.calls += 1
+        self.background.append(background)
+        await asyncio.sleep(0.05)
+        return f"v{self.calls}"
+
+    async def _expire(self, key: str, seconds_ago: int):
+        await self.cache._connection.execute(
+            "UPDATE cache_items SET expires_at = strftime('%s','now') - ? WHERE key = ?", (seconds_ago, key)
+        )
+        await self.cache._connection.commit()
+
+    async def test_miss_refreshes_once_for_concurrent_callers(self):
+        results = await asyncio.gather(*(self.cache.get_swr("feed", self._refresh, 10, namespace="rss")
+                                         for _ in range(5)))
+        self.assertEqual(results, ["v1"] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.background, [False])
+        self.assertEqual(await self.cache.get("feed", namespace="rss"), "v1")
+
+    async def test_stale_value_served_while_refreshing(self):
+        await self.cache.set("feed", "old", 10, namespace="rss")
+        await self._expire("feed", 120)
+        self.assertIsNone(await self.cache.get("feed", namespace="rss"))
+        # a plain get or a cleanup pass must not drop an entry still inside the grace window
+        self.assertEqual(await self.cache._cleanup_expired_items_batch(), 0)
+
+        self.assertEqual(await self.cache.get_swr("feed", self._refresh, 10, namespace="rss"), "old")
+        self.assertEqual(await self.cache.get_swr("feed", self._refresh, 10, namespace="rss"), "old")
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.calls, 1)
+        # the caller already got the stale value, so the refresh is told it runs in the background
+        self.assertEqual(self.background, [True])
+        self.assertEqual(await self.cache.get("feed", namespace="rss"), "v1")
+
+    async def test_failed_refresh_keeps_stale_and_grace_expires(self):
+        async def failing(background):
+            return None
+
+        await self.cache.set("feed", "old", 10, namespace="rss")
+        await self._expire("feed", 120)
+        self.assertEqual(await self.cache.get_swr("feed", failing, 10, namespace="rss"), "old")
+        await self._expire("feed", 2 * 3600)
+        self.assertEqual(await self.cache._cleanup_expired_items_batch(), 1)
+        self.assertIsNone(await self.cache.get_swr("feed", failing, 10, namespace="rss"))
+
+
+@unittest.skipIf(zstandard is None, "zstandard is not installed")
+class TestSqliteCacheCompression(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db_path = Path(tempfile.mkdtemp(prefix="cache_")) / "cache.sqlite"
+
+    async def _open(self, **kwargs) -> SqliteCache:
+        cache = SqliteCache(db_path=self.db_path, default_namespace="articles", **kwargs)
+        await cache.open()
+        self.addAsyncCleanup(cache.close)
+        return cache
+
+    async def _compressions(self, cache: SqliteCache) -> dict:
+        cursor = await cache._connection.execute("SELECT key, compression FROM cache_items")
+        rows = {row["key"]: row["compression"] for row in await cursor.fetchall()}
+        await cursor.close()
+        return rows
+
+    async def test_codec_switch_keeps_old_rows_readable(self):
+        html = "<div class='post'>hello world</div>" * 2000
+        gz = SqliteCache(db_path=self.db_path, default_namespace="articles")
+        await gz.open()
+        await gz.set("old", {"html": html}, 0)
+        await gz.close()
+
+        cache = await self._open(compression="zstd", compression_level=5)
+        await cache.set("new", {"html": html}, 0)
+        self.assertEqual(await self._compressions(cache), {"old": "gzip", "new": "zstd"})
+        self.assertEqual(await cache.get_many(["old", "new"]), {"old": {"html": html}, "new": {"html": html}})
+
+    async def test_trained_dictionary(self):
+        cache = await self._open(compression="zstd", zstd_dict_min_samples=50, zstd_dict_size=16 * 1024)
+        pages = {f"p{i}": f"<html><head><title>site page {i}</title></head><body><nav>home | news | about</nav>"
+                          f"<p>article number {i} body text {i * 7}</p><footer>copyright site</footer></body></html>"
+                 for i in range(300)}
+        await cache.set_many(pages, 0)
+        dict_id = await cache.train_dictionary()
+        self.assertIsNotNone(dict_id)
+
+        await cache.set("fresh", pages["p1"] * 10, 0)
+        self.assertEqual((await self._compressions(cache))["fresh"], f"zstd:{dict_id}")
+        await cache.close()
+
+        reopened = await self._open(compression="zstd")
+        self.assertEqual(await reopened.get("fresh"), pages["p1"] * 10)
+        self.assertEqual(await reopened.get("p7"), pages["p7"])
+
+
+if __name__ == '__main__':
+    unittest.main()
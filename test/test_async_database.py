@@ -0,0 +1,426 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+# 使用临时目录作为 work_dir，避免测试污染项目目录
+_tmp_base = tempfile.mkdtemp(prefix="wiseflow_test_")
+os.environ.setdefault("WISEFLOW_BASE_DIR", _tmp_base)
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+import sqlite3
+import time
+from pathlib import Path
+from loguru import logger
+from core.async_database import AsyncDatabaseManager
+from core.backend.maintenance import DatabaseMaintenance
+
+
+class TestInfosQueryPlans(unittest.IsolatedAsyncioTestCase):
+    """filter_infos / count_infos_by_focus 生成的 SQL 必须走索引，防止回退成全表扫描"""
+
+    async def asyncSetUp(self):
+        self.db = AsyncDatabaseManager(pool_size=1, logger=logger, write_batch_ms=0)
+        self.db.db_path = os.path.join(tempfile.mkdtemp(prefix="db_"), "data.db")
+        await self.db.initialize()
+        for i in range(30):
+            await self.db.add_info(type="news", content=f"c{i}", refers="", source_url=f"https://s{i % 3}.com",
+                                   source_title="t", created=f"2025-01-01T00:00:{i:02d}Z",
+                                   focus_statement="f", focus_id=i % 2 + 1)
+        self.statements = []
+        await self.db._connection_pool[0].set_trace_callback(self.statements.append)
+
+    async def asyncTearDown(self):
+        await self.db.cleanup()
+
+    async def _plans(self, *keywords) -> list:
+        """对追踪到的、包含关键字的语句做 EXPLAIN QUERY PLAN"""
+        traced = [sql for sql in self.statements if sql.lstrip().upper().startswith("SELECT")
+                  and all(k in sql for k in keywords)]
+        self.assertTrue(traced, f"no SELECT statement with {keywords} traced")
+        plans = []
+        async with self.db.get_connection() as conn:
+            for sql in traced:
+                async with conn.execute(f"EXPLAIN QUERY PLAN {sql}") as cursor:
+                    plans.append(" | ".join(row[3] for row in await cursor.fetchall()))
+        return plans
+
+    async def test_migration_recorded(self):
+        async with self.db.get_connection() as conn:
+            async with conn.execute("PRAGMA user_version") as cursor:
+                self.assertEqual((await cursor.fetchone())[0], self.db.MIGRATIONS[-1][0])
+            async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'") as cursor:
+                names = {row[0] for row in await cursor.fetchall()}
+        self.assertTrue({"idx_infos_focus_created_id", "idx_infos_source_url"} <= names)
+
+    async def test_paged_filter_by_focus_uses_index(self):
+        rows = await self.db.filter_infos(focus_ids=[1, 2], limit=5, offset=2)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual([r["content"] for r in rows if r["focus_id"] == 1], ["c24", "c22", "c20", "c18", "c16"])
+        for plan in await self._plans("FROM infos", "LIMIT"):
+            self.assertIn("USING INDEX idx_infos_focus_created_id", plan)
+            self.assertNotIn("SCAN infos", plan)
+
+    async def test_keyset_pages_use_index_without_sort(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = await self.db.page_infos(focus_ids=[1, 2], limit=4, cursor=cursor)
+            seen.extend(r["content"] for r in rows if r["focus_id"] == 1)
+            pages += 1
+            if not cursor:
+                break
+        self.assertEqual(pages, 4)
+        self.assertEqual(seen, [f"c{i}" for i in range(28, -1, -2)])
+        for plan in await self._plans("FROM infos", "(created, id) <"):
+            self.assertIn("INDEX idx_infos_focus_created_id (focus_id=? AND (created,id)<(?,?))", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    async def test_keyset_pages_continue_past_null_created(self):
+        async with self.db.get_connection() as conn:
+            await conn.executemany("INSERT INTO infos (type, content, focus_id, created) VALUES ('news', ?, 3, ?)",
+                                   [(f"n{i}", None if i % 2 else f"2025-01-01T00:00:{i:02d}Z") for i in range(9)])
+            await conn.commit()
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await self.db.page_infos(focus_ids=[3], limit=2, cursor=cursor)
+            seen.extend(r["content"] for r in rows)
+            if not cursor:
+                break
+        self.assertEqual(seen[:5], ["n8", "n6", "n4", "n2", "n0"])
+        self.assertEqual(sorted(seen[5:]), ["n1", "n3", "n5", "n7"])
+
+    async def test_filter_by_source_url_uses_index(self):
+        rows = await self.db.filter_infos(source_url="https://s1.com")
+        self.assertEqual(len(rows), 10)
+        for plan in await self._plans("source_url ="):
+            self.assertIn("idx_infos_source_url", plan)
+
+    async def test_count_by_focus_reads_stats_table(self):
+        self.assertEqual(await self.db.count_infos_by_focus(), {1: 15, 2: 15})
+        self.assertEqual(await self.db.count_infos_by_focus(focus_id=2), {2: 15})
+        self.assertFalse([sql for sql in self.statements if "GROUP BY" in sql])
+        for plan in await self._plans("FROM focus_stats"):
+            self.assertNotIn("infos", plan.replace("focus_stats", ""))
+
+
+class TestFocusStats(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = AsyncDatabaseManager(pool_size=1, logger=logger, write_batch_ms=0)
+        self.db.db_path = os.path.join(tempfile.mkdtemp(prefix="db_"), "data.db")
+        await self.db.initialize()
+
+    async def asyncTearDown(self):
+        await self.db.cleanup()
+
+    def _info(self, day: int, hour: int) -> dict:
+        return {"type": "news", "content": f"c{day}-{hour}", "refers": "", "source_url": "u", "source_title": "t",
+                "created": f"2025-01-{day:02d}T{hour:02d}:00:00Z"}
+
+    async def test_triggers_track_insert_update_delete(self):
+        ids = await self.db.add_infos([self._info(1, 8), self._info(1, 9), self._info(2, 8)], "f", 1)
+        await self.db.add_infos([self._info(3, 8)], "f", 2)
+        stats = await self.db.get_focus_stats(days=3660)
+        self.assertEqual(stats[1], {"count": 3, "last_created": "2025-01-02T08:00:00Z",
+                                    "daily": {"2025-01-01": 2, "2025-01-02": 1}})
+
+        await self.db.delete_info(ids[2])
+        async with self.db.get_connection() as conn:
+            await conn.execute("UPDATE infos SET focus_id = 2 WHERE id = ?", (ids[0],))
+            await conn.commit()
+        stats = await self.db.get_focus_stats(days=3660)
+        self.assertEqual(stats[1], {"count": 1, "last_created": "2025-01-01T09:00:00Z", "daily": {"2025-01-01": 1}})
+        self.assertEqual(stats[2]["daily"], {"2025-01-01": 1, "2025-01-03": 1})
+        self.assertEqual(await self.db.count_infos_by_focus(), {1: 1, 2: 2})
+
+    async def test_iter_infos_streams_in_batches(self):
+        await self.db.add_infos([self._info(d, h) for d in (1, 2) for h in range(5)], "f", 1)
+        await self.db.add_infos([dict(self._info(3, 0), type="paper")], "f", 2)
+        batches = [b async for b in self.db.iter_infos(focus_ids=[1], start_time="2025-01-01T02:00:00Z",
+                                                        batch_size=3)]
+        self.assertEqual([len(b) for b in batches], [3, 3, 2])
+        created = [r["created"] for b in batches for r in b]
+        self.assertEqual(created, sorted(created))
+        papers = [r async for b in self.db.iter_infos(types=["paper"]) for r in b]
+        self.assertEqual([r["focus_id"] for r in papers], [2])
+
+    async def test_listeners_and_since_cursor(self):
+        events = []
+        self.db.add_info_listener(lambda fid, ids: events.append((fid, ids)))
+        await self.db.add_infos([self._info(1, 8)], "f", 1)
+        _, since = await self.db.read_infos_since(None)
+
+        ids = await self.db.add_infos([self._info(2, 8), self._info(2, 9)], "f", 1)
+        other = await self.db.add_info(focus_statement="f", focus_id=2, **self._info(3, 8))
+        self.assertEqual(events[1:], [(1, ids), (2, [other])])
+        self.assertEqual(await self.db.since_cursor_before(ids[1:]), (await self.db.read_infos_since(since, limit=1))[1])
+
+        rows, next_since = await self.db.read_infos_since(since, focus_ids=[1])
+        self.assertEqual([r["id"] for r in rows], ids)
+        rows, _ = await self.db.read_infos_since(next_since)
+        self.assertEqual([r["id"] for r in rows], [other])
+
+    async def test_since_cursor_survives_delete_and_vacuum(self):
+        await self.db.add_infos([self._info(1, 8), self._info(1, 9)], "f", 1)
+        _, since = await self.db.read_infos_since(None)
+        # 删除最新一条后 rowid 会被复用、VACUUM 会重排 rowid，seq 都不受影响
+        async with self.db.get_connection() as conn:
+            await conn.execute("DELETE FROM infos WHERE created = '2025-01-01T09:00:00Z'")
+            await conn.commit()
+            await conn.execute("VACUUM")
+        ids = await self.db.add_infos([self._info(2, 8)], "f", 1)
+        rows, _ = await self.db.read_infos_since(since)
+        self.assertEqual([r["id"] for r in rows], ids)
+
+    async def test_rebuild_repairs_drift(self):
+        await self.db.add_infos([self._info(1, 8), self._info(2, 8)], "f", 1)
+        async with self.db.get_connection() as conn:
+            await conn.execute("UPDATE focus_stats SET info_count = 99")
+            await conn.execute("DELETE FROM focus_daily_stats")
+            await conn.commit()
+        self.assertEqual(await self.db.rebuild_focus_stats(), 1)
+        stats = await self.db.get_focus_stats(days=3660)
+        self.assertEqual(stats[1]["count"], 2)
+        self.assertEqual(stats[1]["daily"], {"2025-01-01": 1, "2025-01-02": 1})
+
+class TestListTasks(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # 单连接池：list_tasks 若在持有连接时再借连接会直接死锁
+        self.db = AsyncDatabaseManager(pool_size=1, logger=logger, write_batch_ms=0)
+        self.db.db_path = os.path.join(tempfile.mkdtemp(prefix="db_"), "data.db")
+        await self.db.initialize()
+
+    async def asyncTearDown(self):
+        await self.db.cleanup()
+
+    async def test_focuses_loaded_in_one_round_trip(self):
+        for i in range(5):
+            await self.db.add_task(focuses=[{"focuspoint": f"fp{i}"}, {"focuspoint": "shared"}], title=f"t{i}")
+        statements = []
+        await self.db._connection_pool[0].set_trace_callback(statements.append)
+        tasks = await asyncio.wait_for(self.db.list_tasks(), timeout=5)
+        self.assertEqual([t["title"] for t in tasks], [f"t{i}" for i in range(4, -1, -1)])
+        self.assertEqual(sorted(f["focuspoint"] for f in tasks[0]["focuses"]), ["fp4", "shared"])
+        self.assertEqual(len([sql for sql in statements if "FROM focuses" in sql]), 1)
+
+class TestSingleWriter(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = AsyncDatabaseManager(pool_size=2, logger=logger, write_batch_ms=20)
+        self.db.db_path = os.path.join(tempfile.mkdtemp(prefix="db_"), "data.db")
+        await self.db.initialize()
+        self.commits = []
+        await self.db._writer_conn.set_trace_callback(
+            lambda sql: self.commits.append(sql) if sql.strip().upper() == "COMMIT" else None)
+
+    async def asyncTearDown(self):
+        await self.db.cleanup()
+
+    async def test_concurrent_writes_share_transactions(self):
+        ids = await asyncio.gather(*(
+            self.db.add_info(type="news", content=f"c{i}", refers="", source_url="u", source_title="t",
+                             created="2025-01-01T00:00:00Z", focus_statement="f", focus_id=1)
+            for i in range(50)))
+        self.assertEqual(len(set(ids)), 50)
+        self.assertLess(len(self.commits), 5)
+        self.assertEqual(await self.db.get_total_count(), 50)
+
+    async def test_add_infos_single_transaction(self):
+        infos = [{"type": "news", "content": f"c{i}", "refers": "", "source_url": "u", "source_title": "t",
+                  "created": "2025-01-01T00:00:00Z"} for i in range(40)]
+        ids = await self.db.add_infos(infos, focus_statement="f", focus_id=3)
+        self.assertEqual(len(set(ids)), 40)
+        self.assertTrue(all(len(i) == 16 for i in ids))
+        self.assertEqual(len(self.commits), 1)
+        self.assertEqual(await self.db.count_infos_by_focus(3), {3: 40})
+        # 重复 id 被忽略，只返回真正写入的
+        again = await self.db.add_infos([dict(infos[0], id=ids[0]), dict(infos[1], id="fresh", content="new")], "f", 3)
+        self.assertEqual(again, ["fresh"])
+
+    async def test_duplicate_contents_skipped_per_focus(self):
+        base = {"type": "news", "refers": "", "source_url": "u", "source_title": "t", "created": "2025-01-01T00:00:00Z"}
+        ids = await self.db.add_infos([dict(base, content="OpenAI 发布 GPT-5。"),
+                                       dict(base, content="openai发布 gpt 5"),
+                                       dict(base, content="另一条")], "f", 1)
+        self.assertEqual(len(ids), 2)
+        self.assertIsNone(await self.db.add_info(content="OpenAI发布GPT-5", focus_id=1, **dict(base, focus_statement="f")))
+        # 其他 focus 不受影响
+        self.assertIsNotNone(await self.db.add_info(content="OpenAI发布GPT-5", focus_id=2, **dict(base, focus_statement="f")))
+        self.assertEqual(self.db.duplicate_infos_skipped, 2)
+        self.assertEqual(await self.db.count_infos_by_focus(), {1: 2, 2: 1})
+
+    async def test_constraint_errors_not_counted_as_duplicates(self):
+        base = {"refers": "", "source_url": "u", "source_title": "t", "created": "2025-01-01T00:00:00Z"}
+        # type 为 NOT NULL，违反约束的写入应报错，而不是当作重复被悄悄跳过
+        self.assertEqual(await self.db.add_infos([dict(base, type=None, content="a"),
+                                                  dict(base, type="news", content="b")], "f", 1), [])
+        self.assertIsNone(await self.db.add_info(type=None, content="c", focus_statement="f", focus_id=1, **base))
+        self.assertEqual(self.db.duplicate_infos_skipped, 0)
+        self.assertEqual(await self.db.get_total_count(), 0)
+
+    async def test_failed_operation_only_rolls_back_itself(self):
+        async def ok(db, n):
+            await db.execute("INSERT INTO ws_history (type, ts) VALUES ('notify', ?)", (n,))
+            return n
+
+        async def broken(db):
+            await db.execute("INSERT INTO ws_history (type, ts) VALUES ('notify', -1)")
+            await db.execute("INSERT INTO no_such_table VALUES (1)")
+
+        results = await asyncio.gather(self.db.execute_write(ok, 1), self.db.execute_write(broken),
+                                       self.db.execute_write(ok, 2), return_exceptions=True)
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], Exception)
+        self.assertEqual(results[2], 2)
+        async with self.db.get_connection() as conn:
+            async with conn.execute("SELECT ts FROM ws_history ORDER BY ts") as cursor:
+                self.assertEqual([row[0] for row in await cursor.fetchall()], [1, 2])
+
+    async def test_cleanup_drains_queue(self):
+        pending = asyncio.ensure_future(self.db.add_ws_history("notify", code=1))
+        await asyncio.sleep(0)
+        await self.db.cleanup()
+        self.assertIsNotNone(await pending)
+
+
+class TestInfoSearch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.db = AsyncDatabaseManager(pool_size=1, logger=logger, write_batch_ms=0)
+        self.db_path = os.path.join(tempfile.mkdtemp(prefix="db_"), "data.db")
+        self.db.db_path = self.db_path
+        await self.db.initialize()
+        if not self.db._fts_available:
+            self.skipTest("sqlite build without fts5 trigram tokenizer")
+        infos = [{"type": "news", "content": f"第{i}条：上海发布人工智能产业新政策", "refers": "",
+                  "source_url": f"https://s{i}.com", "source_title": "政策快讯",
+                  "created": f"2025-01-01T00:00:{i:02d}Z"} for i in range(25)]
+        infos.append({"type": "news", "content": "GPU shortage hits AI labs", "refers": "", "source_url": "u",
+                      "source_title": "AI weekly", "created": "2025-01-02T00:00:00Z"})
+        self.ids = await self.db.add_infos(infos, focus_statement="f", focus_id=1)
+
+    async def asyncTearDown(self):
+        await self.db.cleanup()
+
+    async def test_chinese_substring_with_highlight(self):
+        items, _ = await self.db.search_infos("人工智能", limit=5)
+        self.assertEqual(len(items), 5)
+        self.assertIn("<mark>人工智能</mark>", items[0]["content_highlight"])
+
+    async def test_cursor_pagination_covers_all_hits(self):
+        seen, cursor = [], None
+        while True:
+            items, cursor = await self.db.search_infos("产业新政策", limit=10, cursor=cursor)
+            seen.extend(item["id"] for item in items)
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    async def test_short_terms_scan_pagination(self):
+        seen, cursor = [], None
+        while True:
+            items, cursor = await self.db.search_infos("第 条", limit=7, cursor=cursor)
+            seen.extend(item["id"] for item in items)
+            if not cursor:
+                break
+        self.assertEqual(len(set(seen)), 25)
+
+    async def test_fts_created_on_start_after_skipped_migration(self):
+        # 模拟迁移 2 在不支持 trigram 的 SQLite 上执行过（user_version 已推进，但没有 infos_fts）
+        async with self.db.get_connection() as conn:
+            await conn.executescript(
+                "DROP TRIGGER trg_infos_fts_insert; DROP TRIGGER trg_infos_fts_delete;"
+                " DROP TRIGGER trg_infos_fts_update; DROP TABLE infos_fts;")
+            await conn.commit()
+        await self.db.cleanup()
+        self.db = AsyncDatabaseManager(pool_size=1, logger=logger, write_batch_ms=0)
+        self.db.db_path = self.db_path
+        await self.db.initialize()
+        self.assertTrue(self.db._fts_available)
+        self.assertEqual(len((await self.db.search_infos("产业新政策", limit=100))[0]), 25)
+
+    async def test_short_terms_fall_back_to_scan(self):
+        items, cursor = await self.db.search_infos("AI", limit=10)
+        self.assertEqual([item["content"] for item in items], ["GPU shortage hits AI labs"])
+        self.assertIsNone(cursor)
+        self.assertIn("<mark>AI</mark>", items[0]["source_title_highlight"])
+
+    async def test_index_follows_deletes(self):
+        await self.db.delete_info(self.ids[-1])
+        items, _ = await self.db.search_infos("shortage")
+        self.assertEqual(items, [])
+        self.assertTrue(await self.db.rebuild_info_search_index())
+        self.assertEqual(len((await self.db.search_infos("产业", limit=100))[0]), 25)
+
+
+class TestMaintenance(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="db_"))
+        self.db = AsyncDatabaseManager(pool_size=2, logger=logger, write_batch_ms=0)
+        self.db.db_path = self.tmp / "data.db"
+        await self.db.initialize()
+
+    async def asyncTearDown(self):
+        await self.db.cleanup()
+
+    async def test_ws_history_pruned_by_maintenance_not_by_reads(self):
+        async def seed(db):
+            await db.execute("INSERT INTO ws_history (type, ts) VALUES ('notify', ?)", (time.time() - 48 * 3600,))
+            await db.execute("INSERT INTO ws_history (type, ts) VALUES ('notify', ?)", (time.time(),))
+
+        await self.db.execute_write(seed)
+        self.assertEqual(len(await self.db.list_ws_history()), 1)
+        # 保留时长可配置，读取与清理使用同一窗口
+        self.assertEqual(len(await self.db.list_ws_history(max_age_hours=72)), 2)
+        self.assertEqual(await self.db.prune_ws_history(24), 1)
+
+    async def test_optimize_runs_once_on_every_connection(self):
+        seen = {}
+        for conn in self.db._connection_pool + [self.db._writer_conn]:
+            seen[id(conn)] = []
+            await conn.set_trace_callback(lambda sql, log=seen[id(conn)]: log.append(sql) if "optimize" in sql else None)
+        self.assertTrue(await self.db.optimize())
+        self.assertEqual([len(log) for log in seen.values()], [1] * 3)
+        self.assertEqual(self.db._available_connections.qsize(), 2)
+
+    async def test_archive_moves_old_infos_to_monthly_databases(self):
+        infos = [{"type": "news", "content": f"c{m}-{d}", "refers": "", "source_url": "u", "source_title": "t",
+                  "created": f"2025-{m:02d}-{d:02d}T00:00:00Z"} for m in (1, 2, 3) for d in (1, 2)]
+        await self.db.add_infos(infos, "f", 1)
+        moved = await self.db.archive_infos("2025-03-01T00:00:00Z", self.tmp / "archive", batch_size=1)
+        self.assertEqual(moved, 4)
+        self.assertEqual(await self.db.count_infos_by_focus(), {1: 2})
+        self.assertEqual(len(await self.db.filter_infos(focus_ids=[1])), 2)
+        with sqlite3.connect(self.tmp / "archive" / "infos_2025-01.db") as arc:
+            self.assertEqual(sorted(r[0] for r in arc.execute("SELECT content FROM infos")), ["c1-1", "c1-2"])
+
+    async def test_content_hash_backfill_keeps_existing_duplicates(self):
+        await self.db.cleanup()
+        with sqlite3.connect(self.db.db_path) as conn:
+            conn.execute("DROP INDEX idx_infos_focus_content_hash")
+            conn.execute("PRAGMA user_version = 3")
+            conn.executemany("INSERT INTO infos (type, content, focus_id, created) VALUES ('news', ?, 1, ?)",
+                             [("Same text!", "2025-01-02"), ("same  text", "2025-01-01"), ("other", "2025-01-03")])
+        self.db = AsyncDatabaseManager(pool_size=1, logger=logger, write_batch_ms=0)
+        self.db.db_path = self.tmp / "data.db"
+        await self.db.initialize()
+        async with self.db.get_connection() as conn:
+            async with conn.execute("SELECT content, content_hash IS NOT NULL FROM infos ORDER BY created") as cursor:
+                self.assertEqual(await cursor.fetchall(), [("same  text", 1), ("Same text!", 0), ("other", 1)])
+        self.assertEqual(len(await self.db.filter_infos(focus_ids=[1])), 3)
+        self.assertEqual(await self.db.add_infos([{"type": "news", "content": "SAME TEXT", "created": "x"}], "f", 1), [])
+
+    async def test_new_database_supports_incremental_vacuum(self):
+        self.assertIsNotNone(await self.db.incremental_vacuum())
+
+    async def test_oversized_wal_is_truncated(self):
+        await self.db.add_infos([{"type": "news", "content": f"{i}" + "x" * 2000, "refers": "", "source_url": "u",
+                                  "source_title": "t", "created": "2025-01-01T00:00:00Z"} for i in range(200)], "f", 1)
+        self.assertGreater(self.db.wal_size(), 64 * 1024)
+        maintenance = DatabaseMaintenance(self.db, logger, wal_truncate_mb=0.05)
+        await maintenance.run_once()
+        self.assertEqual(self.db.wal_size(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.backend import responses
+from core.backend.responses import SelectiveGZipMiddleware, dumps, etag_response
+
+
+def _request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class TestResponses(unittest.TestCase):
+    def test_dumps_matches_stdlib_output(self):
+        content = {"data": {1: ["中文", 2.5, None], 2: {"a", }}, "ok": True}
+        expected = b'{"data":{"1":["\xe4\xb8\xad\xe6\x96\x87",2.5,null],"2":["a"]},"ok":true}'
+        self.assertEqual(dumps(content), expected)
+        orjson, responses.orjson = responses.orjson, None
+        try:
+            self.assertEqual(dumps(content), expected)
+        finally:
+            responses.orjson = orjson
+
+    def test_etag_revalidation(self):
+        first = etag_response(_request(), {"data": [1, 2, 3]})
+        etag = first.headers["etag"]
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(etag_response(_request(etag), {"data": [1, 2, 3]}).status_code, 304)
+        self.assertEqual(etag_response(_request(f'"other", W/{etag}'), {"data": [1, 2, 3]}).status_code, 304)
+        self.assertEqual(etag_response(_request(etag), {"data": [1, 2]}).status_code, 200)
+
+
+class TestSelectiveGZip(unittest.IsolatedAsyncioTestCase):
+    async def test_excluded_paths_pass_through(self):
+        async def body(request):
+            return PlainTextResponse("x" * 4096)
+
+        app = Starlette(routes=[Route("/list", body), Route("/export_info", body)])
+        app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, exclude_paths=["/export_info"])
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://backend") as client:
+            compressed = await client.get("/list", headers={"accept-encoding": "gzip"})
+            untouched = await client.get("/export_info", headers={"accept-encoding": "gzip"})
+        self.assertEqual(compressed.headers.get("content-encoding"), "gzip")
+        self.assertNotIn("content-encoding", untouched.headers)
+        self.assertEqual(untouched.text, "x" * 4096)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import copy
+import asyncio
+import unittest
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_html2md import STAGES, bench_page, clean_html, compare, load_corpus
+from core.wis.chunking_strategy import MaxLengthChunking
+
+
+class TestCorpus(unittest.TestCase):
+    def test_manifest(self):
+        pages = load_corpus()
+        self.assertEqual(len({p["id"] for p in pages}), len(pages))
+        self.assertEqual({p["category"] for p in pages},
+                         {"news", "portal", "wechat", "forum", "spa", "ecommerce"})
+        for page in pages:
+            self.assertTrue(page["html"], page["id"])
+        self.assertTrue(all(p["category"] == "wechat" for p in load_corpus(["wechat"])))
+
+    def test_preprocess_returns_content(self):
+        # 与爬虫相同的清洗路径，总能得到正文
+        html = "<html><head><title>t</title></head><body><script>var a = 1;</script>" \
+               + "".join(f"<div class='item'><p>第 {i} 条内容</p></div>" for i in range(10)) + "</body></html>"
+        cleaned = clean_html(html)
+        self.assertIn("第 0 条内容", cleaned)
+        self.assertNotIn("<script", cleaned)
+        self.assertNotIn("<title", cleaned)
+
+
+class TestBenchPage(unittest.TestCase):
+    def test_stages_and_compare(self):
+        page = next(p for p in load_corpus(["forum"]) if p["id"] == "forum-ecb29a")
+        loop = asyncio.new_event_loop()
+        try:
+            result = bench_page(page, 1, MaxLengthChunking(max_size=4000), loop)
+        finally:
+            loop.close()
+        self.assertEqual(tuple(result["stages"]), STAGES)
+        for stage in STAGES:
+            self.assertGreater(result["stages"][stage]["output_chars"], 0, stage)
+        self.assertGreater(result["stages"]["chunk"]["chunks"], 0)
+
+        run = {"meta": {}, "pages": {page["id"]: result}}
+        self.assertEqual(compare(run, run, 1.25), [])
+        baseline = copy.deepcopy(run)
+        baseline["pages"][page["id"]]["stages"]["html2text"]["min_ms"] = 5.0
+        slower = copy.deepcopy(run)
+        slower["pages"][page["id"]]["stages"]["html2text"]["min_ms"] = 10.0
+        self.assertEqual(len(compare(slower, baseline, 1.25)), 1)
+        self.assertEqual(compare(baseline, slower, 1.25), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.tools import cassette
+from core.tools.cassette import Cassette, LatencyModel, create_app, http_key, llm_key
+
+
+def _stand_in_server(directory: str) -> ThreadingHTTPServer:
+    """只实现 GET /http/<key> 的最小替身服务，验证传输层改写"""
+    store = Cassette(directory)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            entry = store.load_http(self.path.rsplit("/", 1)[-1])
+            if entry is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            meta, body = entry
+            self.send_response(meta["status"])
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+
+class TestCassetteKeys(unittest.TestCase):
+    def test_llm_key_ignores_prompt_date(self):
+        base = {"model": "m", "messages": [{"role": "user", "content": "今天是 2025-01-01\n\n文本"}]}
+        later = {"model": "m", "messages": [{"role": "user", "content": "今天是 2025-03-09\n\n文本"}], "stream": False}
+        other = {"model": "m", "messages": [{"role": "user", "content": "今天是 2025-01-01\n\n别的文本"}]}
+        self.assertEqual(llm_key(base), llm_key(later))
+        self.assertNotEqual(llm_key(base), llm_key(other))
+        self.assertNotEqual(http_key("GET", "https://a.com/x"), http_key("POST", "https://a.com/x"))
+
+    def test_latency_model(self):
+        key = http_key("GET", "https://a.com/x")
+        self.assertEqual(LatencyModel("recorded").delay(key, 1.5), 1.5)
+        self.assertEqual(LatencyModel("none").delay(key, 1.5), 0.0)
+        self.assertEqual(LatencyModel("fixed:0.2").delay(key, 1.5), 0.2)
+        self.assertEqual(LatencyModel("scale:2").delay(key, 1.5), 3.0)
+        uniform = LatencyModel("uniform:1-3")
+        self.assertEqual(uniform.delay(key, 0), uniform.delay(key, 0))
+        self.assertTrue(1 <= uniform.delay(key, 0) <= 3)
+        with self.assertRaises(ValueError):
+            LatencyModel("gaussian:1")
+
+
+class TestStandIn(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cassette = Cassette(self.tmp.name)
+        self.key = http_key("GET", "https://example.com/feed")
+        self.cassette.save_http(self.key, {"status": 200, "latency": 0.5,
+                                           "headers": {"content-type": "application/xml", "content-encoding": "gzip"}},
+                                b"<rss></rss>")
+        self.request = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+        self.cassette.save_llm(llm_key(self.request), self.request, {"id": "1", "choices": []}, 2.0)
+
+    def tearDown(self):
+        cassette.uninstall()
+        self.tmp.cleanup()
+
+    async def test_serves_recorded_entries(self):
+        app = create_app(self.tmp.name, latency="none")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stand-in") as client:
+            hit = await client.get(f"/http/{self.key}")
+            self.assertEqual(hit.status_code, 200)
+            self.assertEqual(hit.content, b"<rss></rss>")
+            self.assertNotIn("content-encoding", hit.headers)
+
+            miss = await client.get(f"/http/{http_key('GET', 'https://example.com/other')}")
+            self.assertEqual(miss.status_code, 404)
+
+            completion = await client.post("/v1/chat/completions", json=dict(self.request, stream=False))
+            self.assertEqual(completion.json()["id"], "1")
+            unknown = await client.post("/v1/chat/completions", json={"model": "m", "messages": []})
+            self.assertEqual(unknown.status_code, 400)
+
+            self.assertEqual((await client.get("/misses")).json(), {"http": 1, "llm": 1})
+
+    async def test_httpx_replay_goes_to_stand_in(self):
+        server = _stand_in_server(self.tmp.name)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            cassette.install("replay", self.tmp.name, f"http://127.0.0.1:{server.server_port}", browser=False, llm=False)
+            async with httpx.AsyncClient() as client:
+                response = await client.get("https://example.com/feed")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.text, "<rss></rss>")
+                self.assertEqual(str(response.request.url), "https://example.com/feed")
+                missing = await client.get("https://example.com/not-recorded")
+                self.assertEqual(missing.status_code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+# 使用临时目录作为 work_dir，避免测试污染项目目录
+os.environ.setdefault("WISEFLOW_BASE_DIR", tempfile.mkdtemp(prefix="wiseflow_test_"))
+os.environ.setdefault("LLM_API_KEY", "no_use")
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.wis import extractor
+from core.wis.async_cache import SqliteCache
+from core.wis.chunking_strategy import MaxLengthChunking
+
+FOCUS = {"id": 1, "focuspoint": "芯片", "restrictions": "", "role": "", "purpose": "",
+         "explanation": "", "custom_schema": ""}
+
+
+def reply(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+class TestExtractSectionMarkers(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = SqliteCache(db_path=Path(tempfile.mkdtemp(prefix="cache_")) / "cache.sqlite",
+                                 default_namespace="articles")
+        await self.cache.open()
+        self.sections = [f"第 {i} 段：" + "英伟达发布新一代数据中心芯片，性能提升三倍。" * 8 for i in range(3)]
+        self._originals = extractor.llm_async, extractor._chunker
+        extractor._chunker = MaxLengthChunking(max_size=150)
+
+    async def asyncTearDown(self):
+        extractor.llm_async, extractor._chunker = self._originals
+        await self.cache.close()
+
+    async def test_cancel_keeps_later_sections_unmarked(self):
+        calls, blocked = [], asyncio.Event()
+
+        async def fake_llm(messages, model, **kwargs):
+            calls.append(messages)
+            if len(calls) == 1:
+                return reply("<info>\n英伟达发布新芯片\n</info>")
+            blocked.set()
+            await asyncio.Event().wait()
+
+        extractor.llm_async = fake_llm
+        manager = extractor.ExtractManager(FOCUS, None, self.cache)
+        task = asyncio.create_task(manager(mode='only_info', markdown="\n".join(self.sections),
+                                           link_dict={}, url="https://example.com/a"))
+        await asyncio.wait_for(blocked.wait(), 5)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        hashes = [extractor.hash_calculate(s) for s in extractor._chunker.chunk("\n".join(self.sections))]
+        self.assertEqual(len(hashes), 3)
+        marked = await self.cache.get_many(hashes, namespace="focus_1")
+        # 已完成与正在处理的段落有标记，之后的段落没有，下次仍会被提取
+        self.assertEqual(set(marked), set(hashes[:2]))
+
+    async def test_section_marked_elsewhere_meanwhile_is_skipped(self):
+        hashes = [extractor.hash_calculate(s) for s in extractor._chunker.chunk("\n".join(self.sections))]
+        calls = []
+
+        async def fake_llm(messages, model, **kwargs):
+            calls.append(messages)
+            if len(calls) == 1:
+                # 第一段调用 LLM 期间，另一个任务处理了相同内容的第二段
+                await self.cache.set(hashes[1], True, 0, namespace="focus_1")
+            return reply("<info>\n英伟达发布新芯片\n</info>")
+
+        extractor.llm_async = fake_llm
+        manager = extractor.ExtractManager(FOCUS, None, self.cache)
+        await manager(mode='only_info', markdown="\n".join(self.sections), link_dict={}, url="https://example.com/a")
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
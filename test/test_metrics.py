@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.tools import metrics
+from core.tools.metrics import MetricsRegistry, render
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_render_prometheus_text(self):
+        lookups = self.registry.counter("cache_lookups_total", "lookups", ["namespace", "result"])
+        lookups.labels(namespace="llm", result="hit").inc(3)
+        depth = self.registry.gauge("queue_depth", "depth")
+        depth.set(7)
+        latency = self.registry.histogram("latency_seconds", "latency", ["model"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            latency.labels(model='m"1').observe(value)
+
+        text = render([self.registry.snapshot("task")])
+        self.assertIn("# TYPE cache_lookups_total counter", text)
+        self.assertIn('cache_lookups_total{process="task",namespace="llm",result="hit"} 3', text)
+        self.assertIn('queue_depth{process="task"} 7', text)
+        self.assertIn('latency_seconds_bucket{process="task",model="m\\"1",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{process="task",model="m\\"1",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{process="task",model="m\\"1",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count{process="task",model="m\\"1"} 3', text)
+        self.assertEqual(text.count("# TYPE latency_seconds histogram"), 1)
+        # counter 只能递增
+        self.assertFalse(hasattr(lookups, "set"))
+        self.assertFalse(hasattr(lookups.labels(namespace="llm", result="hit"), "set"))
+
+    def test_series_cap(self):
+        fetches = self.registry.counter("fetch_total", "fetches", ["domain"])
+        for i in range(metrics.MAX_SERIES_PER_METRIC + 10):
+            fetches.labels(domain=f"site{i}.com").inc()
+        samples = dict((key[0], value) for key, value in fetches.snapshot()["samples"])
+        self.assertEqual(len(samples), metrics.MAX_SERIES_PER_METRIC + 1)
+        self.assertEqual(samples["other"], 10)
+
+    def test_snapshot_files_merge_and_expire(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            metrics.registry.counter("test_snapshot_total", "snapshot test").inc()
+            metrics.write_snapshot("task", directory)
+            stale = directory / "old.json"
+            stale.write_text('{"process": "old", "ts": %f, "metrics": []}' % (time.time() - 3600))
+
+            snapshots = metrics.read_snapshots(directory, exclude=["backend"])
+            self.assertEqual([s["process"] for s in snapshots], ["task"])
+            self.assertIn('test_snapshot_total{process="task"} 1', render(snapshots))
+
+
+if __name__ == '__main__':
+    unittest.main()
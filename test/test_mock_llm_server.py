@@ -0,0 +1,98 @@
+import os
+import re
+import sys
+import json
+import random
+import unittest
+
+import httpx
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_llm_server import LatencyDistribution, MockLLM, canned_reply, create_app
+
+MARKDOWN = """<markdown>
+# 标题
+<main-content>
+英伟达发布新一代数据中心芯片，性能提升三倍。[1]
+多家云厂商宣布将在下季度部署该芯片，价格尚未公布。
+更多细节见发布会回放 [2]
+</main-content>
+</markdown>"""
+
+PROMPT_BOTH = f"keywords\n{MARKDOWN}\nwrap them in <info></info> and <links></links> tags"
+PROMPT_INFO = f"keywords\n{MARKDOWN}\nwrap it in <info></info> tags"
+PROMPT_LINKS = f"keywords\n{MARKDOWN}\nwrap them in <links></links> tags"
+PROMPT_SCHEMA = ("<url_content>\n英伟达发布新一代数据中心芯片，性能提升三倍。\n</url_content>\n"
+                 "<schema>\n{\"公司\": \"\", \"产品\": \"\"}\n</schema>\nWrap the entire JSON list in <json>...</json>")
+
+
+def tag(name: str, text: str) -> list:
+    return re.findall(f"<{name}>(.*?)</{name}>", text, re.DOTALL)
+
+
+class TestCannedReply(unittest.TestCase):
+    def test_formats_follow_prompts(self):
+        kind, reply = canned_reply(PROMPT_BOTH, empty_ratio=0, link_ratio=1)
+        self.assertEqual(kind, "both")
+        self.assertIn("英伟达发布新一代数据中心芯片", tag("info", reply)[0])
+        self.assertEqual(re.findall(r"\[\d+]", tag("links", reply)[0]), ["[1]", "[2]"])
+
+        kind, reply = canned_reply(PROMPT_INFO, empty_ratio=0)
+        self.assertEqual((kind, tag("links", reply)), ("info", []))
+        kind, reply = canned_reply(PROMPT_LINKS, link_ratio=1)
+        self.assertEqual((kind, tag("info", reply)), ("links", []))
+
+        kind, reply = canned_reply(PROMPT_SCHEMA, empty_ratio=0)
+        self.assertEqual(kind, "schema")
+        items = json.loads(tag("json", reply)[0])
+        self.assertEqual(set(items[0]), {"公司", "产品"})
+
+    def test_deterministic(self):
+        self.assertEqual(canned_reply(PROMPT_BOTH), canned_reply(PROMPT_BOTH))
+        _, empty = canned_reply(PROMPT_INFO, empty_ratio=1)
+        self.assertEqual(tag("info", empty)[0].strip(), "")
+
+    def test_latency_distributions(self):
+        rng = random.Random(1)
+        self.assertEqual(LatencyDistribution("fixed:0.5").sample(rng), 0.5)
+        for spec in ("uniform:1-2", "normal:1,0.2", "lognormal:1,0.5", "exp:1"):
+            self.assertGreaterEqual(LatencyDistribution(spec).sample(rng), 0)
+        with self.assertRaises(ValueError):
+            LatencyDistribution("pareto:1")
+
+
+class TestMockServer(unittest.IsolatedAsyncioTestCase):
+    async def _post(self, mock: MockLLM, n: int = 1) -> list:
+        transport = httpx.ASGITransport(app=create_app(mock))
+        async with httpx.AsyncClient(transport=transport, base_url="http://mock") as client:
+            body = {"model": "m", "messages": [{"role": "user", "content": PROMPT_BOTH}]}
+            return [await client.post("/v1/chat/completions", json=body) for _ in range(n)]
+
+    async def test_completion_shape(self):
+        mock = MockLLM(latency="fixed:0")
+        response = (await self._post(mock))[0]
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["object"], "chat.completion")
+        self.assertIn("<info>", data["choices"][0]["message"]["content"])
+        self.assertGreater(data["usage"]["prompt_tokens"], 0)
+        stats = mock.snapshot()
+        self.assertEqual((stats["requests"], stats["status"], stats["kinds"]), (1, {"200": 1}, {"both": 1}))
+
+    async def test_rate_limits_and_injected_errors(self):
+        limited = await self._post(MockLLM(latency="fixed:0", rpm=2), n=3)
+        self.assertEqual([r.status_code for r in limited], [200, 200, 429])
+        self.assertIn("retry-after", limited[2].headers)
+        self.assertEqual(limited[2].json()["error"]["type"], "rate_limit_exceeded")
+
+        failing = await self._post(MockLLM(latency="fixed:0", error_5xx=1), n=3)
+        self.assertTrue(all(r.status_code in (500, 502, 503) for r in failing))
+        throttled = await self._post(MockLLM(latency="fixed:0", error_429=1))
+        self.assertEqual(throttled[0].status_code, 429)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+import unittest.mock
+from pathlib import Path
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.tools import profiling
+
+
+def busy_loop(seconds: float) -> int:
+    n = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+async def blocking_worker():
+    busy_loop(0.15)
+    await asyncio.sleep(0.01)
+
+
+async def idle_worker():
+    await asyncio.sleep(0.1)
+
+
+async def slot_run():
+    await asyncio.gather(blocking_worker(), idle_worker(), idle_worker())
+    return "done"
+
+
+class TestProfiling(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def test_sample_mode(self):
+        loop = asyncio.get_running_loop()
+        factory = loop.get_task_factory()
+        result = await profiling.profile(slot_run(), "first", "sample", directory=self.dir, top=10)
+        self.assertEqual(result, "done")
+        self.assertIs(loop.get_task_factory(), factory)
+
+        folded = next(self.dir.glob("*-first.folded")).read_text(encoding="utf-8")
+        self.assertIn("busy_loop (test/test_profiling.py:", folded)
+        stack, count = folded.splitlines()[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+        report = next(self.dir.glob("*-first.txt")).read_text(encoding="utf-8")
+        self.assertIn("busy_loop", report.split("by inclusive")[0])
+        tasks = report.split("asyncio tasks")[1]
+        # blocking_worker 占用事件循环最久，排在第一
+        self.assertIn("blocking_worker", tasks.splitlines()[2])
+
+    async def test_cprofile_mode(self):
+        await profiling.profile(slot_run(), "second", "cprofile", directory=self.dir, top=10)
+        self.assertTrue(list(self.dir.glob("*-second.pstats")))
+        self.assertIn("busy_loop", next(self.dir.glob("*-second.txt")).read_text(encoding="utf-8"))
+
+    def test_mode_switch(self):
+        for value, expected in (("sample", "sample"), ("CPROFILE", "cprofile"), ("1", "sample"), ("0", ""), ("bogus", "")):
+            with unittest.mock.patch.dict(os.environ, {"WISEFLOW_PROFILE": value}):
+                self.assertEqual(profiling.profile_mode(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
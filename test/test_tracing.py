@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.tools import tracing
+
+
+@tracing.traced("crawl", attrs=("url",))
+async def fake_crawl(url: str, delay: float):
+    await asyncio.sleep(delay)
+    tracing.emit_span("llm.queue", 0.01)
+    return url
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        tracing.configure(directory=self.dir)
+
+    async def asyncTearDown(self):
+        tracing.shutdown()
+        self.tmp.cleanup()
+
+    async def test_spans_propagate_across_tasks(self):
+        slot = tracing.start_span("time_slot", slot="first")
+        with self.assertRaises(ValueError):
+            async with tracing.span("extract"):
+                raise ValueError("boom")
+        async with tracing.span("focus", focus_id=1):
+            await asyncio.gather(fake_crawl("https://a.com", 0.01), fake_crawl("https://b.com", 0.05))
+        slot.end()
+        tracing.shutdown()
+
+        records = tracing.load_spans(self.dir)
+        self.assertEqual(len(records), 7)
+        self.assertEqual(len({s["trace"] for s in records}), 1)
+        spans = {s["name"] + s["attrs"].get("url", ""): s for s in records}
+        self.assertIsNone(spans["time_slot"]["parent"])
+        self.assertEqual(spans["focus"]["parent"], spans["time_slot"]["span"])
+        self.assertEqual(spans["crawlhttps://b.com"]["parent"], spans["focus"]["span"])
+        self.assertEqual(spans["extract"]["error"], "ValueError: boom")
+        self.assertIsNone(tracing._current.get())
+
+        report = tracing.summarize(records)
+        self.assertIn("time_slot slot=first", report)
+        # 关键路径经过较慢的 b.com
+        path = report.split("critical path")[1].split("time by stage")[0]
+        self.assertIn("crawl url=https://b.com", path)
+        self.assertNotIn("a.com", path)
+
+    async def test_disabled_is_noop(self):
+        tracing.shutdown()
+        self.assertEqual(await fake_crawl("https://a.com", 0), "https://a.com")
+        with tracing.span("focus") as s:
+            s.set(focus_id=1)
+        self.assertEqual(tracing.load_spans(self.dir), [])
+
+    def test_otlp_payload(self):
+        payload = tracing._to_otlp([{"trace": "a" * 32, "span": "b" * 16, "parent": None, "name": "crawl",
+                                     "start": 1.5, "dur": 0.25, "attrs": {"url": "https://a.com", "n": 3}}])
+        item = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(item["startTimeUnixNano"], "1500000000")
+        self.assertEqual(item["endTimeUnixNano"], "1750000000")
+        self.assertNotIn("parentSpanId", item)
+        self.assertIn({"key": "n", "value": {"intValue": "3"}}, item["attributes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
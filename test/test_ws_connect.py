@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import httpx
+
+# 使用临时目录作为 work_dir，避免测试污染项目目录
+os.environ.setdefault("WISEFLOW_BASE_DIR", tempfile.mkdtemp(prefix="wiseflow_test_"))
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.wis import ws_connect
+from core.wis.ws_connect import notify_user, close_backend_channel
+
+
+class TestBackendChannel(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.backend_up = True
+        if ws_connect.NOTIFY_SPOOL_PATH.exists():
+            os.remove(ws_connect.NOTIFY_SPOOL_PATH)
+        channel = ws_connect._get_channel()
+        await channel.client.aclose()
+        channel.client = httpx.AsyncClient(base_url="http://backend", transport=httpx.MockTransport(self._handle))
+
+    async def asyncTearDown(self):
+        await close_backend_channel()
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        if not self.backend_up:
+            raise httpx.ConnectError("refused", request=request)
+        self.requests.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200, json={"success": True, "result": "done"})
+
+    async def test_notifications_are_batched_without_waiting(self):
+        for code in range(5):
+            await notify_user(code, [str(code)])
+        self.assertEqual(self.requests, [])
+        await asyncio.sleep(ws_connect.NOTIFY_BATCH_WINDOW + 0.1)
+        self.assertEqual(len(self.requests), 1)
+        path, body = self.requests[0]
+        self.assertEqual(path, "/user_notify_batch")
+        self.assertEqual([item["code"] for item in body["items"]], [0, 1, 2, 3, 4])
+
+    async def test_prompt_sent_after_pending_notifications(self):
+        await notify_user(1, [])
+        self.assertTrue(await ws_connect.ask_user(100, [], timeout=1))
+        self.assertEqual([path for path, _ in self.requests], ["/user_notify_batch", "/user_prompt"])
+
+    async def test_spool_survives_backend_outage(self):
+        self.backend_up = False
+        await notify_user(7, ["a"])
+        await close_backend_channel()
+        self.assertTrue(ws_connect.NOTIFY_SPOOL_PATH.exists())
+
+        self.backend_up = True
+        channel = ws_connect._get_channel()
+        await channel.client.aclose()
+        channel.client = httpx.AsyncClient(base_url="http://backend", transport=httpx.MockTransport(self._handle))
+        self.assertTrue(await channel.flush())
+        self.assertEqual(self.requests, [("/user_notify_batch", {"items": [{"code": 7, "params": ["a"], "timeout": 30}]})])
+        self.assertFalse(ws_connect.NOTIFY_SPOOL_PATH.exists())
+
+    async def test_spooled_notifications_sent_before_new_ones(self):
+        await close_backend_channel()
+        ws_connect._BackendChannel._save_spool([{"code": 7, "params": [], "timeout": 30}])
+        channel = ws_connect._get_channel()
+        await channel.client.aclose()
+        channel.client = httpx.AsyncClient(base_url="http://backend", transport=httpx.MockTransport(self._handle))
+        # spool 在线程池中读取，此时可能尚未读完
+        await notify_user(8, [])
+        self.assertTrue(await ws_connect.ask_user(100, [], timeout=1))
+        self.assertEqual([path for path, _ in self.requests], ["/user_notify_batch", "/user_prompt"])
+        self.assertEqual([item["code"] for item in self.requests[0][1]["items"]], [7, 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+# 将项目根目录添加到Python路径
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+from core.backend.ws import WSHub, WS_DROPPED
+
+
+def dropped_total() -> float:
+    return sum(value for _, value in WS_DROPPED.snapshot()["samples"])
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed = False
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestWSHub(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.hub = WSHub(max_queue_size=4, send_timeout=0.2)
+
+    async def asyncTearDown(self):
+        for ws in list(self.hub.connections):
+            await self.hub.disconnect(ws)
+
+    async def test_slow_client_does_not_block_broadcast(self):
+        slow, fast = FakeWebSocket(delay=0.05), FakeWebSocket()
+        await self.hub.connect(slow)
+        await self.hub.connect(fast)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for code in range(3):
+            await self.hub.broadcast({"type": "notify", "code": code, "params": []})
+        self.assertLess(loop.time() - start, 0.02)
+        await asyncio.sleep(0.2)
+        self.assertEqual(len(fast.sent), 3)
+        self.assertEqual(len(slow.sent), 3)
+
+    async def test_backpressure_coalesces_and_drops_non_critical(self):
+        ws = FakeWebSocket()
+        ws.gate.clear()
+        dropped_before = dropped_total()
+        await self.hub.connect(ws)
+        await self.hub.broadcast({"type": "notify", "code": 0, "params": []})
+        await asyncio.sleep(0)  # 已被 writer 取出，卡在发送中
+        await self.hub.broadcast({"type": "info_added", "focuses": {"1": {"count": 1, "ids": ["a"]}}, "since": "s1"})
+        await self.hub.broadcast({"type": "notify", "code": 1, "params": []})
+        await self.hub.broadcast({"type": "notify", "code": 1, "params": []})
+        await self.hub.broadcast({"type": "info_added", "focuses": {"1": {"count": 2, "ids": ["b", "c"]}}, "since": "s2"})
+        await self.hub.broadcast({"type": "prompt", "prompt_id": "p1"})
+        await self.hub.broadcast({"type": "prompt", "prompt_id": "p2"})
+        await self.hub.broadcast({"type": "prompt", "prompt_id": "p3"})
+        self.assertEqual(self.hub.dropped_messages, 1)
+        self.assertEqual(dropped_total() - dropped_before, 1)
+        ws.gate.set()
+        await asyncio.sleep(0.05)
+        self.assertEqual([json.loads(m)["type"] for m in ws.sent], ["notify", "notify", "prompt", "prompt", "prompt"])
+
+        # 全是必达消息且已满：断开连接，客户端重连后补齐
+        ws.gate.clear()
+        for i in range(6):
+            await self.hub.broadcast({"type": "prompt", "prompt_id": f"q{i}"})
+        self.assertNotIn(ws, self.hub.connections)
+        await asyncio.sleep(0.05)
+        self.assertTrue(ws.closed)
+
+    async def test_info_added_merged_while_pending(self):
+        ws = FakeWebSocket()
+        ws.gate.clear()
+        await self.hub.connect(ws)
+        await self.hub.broadcast({"type": "notify", "code": 0, "params": []})
+        await asyncio.sleep(0)
+        await self.hub.broadcast({"type": "info_added", "focuses": {"1": {"count": 1, "ids": ["a"]}}, "since": "s1"})
+        await self.hub.broadcast({"type": "info_added", "focuses": {"1": {"count": 2, "ids": ["b", "c"]},
+                                                                    "2": {"count": 1, "ids": ["d"]}}, "since": "s2"})
+        ws.gate.set()
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(ws.sent), 2)
+        merged = json.loads(ws.sent[1])
+        self.assertEqual(merged["since"], "s1")
+        self.assertEqual(merged["focuses"], {"1": {"count": 3, "ids": ["a", "b", "c"]}, "2": {"count": 1, "ids": ["d"]}})
+
+    async def test_stalled_send_disconnects(self):
+        ws = FakeWebSocket()
+        ws.gate.clear()
+        await self.hub.connect(ws)
+        await self.hub.broadcast({"type": "notify", "code": 0, "params": []})
+        await asyncio.sleep(0.3)
+        self.assertNotIn(ws, self.hub.connections)
+        self.assertTrue(ws.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()